@@ -1,11 +1,10 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from database.db_config import mongo
-from scheduler.scheduler import DailyScheduler
-from app.routers import crawler_router, books_router, changes_router
+from app.routers import crawler_router, books_router, changes_router, stats_router, runs_router
 from crawler.crawler_registry import get_all_crawlers
 from core.auth import get_api_key_header
+from core.responses import FastJSONResponse
 
 # ---------- Lifespan for startup/shutdown ----------
 @asynccontextmanager
@@ -15,8 +14,14 @@ async def lifespan(app: FastAPI):
     - Ensure Mongo indexes.
     - Initialize scheduler after Mongo is ready.
     - Clean up scheduler and crawlers on shutdown.
+    Storage and scheduler (APScheduler + crawler stack) are imported here, not at module
+    import, so importing the app stays cheap.
     """
+    from database.db_config import get_storage
+    from scheduler.scheduler import DailyScheduler
+
     # ---------- Startup ----------
+    mongo = get_storage()
     app.state.mongo = mongo
     await mongo.ensure_indexes()
 
@@ -40,7 +45,7 @@ async def lifespan(app: FastAPI):
 
 
 # ---------- Create FastAPI app ----------
-app = FastAPI(title="Async Book Crawler", lifespan=lifespan)
+app = FastAPI(title="Async Book Crawler", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # ---------- CORS Middleware ----------
 app.add_middleware(
@@ -60,4 +65,6 @@ async def health():
 # ---------- Include Routers ----------
 app.include_router(crawler_router.router, prefix="/crawler", dependencies=[Depends(get_api_key_header)])
 app.include_router(books_router.router, prefix="", dependencies=[Depends(get_api_key_header)])
-app.include_router(changes_router.router, prefix="/changes", dependencies=[Depends(get_api_key_header)])
\ No newline at end of file
+app.include_router(changes_router.router, prefix="/changes", dependencies=[Depends(get_api_key_header)])
+app.include_router(stats_router.router, prefix="/stats", dependencies=[Depends(get_api_key_header)])
+app.include_router(runs_router.router, prefix="/runs", dependencies=[Depends(get_api_key_header)])
\ No newline at end of file
@@ -9,11 +9,18 @@ import io
 import csv
 from datetime import datetime, timedelta, timezone
 from core.deps import get_mongo
-from database.storage import MongoStorage
+from core.responses import FastJSONResponse, dumps
+from database.base import StorageBackend, BookQuery, BOOK_LIST_FIELDS, BOOK_DETAIL_FIELDS
+from utils.time_series import INTERVALS, AGGREGATES, flatten_buckets, downsample
+from utils.single_flight import SingleFlight
 
 
 router = APIRouter()
 
+# identical list / suggest queries in flight share one storage round trip and one encoded body;
+# keyed on the query alone since the app serves a single storage backend and nothing outlives the call
+QUERIES = SingleFlight()
+
 
 class BookListResponse(BaseModel):
     total: int 
@@ -22,15 +29,16 @@ class BookListResponse(BaseModel):
     total_pages: int 
     items: list
 
-# Helper to convert Mongo doc to JSON-serializable dict 
+# Helper to convert Mongo doc to JSON-serializable dict (a copy: storage results may be shared)
 def serialize_doc(doc):
-    doc['id'] = str(doc.get('_id'))
-    doc.pop('_id', None)
-    return doc 
+    return {'id': str(doc.get('_id')), **{k: v for k, v in doc.items() if k != '_id'}}
 
-@router.get('/books', response_model=BookListResponse)
+# BookListResponse documents the shape; the handler returns an encoded response, so the
+# items are not validated and re-encoded a second time
+@router.get('/books', response_model=BookListResponse, response_class=FastJSONResponse)
 async def list_books(request: Request, 
-    mongo: MongoStorage = Depends(get_mongo),
+    mongo: StorageBackend = Depends(get_mongo),
+    q: Optional[str] = Query(None, description='full-text search over name, category and description'),
     category: Optional[str] = Query(None),
     min_price: Optional[float] = Query(None),
     max_price: Optional[float] = Query(None),
@@ -40,93 +48,76 @@ async def list_books(request: Request,
     per_page: int = Query(20, ge=1, le=100)
 ):
     """List books with filters, sorting, and pagination."""
-    query = {}
-    if category:
-        query['category'] = {'$regex': f'^{category}$', '$options': 'i'}
-    
-    # Price range filters on price_including_tax.amount
-    if min_price is not None or max_price is not None:
-        price_q = {}
-        if min_price is not None:
-            price_q["$gte"] = min_price
-        if max_price is not None:
-            price_q["$lte"] = max_price
-        query['price_including_tax.amount'] = price_q
-    
-    if rating:
-        query['rating'] = {"$regex":  f"^{rating}$", "$options": "i"}
-        
-    sort = []
-    if sort_by:
-        if sort_by == 'rating':
-            # rating stored as word; we map to numeric scale for sorting.
-            # pipeline.append({
-            #     '$addFields': {
-            #         'rating_numeric': {
-            #             '$switch': {
-            #                 'branches': [
-            #                     { 'case': { '$eq': ['$rating', word] }, 'then': num }
-            #                     for word, num in RATING_MAP.items()
-            #                 ],
-            #                 'default': 0 # Fallback for unmapped or bad data
-            #             }
-            #         }
-            #     }
-            # })
-            # # Sort by the newly created numeric field (highest first)
-            # sort = {'rating_numeric': -1}
-            sort = [('rating', -1)]
-        elif sort_by == 'price':
-            sort = [('price_including_tax.amount', 1)]
-        elif sort_by == 'reviews':
-            sort = [('number_of_reviews', -1)]
-    
-    total = await mongo.books.count_documents(query)
-    total_pages = math.ceil(total / per_page) if total else 0
-    
-    # 1 means include it, 0 means exclude it
-    PROJECTION_FIELDS = {
-        '_id': 1,
-        'name': 1,
-        'rating': 1,
-        'category': 1,
-        'number_of_reviews': 1,
-        'availability': 1,
-        'price_including_tax.amount': 1,
-    }
-    
-    cursor = mongo.books.find(query, PROJECTION_FIELDS)
-    if sort:
-        cursor.sort(sort)
-    cursor = cursor.skip((page - 1) * per_page).limit(per_page)
-    items = await cursor.to_list(length=per_page)
-    items = [serialize_doc(i) for i in items]
-    
-    return BookListResponse(total=total, page=page, per_page=per_page, total_pages=total_pages, items=items)
+    query = BookQuery(q=' '.join(q.lower().split()) if q else None, category=category or None, min_price=min_price,
+                      max_price=max_price, rating=rating or None, sort_by=sort_by or None)
+
+    async def run() -> bytes:
+        total = await mongo.count_books(query)
+        total_pages = math.ceil(total / per_page) if total else 0
+
+        items = await mongo.find_books(query, fields=BOOK_LIST_FIELDS, skip=(page - 1) * per_page, limit=per_page)
+        return dumps({'total': total, 'page': page, 'per_page': per_page, 'total_pages': total_pages,
+                      'items': [serialize_doc(i) for i in items]})
+
+    body = await QUERIES.do(('list', query, page, per_page), run)
+    return Response(body, media_type='application/json')
+
+@router.get('/books/suggest')
+async def suggest_books(
+    mongo: StorageBackend = Depends(get_mongo),
+    prefix: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Autocomplete: book names starting with the given prefix."""
+    async def run() -> bytes:
+        docs = await mongo.suggest_book_names(prefix, limit=limit)
+        return dumps({'prefix': prefix, 'items': [serialize_doc(d) for d in docs]})
+
+    return Response(await QUERIES.do(('suggest', prefix, limit), run), media_type='application/json')
 
 @router.get('/books/{book_id}')
-async def get_book(book_id: str, request: Request, mongo: MongoStorage = Depends(get_mongo)):
+async def get_book(book_id: str, request: Request, mongo: StorageBackend = Depends(get_mongo)):
     '''Return full details about a single book by object id.'''
-    mongo = request.app.state.mongo
-    try:
-        oid = ObjectId(book_id)
-    except Exception:
+    if not ObjectId.is_valid(book_id):
         raise HTTPException(status_code=400, detail='invalid book id')
     
-    PROJECTION_FIELDS = {
-        "_id": 1,
-        "availability": 1,
-        "category": 1,
-        "description": 1,
-        "image_url": 1,
-        "name": 1,
-        "number_of_reviews": 1,
-        "price_excluding_tax": 1,
-        "price_including_tax": 1,
-        "rating": 1
-    }
-    
-    doc = await mongo.books.find_one({'_id': oid}, PROJECTION_FIELDS)
+    doc = await mongo.get_book_by_id(book_id, fields=BOOK_DETAIL_FIELDS)
     if not doc:
         raise HTTPException(status_code=404, detail='book not found')
-    return serialize_doc(doc)
+    return FastJSONResponse(serialize_doc(doc))
+
+@router.get('/books/{book_id}/history')
+async def get_book_history(book_id: str,
+    mongo: StorageBackend = Depends(get_mongo),
+    start: Optional[datetime] = Query(None, description='ISO datetime, default 1 year ago'),
+    end: Optional[datetime] = Query(None, description='ISO datetime, default now'),
+    interval: str = Query('raw', description='raw, day, week, month'),
+    agg: str = Query('last', description='last, mean, min, max')
+):
+    """Price and stock-count history of a book, optionally downsampled."""
+    if interval not in INTERVALS or agg not in AGGREGATES:
+        raise HTTPException(status_code=400, detail='invalid interval or agg')
+    if not ObjectId.is_valid(book_id):
+        raise HTTPException(status_code=400, detail='invalid book id')
+
+    book = await mongo.get_book_by_id(book_id, fields=['source_url'])
+    if not book:
+        raise HTTPException(status_code=404, detail='book not found')
+
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=365)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+
+    # one indexed read per calendar year in range (a single bucket for the last year of a book)
+    buckets = await mongo.get_book_history(book['source_url'], start.year, end.year)
+    points = downsample(flatten_buckets(buckets, start, end), interval, agg)
+    return {
+        'id': book_id,
+        'source_url': book['source_url'],
+        'interval': interval,
+        'agg': agg,
+        'points': [{**p, 't': p['t'].isoformat()} for p in points],
+    }
@@ -1,15 +1,20 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response, Header
 from typing import Optional
 from pydantic import BaseModel
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from bson import ObjectId
 import math 
 import json 
 import io 
 import csv
+import asyncio
 from datetime import datetime, timedelta, timezone
 from core.deps import get_mongo
-from database.storage import MongoStorage
+from core.responses import FastJSONResponse
+from database.base import StorageBackend
+from utils.change_rollups import day_bucket
+from utils.change_events import change_bus, format_sse, serialize_change
+from settings import CHANGE_STREAM_KEEPALIVE_SECONDS
 
 
 router = APIRouter()
@@ -19,7 +24,7 @@ router = APIRouter()
 async def daily_report_generate(
     request: Request,
     format: str = "json",
-    mongo: MongoStorage = Depends(get_mongo)
+    mongo: StorageBackend = Depends(get_mongo)
 ):
     """
     Generate a daily change report (JSON or CSV) based on today's timestamp.
@@ -30,11 +35,8 @@ async def daily_report_generate(
     now = datetime.now(timezone.utc)
     # 24 hours ago
     start = now - timedelta(hours=24)
-    # Query MongoDB for documents within last 24 hour
-    cursor = mongo.book_changes.find({})
-
-    changes = await cursor.to_list(length=None)
-    print("Debug:", len(changes), " start_time:", start)
+    # Query MongoDB for documents within last 24 hour (served by the timestamp index)
+    changes = await mongo.find_changes_since(start)
     # CSV format
     if format.lower() == "csv":
         output = io.StringIO()
@@ -49,13 +51,106 @@ async def daily_report_generate(
             ])
         return Response(content=output.getvalue(), media_type="text/csv")
 
-    # Default JSON format
-    for c in changes:
-        c["_id"] = str(c["_id"])
-        if "timestamp" in c and isinstance(c["timestamp"], datetime):
-            c["timestamp"] = c["timestamp"].isoformat()
-
+    # Default JSON format: orjson encodes ObjectId / datetime directly, in one pass
     if changes:
-        return changes
+        return FastJSONResponse(changes)
+
+    return {"status": "No change!"}
+
+
+@router.get("/summary")
+async def changes_summary(
+    group_by: str = Query("category", pattern="^(category|book)$"),
+    days: int = Query(7, ge=1, le=366),
+    key: Optional[str] = Query(None, description="category name or book source_url"),
+    mongo: StorageBackend = Depends(get_mongo)
+):
+    """
+    Daily change summary per category or per book, served from the change_rollups
+    aggregates (cost grows with days x keys, not with the number of change events).
+    """
+    start = day_bucket(datetime.now(timezone.utc)) - timedelta(days=days - 1)
+    rollups = await mongo.get_change_rollups(group_by, start, key=key)
+
+    summary = {}
+    for r in rollups:
+        item = summary.setdefault(r["key"], {
+            "key": r["key"], "change_count": 0, "new_count": 0, "update_count": 0,
+            "availability_flips": 0, "price_min": None, "price_max": None, "price_last": None, "daily": [],
+        })
+        for field in ("change_count", "new_count", "update_count", "availability_flips"):
+            item[field] += r.get(field, 0)
+        if r.get("price_min") is not None:
+            item["price_min"] = r["price_min"] if item["price_min"] is None else min(item["price_min"], r["price_min"])
+        if r.get("price_max") is not None:
+            item["price_max"] = r["price_max"] if item["price_max"] is None else max(item["price_max"], r["price_max"])
+        # rollups are sorted newest day first
+        if item["price_last"] is None and r.get("price_last") is not None:
+            item["price_last"] = r["price_last"]
+        day = r["day"].isoformat() if isinstance(r["day"], datetime) else r["day"]
+        item["daily"].append({**{k: v for k, v in r.items() if k not in ("scope", "key", "day", "last_change")}, "day": day})
+
+    return {"group_by": group_by, "days": days, "start": start.isoformat(), "items": list(summary.values())}
+
+
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    since: Optional[int] = Query(None, description="resume after this change seq (same as Last-Event-ID)"),
+    mongo: StorageBackend = Depends(get_mongo)
+):
+    """
+    Server-Sent Events feed of book changes as the crawler detects them.
+    Reconnecting clients send `Last-Event-ID` (the change `seq`) and receive
+    everything they missed before switching to live events.
+    """
+    try:
+        last_seq = int(last_event_id) if last_event_id else since
+    except ValueError:
+        raise HTTPException(status_code=400, detail='invalid Last-Event-ID')
+
+    async def catch_up(after_seq: int):
+        # serve from the in-memory buffer when possible, otherwise from book_changes
+        events = change_bus.replay(after_seq)
+        if events is not None:
+            return events
+        return [serialize_change(doc) for doc in await mongo.find_changes_after(after_seq)]
+
+    async def event_source():
+        nonlocal last_seq
+        # subscribe before catching up so nothing published in between is lost
+        with change_bus.subscribe() as sub:
+            while last_seq is not None:
+                events = await catch_up(last_seq)
+                for event in events:
+                    yield format_sse(event)
+                    last_seq = event['seq']
+                if len(events) < 1000 or await request.is_disconnected():
+                    break
+
+            while not await request.is_disconnected():
+                if sub.lagged and last_seq is not None:
+                    # consumer fell behind the live queue: drop it and resync from storage
+                    sub.lagged = False
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    for event in await catch_up(last_seq):
+                        yield format_sse(event)
+                        last_seq = event['seq']
+                    continue
+                try:
+                    event = await asyncio.wait_for(sub.get(), timeout=CHANGE_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if last_seq is not None and event.get('seq', 0) <= last_seq:
+                    continue  # already delivered during catch-up
+                yield format_sse(event)
+                last_seq = event.get('seq', last_seq)
 
-    return {"status": "No change!"}
\ No newline at end of file
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
\ No newline at end of file
@@ -1,29 +1,37 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, Request, Response
 # from fastapi.responses import JSONResponse
 # from starlette.status import HTTP_400_BAD_REQUEST
-from crawler.scraper import AsyncBookCrawler
-from crawler.config import SITE_CONFIG
 import io 
 import csv
 import json
+from typing import Optional
 # from database.storage import MongoStorage
 from crawler.crawler_registry import get_crawler, add_crawler, remove_crawler
 import asyncio
 from core.deps import get_mongo
-from database.storage import MongoStorage
+from database.base import StorageBackend
+from settings import DRY_RUN_CONCURRENCY
 
 
 router = APIRouter()
 
+
+def _sites():
+    from crawler.config import SITE_CONFIG
+    return SITE_CONFIG
+
 @router.post("/start/{site_key}")
-async def start_crawl(site_key: str, background_tasks: BackgroundTasks, mongo: MongoStorage = Depends(get_mongo)):
-    if site_key not in SITE_CONFIG:
+async def start_crawl(site_key: str, background_tasks: BackgroundTasks, listing_delta: bool = False, mongo: StorageBackend = Depends(get_mongo)):
+    if site_key not in _sites():
         return {"error": "Unknown site_key"}
     
     if get_crawler(site_key):
         return {"status": "already_running"}
     
-    crawler = AsyncBookCrawler(site_key, SITE_CONFIG[site_key], mongo, concurrency=10) 
+    # the crawler stack (httpx, lxml, site configs) is imported on first use, not with the app
+    from crawler.scraper import AsyncBookCrawler
+    # listing_delta=true: only fetch detail pages for new books or changed catalog cards
+    crawler = AsyncBookCrawler(site_key, _sites()[site_key], mongo, concurrency=10, listing_delta=listing_delta) 
     add_crawler(site_key, crawler)
     
     # run in background
@@ -32,12 +40,13 @@ async def start_crawl(site_key: str, background_tasks: BackgroundTasks, mongo: M
     return {"status": "started", "site_key": site_key}
 
 @router.post("/resume/{site_key}")
-async def resume_crawl(site_key: str, mongo: MongoStorage = Depends(get_mongo)):
-    if site_key not in SITE_CONFIG:
+async def resume_crawl(site_key: str, mongo: StorageBackend = Depends(get_mongo)):
+    if site_key not in _sites():
         return {"error": "Unknown site_key"}
     if get_crawler(site_key):
         return {"status": "already_running"}
-    crawler = AsyncBookCrawler(site_key, SITE_CONFIG[site_key], mongo, concurrency=10)
+    from crawler.scraper import AsyncBookCrawler
+    crawler = AsyncBookCrawler(site_key, _sites()[site_key], mongo, concurrency=10)
     add_crawler(site_key, crawler)
     
     loop = asyncio.get_event_loop()
@@ -47,7 +56,7 @@ async def resume_crawl(site_key: str, mongo: MongoStorage = Depends(get_mongo)):
 
 @router.post("/stop/{site_key}")
 async def stop_crawl(site_key: str):
-    if site_key not in SITE_CONFIG:
+    if site_key not in _sites():
         return {"error": "unknown site_key"}
     c = get_crawler(site_key)
     if not c:
@@ -57,8 +66,81 @@ async def stop_crawl(site_key: str):
     return {"status": "stopped", "site_key": site_key}
 
 @router.get("/status/{site_key}")
-async def status(site_key: str, mongo: MongoStorage = Depends(get_mongo)):
+async def status(site_key: str, mongo: StorageBackend = Depends(get_mongo)):
     state = await mongo.get_state(site_key)
     if state:
         state['_id'] = str(state['_id'])
-    return {"site_key": site_key, "state": state}
\ No newline at end of file
+    return {"site_key": site_key, "state": state}
+
+
+# ---------- Dry runs ----------
+def _dry_run_key(site_key: str) -> str:
+    return f"{site_key}:dry_run"
+
+@router.post("/dry-run/{site_key}")
+async def start_dry_run(site_key: str, listing_delta: bool = False, concurrency: Optional[int] = None,
+                        mongo: StorageBackend = Depends(get_mongo)):
+    """Crawl without writing anything; the report (would-be changes, diffs, timings) is served by GET."""
+    if site_key not in _sites():
+        return {"error": "Unknown site_key"}
+    previous = get_crawler(_dry_run_key(site_key))
+    if previous and previous.report is None:
+        return {"status": "already_running"}
+
+    from crawler.scraper import AsyncBookCrawler
+    crawler = AsyncBookCrawler(site_key, _sites()[site_key], mongo, concurrency=concurrency or DRY_RUN_CONCURRENCY,
+                               listing_delta=listing_delta, dry_run=True)
+    add_crawler(_dry_run_key(site_key), crawler)
+
+    loop = asyncio.get_event_loop()
+    loop.create_task(crawler.crawl(resume=False))
+    return {"status": "started", "site_key": site_key, "run_id": crawler.run_id}
+
+@router.get("/dry-run/{site_key}")
+async def dry_run_report(site_key: str):
+    crawler = get_crawler(_dry_run_key(site_key))
+    if not crawler:
+        raise HTTPException(status_code=404, detail="No dry run for this site")
+    if crawler.report is None:
+        return {"status": "running", "site_key": site_key, "run_id": crawler.run_id, "stats": crawler.stats}
+    return {"status": "finished", "site_key": site_key, "report": crawler.report}
+
+
+# ---------- Site configs ----------
+@router.get("/sites")
+async def list_sites():
+    return {"sites": {
+        key: {"pattern": plan.page_pattern, "detail_fields": [f.name for f in plan.detail_fields]}
+        for key, plan in _sites().items()
+    }}
+
+@router.post("/sites/reload")
+async def reload_sites():
+    """Re-read SITE_CONFIG_DIR; invalid configs are rejected and the loaded ones kept."""
+    from crawler.config import reload_site_configs
+    from crawler.site_config import SiteConfigError
+    try:
+        plans = reload_site_configs()
+    except SiteConfigError as e:
+        raise HTTPException(status_code=400, detail={"errors": e.errors})
+    return {"status": "reloaded", "sites": sorted(plans)}
+
+@router.get("/sites/{site_key}")
+async def get_site(site_key: str):
+    plan = _sites().get(site_key)
+    if not plan:
+        raise HTTPException(status_code=404, detail="Unknown site_key")
+    return plan.raw
+
+@router.put("/sites/{site_key}")
+async def put_site(site_key: str, config: dict = Body(...)):
+    """Validate and register a site config (JSON) until the next reload; crawls started afterwards use it."""
+    if config.get("site_key", site_key) != site_key:
+        raise HTTPException(status_code=400, detail="site_key in body does not match the path")
+    from crawler.config import register_site_config
+    from crawler.site_config import SiteConfigError
+    try:
+        plan = register_site_config({**config, "site_key": site_key})
+    except SiteConfigError as e:
+        raise HTTPException(status_code=400, detail={"errors": e.errors})
+    return {"status": "registered", "site_key": plan.site_key}
@@ -0,0 +1,58 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from core.deps import get_mongo
+from database.base import StorageBackend
+from utils.change_events import serialize_change
+from utils.crawl_runs import compare_runs
+
+
+router = APIRouter()
+
+
+@router.get("")
+async def list_runs(
+    site_key: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200),
+    mongo: StorageBackend = Depends(get_mongo)
+):
+    """Crawl run records, most recent first."""
+    return {"runs": await mongo.get_crawl_runs(site_key, limit=limit)}
+
+
+@router.get("/compare")
+async def compare(
+    base: str = Query(..., description="run_id of the reference run"),
+    target: str = Query(..., description="run_id of the run to check"),
+    mongo: StorageBackend = Depends(get_mongo)
+):
+    """Metric deltas between two runs, flagging throughput / error regressions."""
+    runs = {}
+    for name, run_id in (("base", base), ("target", target)):
+        runs[name] = await mongo.get_crawl_run(run_id)
+        if not runs[name]:
+            raise HTTPException(status_code=404, detail=f"Unknown run {run_id}")
+    return compare_runs(runs["base"], runs["target"])
+
+
+@router.get("/{run_id}")
+async def get_run(run_id: str, mongo: StorageBackend = Depends(get_mongo)):
+    run = await mongo.get_crawl_run(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+
+@router.get("/{run_id}/changes")
+async def run_changes(
+    run_id: str,
+    after_seq: int = Query(0, ge=0, description="page through results by the last seq seen"),
+    limit: int = Query(500, ge=1, le=1000),
+    mongo: StorageBackend = Depends(get_mongo)
+):
+    """Change events written by one run (served by the run_id index); also works while the run is in progress."""
+    changes = [serialize_change(c) for c in await mongo.find_changes_for_run(run_id, after_seq=after_seq, limit=limit)]
+    return {
+        "run_id": run_id,
+        "changes": changes,
+        "next_after_seq": changes[-1]["seq"] if len(changes) == limit else None,
+    }
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Query
+from core.deps import get_mongo
+from database.base import StorageBackend, BookQuery
+from utils.catalog_stats import summarize, rebuild_catalog_stats
+
+
+router = APIRouter()
+
+
+@router.get("")
+async def catalog_stats(
+    refresh: bool = Query(False, description="recompute from all books before answering"),
+    mongo: StorageBackend = Depends(get_mongo)
+):
+    """
+    Book counts, average price and rating distribution per category and for the whole catalog.
+    Served from the catalog_stats aggregates (one document per category), which change
+    detection keeps up to date; recomputed from the books when missing or on `refresh`.
+    """
+    stats = await mongo.get_catalog_stats()
+    if refresh or (not stats and await mongo.count_books(BookQuery()) > 0):
+        stats = await rebuild_catalog_stats(mongo)
+    return summarize(stats)
@@ -0,0 +1,117 @@
+"""
+Response serialization benchmark: per-item cost of encoding a 100-item book page and a
+large change report, FastAPI's default path vs the orjson path the routers use.
+
+    python -m benchmarks.bench_serialization --page-size 100 --report-size 50000
+
+default  response_model validation + serialization (fastapi.routing.serialize_response)
+         for the page, per-item _id / timestamp conversion + jsonable_encoder for the
+         report, then JSONResponse (json.dumps)
+orjson   serialize_doc copy + FastJSONResponse, one encoding pass with ObjectId and
+         datetime handled by orjson
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from app.routers.books_router import BookListResponse, serialize_doc
+from core.responses import FastJSONResponse
+from benchmarks.bench_storage import CATEGORIES, RATINGS
+
+
+def book_page(size: int, rng: random.Random):
+    return [{
+        "_id": ObjectId(),
+        "name": f"Synthetic Book {n}",
+        "rating": rng.choice(RATINGS),
+        "category": rng.choice(CATEGORIES),
+        "number_of_reviews": rng.randint(0, 50),
+        "availability": f"In stock ({rng.randint(0, 30)} available)",
+        "price_including_tax": {"amount": round(rng.uniform(10, 60), 2)},
+    } for n in range(size)]
+
+
+def change_report(size: int, rng: random.Random):
+    now = datetime.now(timezone.utc)
+    return [{
+        "_id": ObjectId(),
+        "seq": n,
+        "source_url": f"http://books.toscrape.com/catalogue/book_{n}/index.html",
+        "change_type": "update",
+        "category": rng.choice(CATEGORIES),
+        "changes": {"price_including_tax": {"old": {"amount": 20.0, "currency": "£"},
+                                            "new": {"amount": round(rng.uniform(10, 60), 2), "currency": "£"}}},
+        "timestamp": now - timedelta(seconds=n),
+    } for n in range(size)]
+
+
+async def page_default(docs, field):
+    items = []
+    for doc in docs:
+        doc = dict(doc)  # the old serialize_doc mutated in place
+        doc["id"] = str(doc.pop("_id"))
+        items.append(doc)
+    model = BookListResponse(total=1000, page=1, per_page=len(items), total_pages=10, items=items)
+    content = await serialize_response(field=field, response_content=model)
+    return JSONResponse(content).body
+
+
+async def page_orjson(docs, field):
+    return FastJSONResponse({"total": 1000, "page": 1, "per_page": len(docs), "total_pages": 10,
+                             "items": [serialize_doc(d) for d in docs]}).body
+
+
+async def report_default(changes, field):
+    out = []
+    for c in changes:
+        c = dict(c)
+        c["_id"] = str(c["_id"])
+        c["timestamp"] = c["timestamp"].isoformat()
+        out.append(c)
+    return JSONResponse(jsonable_encoder(out)).body
+
+
+async def report_orjson(changes, field):
+    return FastJSONResponse(changes).body
+
+
+async def measure(fn, data, field, repeat: int) -> float:
+    """Best-of-`repeat` seconds for one call."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn(data, field)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--report-size", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    field = create_model_field("Response_list_books", BookListResponse, mode="serialization")
+    cases = [
+        (f"book page ({args.page_size})", book_page(args.page_size, rng), page_default, page_orjson, args.repeat * 10),
+        (f"change report ({args.report_size})", change_report(args.report_size, rng), report_default, report_orjson, args.repeat),
+    ]
+    print(f"{'payload':<24}{'default':>14}{'orjson':>14}{'speedup':>10}   (per item)")
+    for label, data, default, fast, repeat in cases:
+        assert (await default(data, field)).count(b'"') == (await fast(data, field)).count(b'"'), label
+        slow_s = await measure(default, data, field, repeat)
+        fast_s = await measure(fast, data, field, repeat)
+        n = len(data)
+        print(f"{label:<24}{slow_s / n * 1e6:>11.2f} us{fast_s / n * 1e6:>11.2f} us{slow_s / fast_s:>9.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""
+Cold-start benchmark: import time of the API module in fresh interpreters, using
+`python -X importtime`.
+
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 600
+
+Prints the median import time of the module, the process wall time and the heaviest
+direct imports of the last run. With --budget-ms it exits with status 1 when the
+median exceeds the budget, so it can gate CI.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(module: str):
+    """Return (wall seconds, {module: (depth, self_us, cumulative_us)}) for one cold import."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=root, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise SystemExit(result.stderr.strip().splitlines()[-1])
+    imports = {}
+    for line in result.stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            self_us, cumulative_us, indent, name = m.groups()
+            imports[name] = ((len(indent) - 1) // 2, int(self_us), int(cumulative_us))
+    return wall, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    walls, totals = [], []
+    for _ in range(args.runs):
+        wall, imports = measure(args.module)
+        walls.append(wall * 1000)
+        totals.append(imports[args.module][2] / 1000)
+
+    median = statistics.median(totals)
+    print(f"[{args.module}] runs={args.runs}")
+    print(f"  import time   median {median:8.1f} ms  (min {min(totals):.1f}, max {max(totals):.1f})")
+    print(f"  process wall  median {statistics.median(walls):8.1f} ms")
+    print(f"  heaviest direct imports (last run):")
+    direct = [(cum, name) for name, (depth, _, cum) in imports.items() if depth == 1]
+    for cum, name in sorted(direct, reverse=True)[:args.top]:
+        print(f"    {cum / 1000:8.1f} ms  {name}")
+
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"FAIL: median import time {median:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
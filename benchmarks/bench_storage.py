@@ -0,0 +1,110 @@
+"""
+Storage backend benchmark: runs the crawler's write path (change detection) and the
+API's read path against each backend with the same synthetic catalog.
+
+    python -m benchmarks.bench_storage --books 5000 --backends sqlite mongo
+
+The Mongo backend is skipped when no server is reachable at MONGO_URI.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from database.base import BookQuery, BOOK_LIST_FIELDS, BOOK_DETAIL_FIELDS
+from database.sqlite_storage import SQLiteStorage
+from database.storage import MongoStorage
+from utils.change_detection import BookChangeDetector
+from utils.change_events import ChangeEventBus
+from settings import MONGO_URI
+
+CATEGORIES = ["Poetry", "Mystery", "Travel", "History", "Fiction", "Science", "Romance", "Horror"]
+RATINGS = ["One", "Two", "Three", "Four", "Five"]
+
+
+def synthetic_book(n: int, rng: random.Random) -> dict:
+    price = round(rng.uniform(10, 60), 2)
+    return {
+        "source_url": f"http://books.toscrape.com/catalogue/book_{n}/index.html",
+        "name": f"Synthetic Book {n}",
+        "description": " ".join(rng.choice(["poems", "murder", "journey", "empire", "love", "stars"]) for _ in range(40)),
+        "category": rng.choice(CATEGORIES),
+        "price_including_tax": {"amount": price, "currency": "£"},
+        "price_excluding_tax": {"amount": price, "currency": "£"},
+        "availability": f"In stock ({rng.randint(0, 30)} available)",
+        "number_of_reviews": rng.randint(0, 50),
+        "image_url": f"http://books.toscrape.com/media/{n}.jpg",
+        "rating": rng.choice(RATINGS),
+        "status": "fetched",
+    }
+
+
+async def timed(label: str, count: int, coro_factory, results: dict):
+    start = time.perf_counter()
+    for i in range(count):
+        await coro_factory(i)
+    elapsed = time.perf_counter() - start
+    results[label] = (count / elapsed if elapsed else float("inf"), elapsed)
+
+
+async def run_backend(name: str, storage, books: int, queries: int) -> dict:
+    rng = random.Random(42)
+    catalog = [synthetic_book(n, rng) for n in range(books)]
+    detector = BookChangeDetector(storage, bus=ChangeEventBus())
+    results: dict = {}
+    await storage.ensure_indexes()
+
+    await timed("detect new", books, lambda i: detector.detect_and_update_changes(dict(catalog[i])), results)
+    await timed("detect unchanged", books, lambda i: detector.detect_and_update_changes(dict(catalog[i])), results)
+
+    def changed(i):
+        book = dict(catalog[i])
+        book["price_including_tax"] = {"amount": book["price_including_tax"]["amount"] + 1, "currency": "£"}
+        return detector.detect_and_update_changes(book)
+    await timed("detect updated", books // 10, changed, results)
+    if hasattr(storage, "flush"):
+        await storage.flush()
+
+    async def list_page(i):
+        query = BookQuery(category=CATEGORIES[i % len(CATEGORIES)], min_price=20, sort_by="price")
+        await storage.count_books(query)
+        await storage.find_books(query, fields=BOOK_LIST_FIELDS, skip=(i % 5) * 20, limit=20)
+    await timed("list page", queries, list_page, results)
+
+    ids = [b["_id"] for b in await storage.find_books(BookQuery(), fields=["name"], limit=queries)]
+    await timed("get book", len(ids), lambda i: storage.get_book_by_id(str(ids[i]), fields=BOOK_DETAIL_FIELDS), results)
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--backends", nargs="+", default=["sqlite", "mongo"], choices=["sqlite", "mongo"])
+    args = parser.parse_args()
+
+    for backend in args.backends:
+        if backend == "sqlite":
+            tmp = tempfile.mkdtemp()
+            storage = SQLiteStorage(path=os.path.join(tmp, "bench.db"))
+        else:
+            storage = MongoStorage(uri=MONGO_URI, db_name="book_crawler_bench")
+            try:
+                await storage.client.admin.command("ping")
+            except Exception as e:
+                print(f"[mongo] skipped: {e.__class__.__name__}")
+                continue
+            await storage.client.drop_database("book_crawler_bench")
+
+        results = await run_backend(backend, storage, args.books, args.queries)
+        print(f"[{backend}] books={args.books}")
+        for label, (rate, elapsed) in results.items():
+            print(f"  {label:<18} {rate:>10.0f} ops/s  ({elapsed:.2f}s)")
+        if backend == "mongo":
+            await storage.client.drop_database("book_crawler_bench")
+        await storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,233 @@
+"""
+Read API load test: seeds a SQLite database with a synthetic catalog and change history,
+then drives the FastAPI app in-process with concurrent httpx clients (ASGI transport, no
+network or server process) and reports throughput and latency percentiles per endpoint
+and query shape.
+
+    python -m benchmarks.load_api --books 100000 --changes 2000000 --db /tmp/load.db
+    python -m benchmarks.load_api --scenarios list_books.search get_book --slo get_book:p99=20
+
+The seeded file is reused by later runs with the same --books / --changes (--reseed
+forces a new one). API key checks and rate limiting are bypassed. Exits with status 1
+when a scenario breaks its SLO (p50 / p95 / p99 in ms) or returns errors, so it can gate CI.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+import httpx
+from app.main import app
+from core import deps
+from core.auth import get_api_key_header
+from database.base import name_search_key
+from database.sqlite_storage import SQLiteStorage, _dumps, _ts
+from benchmarks.bench_storage import CATEGORIES, synthetic_book
+
+WORDS = ["poems", "murder", "journey", "empire", "love", "stars"]
+
+# name -> (path builder, share of --requests, default SLO in ms)
+SCENARIOS = {
+    "list_books.default": (lambda rng, ids: "/books", 1.0, {"p95": 250, "p99": 500}),
+    "list_books.category": (
+        lambda rng, ids: f"/books?category={rng.choice(CATEGORIES)}&sort_by=price", 1.0, {"p95": 250, "p99": 500}),
+    "list_books.price_range": (
+        lambda rng, ids: f"/books?min_price={rng.randint(10, 40)}&max_price={rng.randint(41, 60)}&sort_by=rating",
+        1.0, {"p95": 250, "p99": 500}),
+    "list_books.search": (lambda rng, ids: f"/books?q={rng.choice(WORDS)}", 0.5, {"p95": 1000, "p99": 2000}),
+    "list_books.deep_page": (
+        lambda rng, ids: f"/books?page={rng.randint(100, 500)}&sort_by=reviews", 0.5, {"p95": 500, "p99": 1000}),
+    "books.suggest": (
+        lambda rng, ids: f"/books/suggest?prefix=synthetic book {rng.randint(1, 99)}", 1.0, {"p95": 100, "p99": 200}),
+    "get_book": (lambda rng, ids: f"/books/{rng.choice(ids)}", 1.0, {"p95": 100, "p99": 200}),
+    "changes.report": (lambda rng, ids: "/changes/report", 0.02, {"p95": 5000, "p99": 10000}),
+}
+
+
+# ---------- Seeding ----------
+def seed(path: str, books: int, changes: int, change_days: int, seed_value: int = 42):
+    """Bulk-load books and change events straight into the SQLiteStorage schema."""
+    rng = random.Random(seed_value)
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("BEGIN")
+    urls = []
+    for start in range(0, books, 10_000):
+        rows, fts = [], []
+        for n in range(start, min(start + 10_000, books)):
+            doc = synthetic_book(n, rng)
+            doc["name_key"] = name_search_key(doc["name"])
+            urls.append((doc["source_url"], doc["category"], doc["price_including_tax"]["amount"]))
+            rows.append((n + 1, f"{n:024x}", doc["source_url"], doc["name_key"], doc["category"], doc["rating"],
+                         doc["price_including_tax"]["amount"], doc["number_of_reviews"], _dumps(doc)))
+            fts.append((n + 1, doc["name"], doc["category"], doc["description"]))
+        conn.executemany(
+            "INSERT INTO books (rowid, id, source_url, name_key, category, rating, price, number_of_reviews, doc) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        try:
+            conn.executemany("INSERT INTO books_fts (rowid, name, category, description) VALUES (?, ?, ?, ?)", fts)
+        except sqlite3.OperationalError:
+            pass  # built without FTS5
+    now = datetime.now(timezone.utc)
+    span = change_days * 86400
+    # oldest first, so seq order follows timestamps like real inserts
+    offsets = sorted((rng.random() * span for _ in range(changes)), reverse=True)
+    for start in range(0, changes, 50_000):
+        rows = []
+        for i in range(start, min(start + 50_000, changes)):
+            url, category, price = rng.choice(urls)
+            timestamp = now - timedelta(seconds=offsets[i])
+            new_price = round(price + rng.uniform(-5, 5), 2)
+            doc = {"source_url": url, "change_type": "update", "category": category, "timestamp": timestamp,
+                   "changes": {"price_including_tax": {"old": {"amount": price, "currency": "£"},
+                                                       "new": {"amount": new_price, "currency": "£"}}}}
+            rows.append((f"{i:024x}", url, "update", _ts(timestamp), _dumps(doc)))
+        conn.executemany("INSERT INTO book_changes (id, source_url, change_type, timestamp, doc) VALUES (?, ?, ?, ?, ?)", rows)
+    conn.execute("COMMIT")
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def seeded_counts(path: str):
+    conn = sqlite3.connect(path)
+    try:
+        return tuple(conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("books", "book_changes"))
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+async def prepare_db(path: str, books: int, changes: int, change_days: int, reseed: bool):
+    if not reseed and os.path.exists(path) and seeded_counts(path) == (books, changes):
+        print(f"reusing {path}")
+        return
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    storage = SQLiteStorage(path=path)
+    await storage.ensure_indexes()  # creates the schema
+    await storage.close()
+    start = time.perf_counter()
+    seed(path, books, changes, change_days)
+    print(f"seeded {books} books / {changes} changes in {time.perf_counter() - start:.1f}s -> {path}")
+
+
+# ---------- Load ----------
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, max(math.ceil(p / 100 * len(sorted_values)) - 1, 0))]
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, requests: int, concurrency: int, ids: List[str]) -> Dict:
+    build = SCENARIOS[name][0]
+    rng = random.Random(name)
+    latencies: List[float] = []
+    errors: Dict[int, int] = {}
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            path = build(rng, ids)
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors[response.status_code] = errors.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        **{f"p{p}": round(percentile(latencies, p), 2) for p in (50, 95, 99)},
+        "max": round(latencies[-1], 2) if latencies else None,
+    }
+
+
+def check_slo(result: Dict, slo: Dict[str, float]) -> List[str]:
+    failures = [f"{metric} {result[metric]:.1f}ms > {limit:g}ms" for metric, limit in slo.items() if result[metric] > limit]
+    if result["errors"]:
+        failures.append(f"errors {result['errors']}")
+    return failures
+
+
+def parse_slo_overrides(values: List[str]) -> Dict[str, Dict[str, float]]:
+    """`scenario:p95=50,p99=120` -> {scenario: {p95: 50, p99: 120}}"""
+    overrides: Dict[str, Dict[str, float]] = {}
+    for value in values:
+        name, _, limits = value.partition(":")
+        if name not in SCENARIOS or not limits:
+            raise SystemExit(f"bad --slo {value!r} (scenarios: {', '.join(SCENARIOS)})")
+        for item in limits.split(","):
+            metric, _, ms = item.partition("=")
+            if metric not in ("p50", "p95", "p99"):
+                raise SystemExit(f"bad --slo metric {metric!r} (p50, p95, p99)")
+            overrides.setdefault(name, {})[metric] = float(ms)
+    return overrides
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--changes", type=int, default=1_000_000)
+    parser.add_argument("--change-days", type=int, default=90, help="change timestamps are spread over this many days")
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "book_crawler_load.db"))
+    parser.add_argument("--reseed", action="store_true")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario (scaled by its share)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--slo", action="append", default=[], help="override, e.g. get_book:p95=20,p99=40")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    await prepare_db(args.db, args.books, args.changes, args.change_days, args.reseed)
+    storage = SQLiteStorage(path=args.db)
+    slos = {name: dict(SCENARIOS[name][2]) for name in SCENARIOS}
+    for name, override in parse_slo_overrides(args.slo).items():
+        slos[name].update(override)
+
+    app.dependency_overrides[deps.get_mongo] = lambda: storage
+    app.dependency_overrides[get_api_key_header] = lambda: "load-test"
+    app.state.mongo = storage  # /changes/report reads app.state
+    results, failed = [], False
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load", timeout=None) as client:
+            # seeded book ids are the zero-padded hex of their number
+            rng = random.Random(7)
+            ids = [f"{rng.randrange(args.books):024x}" for _ in range(1000)]
+            print(f"{'scenario':<24}{'requests':>9}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  SLO")
+            for name in args.scenarios:
+                requests = max(int(args.requests * SCENARIOS[name][1]), 1)
+                result = await run_scenario(client, name, requests, args.concurrency, ids)
+                failures = check_slo(result, slos[name])
+                result.update(slo=slos[name], slo_failures=failures)
+                results.append(result)
+                failed = failed or bool(failures)
+                print(f"{name:<24}{result['requests']:>9}{result['rps']:>9}{result['p50']:>9}{result['p95']:>9}"
+                      f"{result['p99']:>9}{result['max']:>9}  {'FAIL ' + '; '.join(failures) if failures else 'ok'}")
+    finally:
+        app.dependency_overrides = {}
+        await storage.close()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"books": args.books, "changes": args.changes, "concurrency": args.concurrency, "results": results}, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -1,9 +1,9 @@
 # Common dependencies (DB, pagination)
 from fastapi import Request
-from database.storage import MongoStorage
+from database.base import StorageBackend
 
 
-async def get_mongo(request: Request) -> MongoStorage:
+async def get_mongo(request: Request) -> StorageBackend:
     return request.app.state.mongo
 
 # while app.state.mongo makes the client globally available, using Depends(get_mongo) 
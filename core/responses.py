@@ -0,0 +1,30 @@
+# JSON responses encoded with orjson
+from typing import Any
+import orjson
+from bson import ObjectId
+from starlette.responses import JSONResponse
+
+
+# naive datetimes from storage are UTC; dict keys may be non-strings (e.g. rating counts)
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """orjson encoding that also handles Mongo types (ObjectId; datetime is native)."""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered by orjson.
+    Endpoints returning it directly skip FastAPI's response_model validation and
+    jsonable_encoder pass, so raw storage documents are encoded exactly once.
+    """
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
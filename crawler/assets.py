@@ -0,0 +1,252 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from io import BytesIO
+from typing import Optional, Set
+import httpx
+from database.base import StorageBackend
+from .streaming import ResponseTooLarge
+from .robots import RobotsCache
+from settings import (
+    ASSET_STORE,
+    ASSET_DIR,
+    ASSET_CONCURRENCY,
+    ASSET_RATE_PER_SECOND,
+    ASSET_QUEUE_SIZE,
+    ASSET_MAX_BYTES,
+    ASSET_THUMBNAIL_SIZE,
+    ASSET_THUMBNAIL_WORKERS,
+    CRAWLER_USER_AGENT,
+)
+from log.logger_config import get_logger
+try:
+    import PIL  # thumbnails are optional
+except ImportError:
+    PIL = None
+
+
+logging = get_logger(__name__)
+
+EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/gif": "gif", "image/webp": "webp"}
+
+
+def content_key(sha256: str, ext: str, prefix: str = "") -> str:
+    """Content-addressed path: <prefix>/ab/cd/<sha256>.<ext>"""
+    return "/".join(p for p in (prefix, sha256[:2], sha256[2:4], f"{sha256}.{ext}") if p)
+
+
+def make_thumbnail(data: bytes, size: int) -> bytes:
+    """JPEG thumbnail bounded to size x size. Runs in a worker process."""
+    from PIL import Image
+    with Image.open(BytesIO(data)) as img:
+        img.thumbnail((size, size))
+        out = BytesIO()
+        img.convert("RGB").save(out, format="JPEG", quality=85)
+        return out.getvalue()
+
+
+class LocalAssetStore:
+    """Content-addressed files under a local directory."""
+    def __init__(self, root: str = ASSET_DIR) -> None:
+        self.root = root
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, os.path.join(self.root, key))
+
+    async def put(self, key: str, data: bytes, content_type: Optional[str] = None):
+        await asyncio.to_thread(self._write, os.path.join(self.root, key), data)
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+class GridFSAssetStore:
+    """Content-addressed files in MongoDB GridFS (filename = key)."""
+    def __init__(self, db, bucket_name: str = "assets") -> None:
+        from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name)
+
+    async def exists(self, key: str) -> bool:
+        return bool(await self.bucket.find({"filename": key}).to_list(length=1))
+
+    async def put(self, key: str, data: bytes, content_type: Optional[str] = None):
+        await self.bucket.upload_from_stream(key, data, metadata={"content_type": content_type})
+
+
+def build_asset_store(mongo: StorageBackend, kind: str = ASSET_STORE):
+    if kind == "gridfs":
+        db = getattr(mongo, "db", None)
+        if db is None:
+            raise ValueError("ASSET_STORE=gridfs requires the mongo storage backend")
+        return GridFSAssetStore(db)
+    return LocalAssetStore()
+
+
+class RateLimiter:
+    """Spaces calls at least 1 / rate seconds apart (0 = unlimited)."""
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+
+class AssetPipeline:
+    """
+    Optional cover image pipeline running next to a crawl.
+    - `submit` never blocks: images go to a bounded queue and are dropped (and picked up on the
+      next crawl) when it is full, so asset work cannot slow down the text crawl.
+    - Own HTTP client, worker pool and rate limit, separate from the crawler's; requests carry
+      the crawler's User-Agent and go through its robots.txt cache.
+    - Conditional requests (ETag / Last-Modified) skip unchanged images.
+    - Images are stored content-addressed by sha256, so identical covers are stored once.
+    - Thumbnails are generated in a process pool when Pillow is installed.
+    - One `book_assets` record per image URL links it to its stored file.
+    """
+    def __init__(self, mongo: StorageBackend, store=None,
+                 concurrency: int = ASSET_CONCURRENCY,
+                 rate_per_second: float = ASSET_RATE_PER_SECOND,
+                 queue_size: int = ASSET_QUEUE_SIZE,
+                 max_bytes: int = ASSET_MAX_BYTES,
+                 thumbnail_size: int = ASSET_THUMBNAIL_SIZE,
+                 robots: Optional[RobotsCache] = None) -> None:
+        self.mongo = mongo
+        self.store = store or build_asset_store(mongo)
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate_per_second)
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.client = httpx.AsyncClient(timeout=20, headers={"User-Agent": CRAWLER_USER_AGENT})
+        self.robots = robots
+        self.stats = {'submitted': 0, 'dropped': 0, 'downloaded': 0, 'not_modified': 0, 'deduplicated': 0, 'failed': 0}
+        self._seen: Set[str] = set()
+        self._stored: Set[str] = set()
+        self._workers = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        if PIL is not None and self.thumbnail_size:
+            self._pool = ProcessPoolExecutor(max_workers=ASSET_THUMBNAIL_WORKERS)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def submit(self, source_url: str, image_url: Optional[str]):
+        """Queue a book's cover image without waiting."""
+        if not image_url or image_url in self._seen:
+            return
+        try:
+            self.queue.put_nowait((source_url, image_url))
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            return
+        self._seen.add(image_url)
+        self.stats['submitted'] += 1
+
+    async def close(self):
+        """Finish queued images, then stop the workers."""
+        if self._workers:
+            await self.queue.join()
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+        await self.client.aclose()
+        logging.info(f"Asset pipeline finished: {self.stats}")
+
+    async def _worker(self):
+        while True:
+            source_url, image_url = await self.queue.get()
+            try:
+                await self.fetch(source_url, image_url)
+            except Exception as e:
+                self.stats['failed'] += 1
+                logging.warning(f"Asset fetch failed for {image_url}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _exists(self, key: str) -> bool:
+        self._stored.add(key)
+        return await self.store.exists(key)
+
+    async def _read_capped(self, response: httpx.Response) -> bytes:
+        """Read the body, giving up once it passes `max_bytes` (never buffers more than that)."""
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            raise ResponseTooLarge(f"image declares {declared} bytes (max {self.max_bytes})")
+        data = bytearray()
+        async for chunk in response.aiter_bytes():
+            data += chunk
+            if len(data) > self.max_bytes:
+                raise ResponseTooLarge(f"image exceeded {self.max_bytes} bytes")
+        return bytes(data)
+
+    async def fetch(self, source_url: str, image_url: str):
+        asset = await self.mongo.get_asset(image_url) or {}
+        headers = {}
+        if asset.get("etag"):
+            headers["If-None-Match"] = asset["etag"]
+        if asset.get("last_modified"):
+            headers["If-Modified-Since"] = asset["last_modified"]
+
+        if self.robots:
+            await self.robots.check(image_url, self.client)
+        await self.limiter.wait()
+        async with self.client.stream("GET", image_url, headers=headers) as response:
+            now = datetime.now(timezone.utc)
+            if response.status_code == 304:
+                self.stats['not_modified'] += 1
+                await self.mongo.upsert_asset(image_url, {"checked_at": now})
+                return
+            response.raise_for_status()
+            data = await self._read_capped(response)
+
+        sha256 = hashlib.sha256(data).hexdigest()
+        content_type = response.headers.get("content-type", "").split(";")[0].strip()
+        key = content_key(sha256, EXTENSIONS.get(content_type, "bin"))
+        thumbnail_key = content_key(sha256, "jpg", prefix="thumbs") if self._pool is not None else None
+        # claim the key before awaiting so concurrent workers never store the same content twice
+        if key in self._stored or await self._exists(key):
+            self.stats['deduplicated'] += 1
+        else:
+            try:
+                await self.store.put(key, data, content_type)
+            except Exception:
+                self._stored.discard(key)
+                raise
+            self.stats['downloaded'] += 1
+        if thumbnail_key and not await self.store.exists(thumbnail_key):
+            loop = asyncio.get_running_loop()
+            thumbnail = await loop.run_in_executor(self._pool, make_thumbnail, data, self.thumbnail_size)
+            await self.store.put(thumbnail_key, thumbnail, "image/jpeg")
+
+        await self.mongo.upsert_asset(image_url, {
+            "image_url": image_url,
+            "source_url": source_url,
+            "sha256": sha256,
+            "content_type": content_type,
+            "size": len(data),
+            "key": key,
+            "thumbnail_key": thumbnail_key,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "fetched_at": now,
+            "checked_at": now,
+        })
@@ -0,0 +1,51 @@
+"""
+Dry-run reporting. A dry run compares against the live collections through
+ReadOnlyStorage, not a point-in-time snapshot: a real crawl or API write landing
+during the run can show up in (or vanish from) the report partway through.
+"""
+from typing import Dict, Any, List, Optional
+from settings import DRY_RUN_MAX_DIFFS
+
+
+class DryRunReport:
+    """
+    Collects what a dry-run crawl would have written.
+    Takes the place of the change event bus (`publish`), so the detector's would-be
+    change events arrive here instead of reaching subscribers. Only the first
+    `max_diffs` diffs and failures are kept; counts cover everything.
+    """
+    def __init__(self, max_diffs: int = DRY_RUN_MAX_DIFFS) -> None:
+        self.max_diffs = max_diffs
+        self.diffs: List[Dict[str, Any]] = []
+        self.failures: List[Dict[str, Any]] = []
+        self.field_changes: Dict[str, int] = {}
+        self.failure_classes: Dict[str, int] = {}
+        self.truncated = 0
+
+    def publish(self, event: Dict[str, Any]):
+        changes = event.get('changes') or {}
+        for field in changes:
+            self.field_changes[field] = self.field_changes.get(field, 0) + 1
+        if len(self.diffs) >= self.max_diffs:
+            self.truncated += 1
+            return
+        self.diffs.append({'source_url': event['source_url'], 'change_type': event['change_type'], 'changes': changes})
+
+    def record_failure(self, failure: Dict[str, Any]):
+        error_class = failure['error_class']
+        self.failure_classes[error_class] = self.failure_classes.get(error_class, 0) + 1
+        if len(self.failures) < self.max_diffs:
+            self.failures.append({k: failure.get(k) for k in ('source_url', 'error_class', 'status_code', 'error')})
+
+    def to_dict(self, run: Dict[str, Any], suppressed: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """The report: the run record (counts, timings) plus diffs, failures and the writes skipped."""
+        return {
+            **run,
+            'dry_run': True,
+            'field_changes': dict(sorted(self.field_changes.items(), key=lambda kv: -kv[1])),
+            'diffs': self.diffs,
+            'diffs_truncated': self.truncated,
+            'failure_classes': self.failure_classes,
+            'failures': self.failures,
+            'suppressed_writes': dict(sorted((suppressed or {}).items())),
+        }
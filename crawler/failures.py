@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+import httpx
+from lxml import etree
+from pydantic import ValidationError
+from database.base import StorageBackend
+from .streaming import ResponseTooLarge
+from .robots import RobotsDisallowed, RobotsUnavailable
+from settings import (
+    CRAWLER_RETRY_MAX_ATTEMPTS,
+    CRAWLER_RETRY_BACKOFF_SECONDS,
+    CRAWLER_RETRY_MAX_BACKOFF_SECONDS,
+)
+
+
+class ParseError(Exception):
+    """A page was fetched but the required fields could not be extracted."""
+
+
+# error classes stored on crawl_failures entries
+TIMEOUT = "timeout"
+HTTP_4XX = "4xx"
+HTTP_5XX = "5xx"
+NETWORK = "network"
+PARSE = "parse"
+TOO_LARGE = "too_large"
+ROBOTS = "robots"
+ROBOTS_UNAVAILABLE = "robots_unavailable"
+OTHER = "other"
+
+# client errors that usually go away on their own
+RETRYABLE_STATUS = {408, 425, 429}
+
+
+def classify_error(exc: Exception) -> str:
+    if isinstance(exc, httpx.TimeoutException):
+        return TIMEOUT
+    if isinstance(exc, httpx.HTTPStatusError):
+        return HTTP_5XX if exc.response.status_code >= 500 else HTTP_4XX
+    if isinstance(exc, httpx.TransportError):
+        return NETWORK
+    if isinstance(exc, ResponseTooLarge):
+        return TOO_LARGE
+    if isinstance(exc, RobotsDisallowed):
+        return ROBOTS
+    if isinstance(exc, RobotsUnavailable):
+        return ROBOTS_UNAVAILABLE
+    if isinstance(exc, (ParseError, etree.LxmlError, ValidationError)):
+        return PARSE
+    return OTHER
+
+
+def is_transient(exc: Exception) -> bool:
+    """Network-level errors that may succeed on an immediate (inline) retry."""
+    error_class = classify_error(exc)
+    if error_class == HTTP_4XX:
+        return exc.response.status_code in RETRYABLE_STATUS
+    return error_class in (TIMEOUT, NETWORK, HTTP_5XX)
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Errors the failure queue retries later (everything except permanent ones)."""
+    error_class = classify_error(exc)
+    if error_class == HTTP_4XX:
+        return exc.response.status_code in RETRYABLE_STATUS
+    return error_class not in (TOO_LARGE, ROBOTS)
+
+
+def retry_delay(attempts: int, base_seconds: float, max_seconds: float) -> timedelta:
+    """Exponential backoff after the given number of failed attempts."""
+    return timedelta(seconds=min(base_seconds * 2 ** max(attempts - 1, 0), max_seconds))
+
+
+class FailureQueue:
+    """
+    Failed book fetches for one site, kept in `crawl_failures` (one entry per URL).
+    - Each entry has an error class, the attempt count and `next_retry_at` (exponential backoff).
+    - Permanent errors (most 4xx, oversized pages, robots.txt disallowed) and URLs that have used up
+      their attempts get no `next_retry_at` and are kept for inspection only.
+    - A `RobotsUnavailable` result (robots.txt could not be fetched) is transient and retried with backoff.
+    - Successful fetches remove the URL's entry.
+    """
+    def __init__(self, mongo: StorageBackend, site_key: str,
+                 max_attempts: int = CRAWLER_RETRY_MAX_ATTEMPTS,
+                 backoff_seconds: float = CRAWLER_RETRY_BACKOFF_SECONDS,
+                 max_backoff_seconds: float = CRAWLER_RETRY_MAX_BACKOFF_SECONDS) -> None:
+        self.mongo = mongo
+        self.site_key = site_key
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._known: Dict[str, Dict[str, Any]] = {}
+
+    async def load(self):
+        """Load this site's existing failures (needed for attempt counts and resolving)."""
+        failures = await self.mongo.get_crawl_failures(self.site_key)
+        self._known = {f["source_url"]: f for f in failures}
+
+    async def record(self, url: str, exc: Exception, listing_fp: Optional[str] = None) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        previous = self._known.get(url, {})
+        attempts = previous.get("attempts", 0) + 1
+        error_class = classify_error(exc)
+        retry = is_retryable(exc) and attempts < self.max_attempts
+        failure = {
+            "source_url": url,
+            "site_key": self.site_key,
+            "error_class": error_class,
+            "error": str(exc) or exc.__class__.__name__,
+            "status_code": exc.response.status_code if isinstance(exc, httpx.HTTPStatusError) else None,
+            "attempts": attempts,
+            "first_failed_at": previous.get("first_failed_at") or now,
+            "last_failed_at": now,
+            "next_retry_at": now + retry_delay(attempts, self.backoff_seconds, self.max_backoff_seconds) if retry else None,
+            "listing_fingerprint": listing_fp or previous.get("listing_fingerprint"),
+        }
+        self._known[url] = failure
+        await self.mongo.upsert_crawl_failure(url, failure)
+        return failure
+
+    async def resolve(self, url: str):
+        if self._known.pop(url, None) is not None:
+            await self.mongo.delete_crawl_failure(url)
+
+    async def due(self, limit: int = 0) -> List[Dict[str, Any]]:
+        """Failures whose backoff has elapsed, earliest first."""
+        return await self.mongo.get_crawl_failures(self.site_key, due_before=datetime.now(timezone.utc), limit=limit)
@@ -25,7 +25,7 @@ class Book(BaseModel):
     rating: Optional[str]
     source_url: HttpUrl
     crawl_timestamp: datetime = Field(default_factory=get_current_time_utc)
-    status: str = Field(default="new"), # new, fetched, failed
+    status: str = Field(default="new"), # new, fetched (failed fetches are kept in crawl_failures)
     
     class Config:
         json_schema_extra = {
@@ -0,0 +1,187 @@
+import asyncio
+import re
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+import httpx
+from log.logger_config import get_logger
+from utils.single_flight import SingleFlight
+from settings import (
+    CRAWLER_USER_AGENT,
+    ROBOTS_TTL_SECONDS,
+    CRAWLER_HOST_DELAY,
+    CRAWLER_MAX_CRAWL_DELAY,
+)
+
+
+logging = get_logger(__name__)
+
+# robots.txt that could not be fetched because of a server / network error is treated as
+# "disallow everything" (RFC 9309) and re-fetched sooner than a successful one
+ERROR_TTL_SECONDS = 300
+
+
+class RobotsDisallowed(Exception):
+    """robots.txt does not allow fetching this URL."""
+
+
+class RobotsUnavailable(Exception):
+    """robots.txt could not be fetched (5xx / network error); nothing on the host is fetched until it can."""
+
+
+class RobotsRules:
+    """
+    Allow / disallow rules of one robots.txt group, pre-sorted for matching.
+    Longest matching pattern wins, ties go to allow (RFC 9309). Plain patterns are
+    prefix checks; only patterns with `*` or `$` are compiled to regexes.
+    """
+    def __init__(self, rules: List[Tuple[str, bool]], crawl_delay: Optional[float] = None) -> None:
+        ordered = sorted(rules, key=lambda r: (len(r[0]), r[1]), reverse=True)
+        self._matchers: List[Tuple[Union[str, re.Pattern], bool]] = [
+            (self._compile(pattern), allow) for pattern, allow in ordered
+        ]
+        self.crawl_delay = crawl_delay
+
+    @staticmethod
+    def _compile(pattern: str) -> Union[str, re.Pattern]:
+        if "*" not in pattern and not pattern.endswith("$"):
+            return pattern
+        anchored = pattern.endswith("$")
+        body = re.escape(pattern[:-1] if anchored else pattern).replace(r"\*", ".*")
+        return re.compile(body + ("$" if anchored else ""))
+
+    def allowed(self, path: str) -> bool:
+        if path == "/robots.txt":
+            return True
+        for matcher, allow in self._matchers:
+            if matcher.match(path) if isinstance(matcher, re.Pattern) else path.startswith(matcher):
+                return allow
+        return True
+
+
+ALLOW_ALL = RobotsRules([])
+
+
+def parse_robots(text: str, user_agent: str) -> RobotsRules:
+    """Rules for `user_agent` (its most specific group, else `*`) from a robots.txt body."""
+    product = user_agent.split("/")[0].strip().lower()
+    groups: List[Tuple[List[str], List[Tuple[str, bool]], List[float]]] = []
+    agents: List[str] = []
+    in_agents = False
+    for raw in text.splitlines():
+        line = raw.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        key, value = (part.strip() for part in line.split(":", 1))
+        key = key.lower()
+        if key == "user-agent":
+            if not in_agents:
+                agents = []
+                groups.append((agents, [], []))
+                in_agents = True
+            agents.append(value.lower())
+            continue
+        in_agents = False
+        if not groups:
+            continue
+        if key in ("allow", "disallow") and value:
+            groups[-1][1].append((value, key == "allow"))
+        elif key == "crawl-delay":
+            try:
+                groups[-1][2].append(float(value))
+            except ValueError:
+                pass
+
+    # a group naming our product token (case-insensitive equality, RFC 9309) beats `*`;
+    # groups for the same token are merged
+    best, rules, delays = -1, [], []
+    for group_agents, group_rules, group_delays in groups:
+        for agent in group_agents:
+            score = 1 if agent == product else (0 if agent == "*" else -1)
+            if score > best:
+                best, rules, delays = score, list(group_rules), list(group_delays)
+            elif score == best and score >= 0:
+                rules += group_rules
+                delays += group_delays
+    return RobotsRules(rules, crawl_delay=max(delays) if delays else None)
+
+
+class RobotsCache:
+    """Per-host robots.txt rules with a TTL; each host's file is fetched at most once at a time."""
+    def __init__(self, user_agent: str, ttl: float = ROBOTS_TTL_SECONDS) -> None:
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self._rules: Dict[str, Tuple[Union[RobotsRules, str], float]] = {}
+        self._fetching = SingleFlight()
+
+    def clear(self):
+        self._rules.clear()
+
+    async def get(self, url: str, client: httpx.AsyncClient) -> RobotsRules:
+        """The host's rules; raises RobotsUnavailable while its robots.txt cannot be fetched."""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        cached = self._rules.get(origin)
+        if not (cached and cached[1] > time.monotonic()):
+            cached = await self._fetching.do(origin, lambda: self._refresh(origin, client))
+        rules = cached[0]
+        if isinstance(rules, str):
+            raise RobotsUnavailable(rules)
+        return rules
+
+    async def check(self, url: str, client: httpx.AsyncClient) -> RobotsRules:
+        """The host's rules; raises RobotsDisallowed when they do not allow `url`."""
+        rules = await self.get(url, client)
+        parts = urlsplit(url)
+        if not rules.allowed(parts.path + (f"?{parts.query}" if parts.query else "") or "/"):
+            raise RobotsDisallowed(f"robots.txt disallows {url}")
+        return rules
+
+    async def _refresh(self, origin: str, client: httpx.AsyncClient) -> Tuple[Union[RobotsRules, str], float]:
+        rules, ttl = await self._fetch(origin, client)
+        self._rules[origin] = (rules, time.monotonic() + ttl)
+        return self._rules[origin]
+
+    async def _fetch(self, origin: str, client: httpx.AsyncClient) -> Tuple[Union[RobotsRules, str], float]:
+        """Rules and their TTL; an error message instead of rules when robots.txt is unavailable."""
+        try:
+            response = await client.get(f"{origin}/robots.txt", follow_redirects=True)
+        except httpx.HTTPError as e:
+            logging.warning(f"robots.txt unreachable for {origin}: {e}")
+            return f"robots.txt unreachable for {origin}: {e}", ERROR_TTL_SECONDS
+        if response.status_code >= 500:
+            logging.warning(f"robots.txt for {origin} returned {response.status_code}")
+            return f"robots.txt for {origin} returned {response.status_code}", ERROR_TTL_SECONDS
+        if response.status_code >= 400:
+            return ALLOW_ALL, self.ttl
+        return parse_robots(response.text, self.user_agent), self.ttl
+
+
+class HostScheduler:
+    """
+    Per-host request spacing. Each call reserves the host's next free slot without holding
+    a lock, so waiting on one slow host never delays requests to other hosts.
+    """
+    def __init__(self, default_delay: float = CRAWLER_HOST_DELAY, max_delay: float = CRAWLER_MAX_CRAWL_DELAY) -> None:
+        self.default_delay = default_delay
+        self.max_delay = max_delay
+        self._next: Dict[str, float] = {}
+
+    def clear(self):
+        self._next.clear()
+
+    async def wait(self, host: str, delay: Optional[float] = None):
+        interval = min(max(delay or 0.0, self.default_delay), self.max_delay)
+        if interval <= 0:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next.get(host, now))
+        self._next[host] = slot + interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# shared by every crawler (and the asset pipeline) in the process, so concurrent crawls,
+# resumes, dry runs and retry passes stay within one per-host budget
+robots_cache = RobotsCache(CRAWLER_USER_AGENT)
+host_scheduler = HostScheduler()
@@ -1,70 +1,272 @@
 import asyncio
-from typing import Dict, Any, List, Optional
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Union
+from urllib.parse import urlsplit
 import httpx
-from lxml import html
 from .models import Book
-from database.storage import MongoStorage
-from .utils import retry_async, parse_price
+from database.base import StorageBackend
+from .utils import retry_async, peak_rss_mb, normalize_url
+from .streaming import read_html_tree
+from .failures import FailureQueue, is_transient
+from .assets import AssetPipeline
+from .robots import robots_cache, host_scheduler
+from .dry_run import DryRunReport
+from database.read_only import ReadOnlyStorage
+from .site_config import SitePlan, compile_site_config
 from utils.change_detection import BookChangeDetector
+from utils.near_duplicates import NearDuplicateIndex, book_signature
+from utils.crawl_runs import new_run_id, build_run_record
+from utils.single_flight import SingleFlight
+from log.logger_config import get_logger
+from settings import (
+    CRAWLER_MAX_BODY_BYTES,
+    CRAWLER_EARLY_STOP,
+    CRAWLER_LISTING_DELTA,
+    CRAWLER_MAX_IN_FLIGHT,
+    CRAWLER_QUEUE_SIZE,
+    CRAWLER_INLINE_RETRIES,
+    CRAWLER_RETRY_CONCURRENCY,
+    CRAWLER_RETRY_BATCH,
+    ASSETS_ENABLED,
+    CRAWLER_USER_AGENT,
+    ROBOTS_ENABLED,
+    NEAR_DUP_ENABLED,
+)
+
+
+logging = get_logger(__name__)
+
+
+# page fetches in flight across every crawler in the process (e.g. a resume or dry run
+# overlapping a running crawl), keyed by normalized URL
+FETCHES = SingleFlight()
+
+# optional Book fields, filled from the site config's detail extractors
+EMPTY_BOOK_FIELDS = dict.fromkeys([
+    'description', 'category', 'price_including_tax', 'price_excluding_tax',
+    'availability', 'number_of_reviews', 'image_url', 'rating',
+])
 
 
 class AsyncBookCrawler:
-    def __init__(self, site_key: str, site_config: Dict[str, Any], mongo: MongoStorage, concurrency: int = 10):
+    def __init__(self, site_key: str, site_config: Union[SitePlan, Dict[str, Any]], mongo: StorageBackend, concurrency: int = 10, planner=None, listing_delta: bool = CRAWLER_LISTING_DELTA,
+                 assets: Optional[AssetPipeline] = None, dry_run: bool = False):
         self.site_key = site_key
-        self.config = site_config
+        # compiled extraction plan; raw (YAML / JSON) configs are validated and compiled here
+        self.plan = site_config if isinstance(site_config, SitePlan) else compile_site_config(site_config, source=site_key)
+        # dry run: fetch, parse and compare as usual, but every storage write is dropped and the
+        # outcome (counts, diffs, timings) goes to `self.report` instead
+        self.dry_run = dry_run
+        self.dry_run_report = DryRunReport() if dry_run else None
+        self.report: Optional[Dict[str, Any]] = None
+        if dry_run:
+            mongo = ReadOnlyStorage(mongo)
         self.mongo = mongo
         self.sem = asyncio.Semaphore(concurrency) # It's a crucial tool for limiting concurrency in asynchronous programming.
-        self.client = httpx.AsyncClient(timeout=20)
+        self.client = httpx.AsyncClient(timeout=20, headers={"User-Agent": CRAWLER_USER_AGENT})
+        # politeness: robots.txt rules per host, and per-host spacing for Crawl-delay (process-wide)
+        self.robots = robots_cache if ROBOTS_ENABLED else None
+        self.hosts = host_scheduler
         self._stop = False
-        self.detector = BookChangeDetector(mongo)
+        self.near_duplicates = NEAR_DUP_ENABLED
+        self.detector = BookChangeDetector(mongo, near_duplicates=NearDuplicateIndex(mongo) if NEAR_DUP_ENABLED else None,
+                                           dry_run=dry_run, **({'bus': self.dry_run_report} if dry_run else {}))
+        # optional RecrawlPlanner: skip known books that are not due yet
+        self.planner = planner
+        # streamed fetching: cap body size, optionally stop once the needed markup was parsed
+        self.max_body_bytes = CRAWLER_MAX_BODY_BYTES
+        early_stop = self.plan.early_stop if CRAWLER_EARLY_STOP else {}
+        self.catalog_stop_after = early_stop.get('catalog')
+        self.detail_stop_after = early_stop.get('detail')
+        # listing-delta mode: only fetch detail pages whose catalog card is new or changed
+        self.listing_delta = listing_delta
+        # normalized book URLs already queued in this run
+        self._seen_books: set = set()
+        self.stats = {'pages': 0, 'books_fetched': 0, 'books_skipped': 0, 'books_deduped': 0, 'books_failed': 0, 'retried': 0,
+                      'recovered': 0, 'new': 0, 'updated': 0, 'unchanged': 0, 'duplicate': 0,
+                      'peak_in_flight': 0, 'peak_rss_mb': None}
+        # seconds per stage; fetch / parse / store are summed over concurrent books
+        self.timings = {'catalog_fetch_s': 0.0, 'book_fetch_s': 0.0, 'parse_s': 0.0, 'store_s': 0.0,
+                        'pages_s': 0.0, 'retry_s': 0.0}
+        # every crawl writes one immutable crawl_runs record; book and change writes carry its id
+        self.run_id = new_run_id()
+        self.run: Optional[Dict[str, Any]] = None
+        self._run_error: Optional[str] = None
+        # bounded worker pool: at most `max_in_flight` books (HTML buffer + parsed tree + Book)
+        # are processed at once and at most `queue_size` URLs wait; the catalog producer blocks beyond that
+        self.max_in_flight = CRAWLER_MAX_IN_FLIGHT or concurrency
+        self.queue_size = CRAWLER_QUEUE_SIZE or 2 * self.max_in_flight
+        self._in_flight = 0
+        # failed books go to crawl_failures and are retried in a separate pass, not inline
+        self.failures = FailureQueue(mongo, site_key)
+        self.inline_retries = CRAWLER_INLINE_RETRIES
+        self.retry_concurrency = CRAWLER_RETRY_CONCURRENCY
+        # optional cover image downloads on their own workers (see crawler/assets.py)
+        self.assets = None if dry_run else (assets if assets is not None else (AssetPipeline(mongo, robots=self.robots) if ASSETS_ENABLED else None))
         
     async def close(self):
         await self.client.aclose()
     
     async def crawl(self, resume: bool = False):
+        started_at = datetime.now(timezone.utc)
+        self.detector.run_id = self.run_id
+        try:
+            await self._crawl(resume)
+        except Exception as e:
+            self._run_error = self._run_error or str(e)
+            raise
+        finally:
+            # the run covers pages and retries; the image backlog drains afterwards so it
+            # does not count towards the run's duration / throughput
+            await self._record_run(started_at, resume)
+            await self._drain_assets()
+
+    async def _drain_assets(self):
+        if not self.assets:
+            return
+        started = time.perf_counter()
+        await self.assets.close()
+        self.stats['assets'] = {**self.assets.stats, 'drain_s': round(time.perf_counter() - started, 3)}
+
+    async def _crawl(self, resume: bool):
         await self.mongo.ensure_indexes()
+        if self.planner:
+            await self.planner.load()
+        await self.failures.load()
         state = await self.mongo.get_state(self.site_key) if resume else None
         
         if state and resume:
-            page = state.get('last_page', self.config['pagination'].get('start_page', 1))
+            page = state.get('last_page', self.plan.start_page)
             print(f"Resuming from page {page}")
         else:
-            page = self.config['pagination'].get('start_page', 1)
+            page = self.plan.start_page
         
-        max_pages = self.config['pagination'].get("max_pages", None)
+        max_pages = self.plan.max_pages
+        if self.assets:
+            self.assets.start()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.max_in_flight)]
+        started = time.perf_counter()
+        try:
+            await self._crawl_pages(queue, page, max_pages)
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.timings['pages_s'] = time.perf_counter() - started
+
+        # end-of-crawl pass: this run's failures whose backoff elapsed, plus leftovers from earlier runs
+        if not self._stop and not self.dry_run:
+            started = time.perf_counter()
+            await self.retry_failures()
+            self.timings['retry_s'] = time.perf_counter() - started
+        self.stats['peak_rss_mb'] = peak_rss_mb()
+        print(f"Crawl finished: {self.stats}")
+
+    async def _record_run(self, started_at: datetime, resume: bool):
+        """Write this crawl's immutable crawl_runs record (also for stopped / failed crawls)."""
+        status = 'failed' if self._run_error else ('stopped' if self._stop else 'completed')
+        self.run = build_run_record(
+            self.run_id, self.site_key, started_at, datetime.now(timezone.utc), status,
+            self.stats, self.timings, options={'resume': resume, 'listing_delta': self.listing_delta,
+                                               'planner': bool(self.planner), 'dry_run': self.dry_run},
+            error=self._run_error,
+        )
+        if self.dry_run:
+            self.report = self.dry_run_report.to_dict(self.run, self.mongo.suppressed)
+            return
+        try:
+            await self.mongo.insert_crawl_run(self.run)
+        except Exception as e:
+            print(f"Could not record crawl run {self.run_id}: {e}")
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            url, listing_fp = await queue.get()
+            self._in_flight += 1
+            self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self._in_flight)
+            try:
+                if not await self._process_book(url, listing_fp=listing_fp):
+                    self.stats['books_failed'] += 1
+            except Exception:
+                # fetch failures are recorded by _process_book; anything else is a bug, keep the worker alive
+                logging.exception(f"Unexpected error processing {url}")
+                self.stats['books_failed'] += 1
+            finally:
+                self._in_flight -= 1
+                queue.task_done()
+
+    async def retry_failures(self):
+        """Retry due entries from the failure queue with their own (lower) concurrency."""
+        due = await self.failures.due(limit=CRAWLER_RETRY_BATCH)
+        if not due:
+            return
+        sem = asyncio.Semaphore(self.retry_concurrency)
+
+        async def retry(failure) -> bool:
+            async with sem:
+                if self._stop:
+                    return False
+                return await self._process_book(failure['source_url'], listing_fp=failure.get('listing_fingerprint'))
+
+        results = await asyncio.gather(*(retry(f) for f in due))
+        self.stats['retried'] += len(due)
+        self.stats['recovered'] += sum(results)
+
+    async def _crawl_pages(self, queue: asyncio.Queue, page: int, max_pages: Optional[int]):
         while not self._stop:
             # generate url
-            if self.config['pagination']['type'] == 'pattern':
-                url = self.config['pagination']['pattern'].format(page=page)
-            else:
-                # Link-based pagination not implemented in this project
-                break
+            url = self.plan.page_url(page)
             
+            started = time.perf_counter()
             try:
-                page_html = await retry_async(self._fetch_text, retries=3, url=url)
+                tree = await retry_async(self._fetch_tree, retries=3, retry_if=is_transient, url=url, stop_after=self.catalog_stop_after)
             except Exception as e:
                 # transient error for page - save state and break
+                self._run_error = f"catalog page {page}: {e}"
                 await self.mongo.save_state(self.site_key, {'last_page': page, 'failed': True, 'error': str(e)})
                 break
+            finally:
+                self.timings['catalog_fetch_s'] += time.perf_counter() - started
             
-            tree = html.fromstring(page_html)
-            book_cards = tree.cssselect(self.config['selectors']['book_card'])
+            book_cards = self.plan.cards(tree)
             if not book_cards:
                 # no more pages 
                 await self.mongo.save_state(self.site_key, {'last_page': page, 'done': True})
                 break
             
-            tasks = []
+            cards = []
             for card in book_cards:
-                link_el = card.cssselect(self.config['selectors']['book_link'])[0]
-                href = link_el.get('href')
-                # make absolute if necessary
-                make_abs = self.config.get('make_absolute')
-                book_url = make_abs(href) if callable(make_abs) else href
-                tasks.append(asyncio.create_task(self._process_book(book_url)))
-                
+                book_url = self.plan.link.extract(card, url)
+                if not book_url:
+                    continue
+                listing_fp = self._listing_fingerprint(card) if self.listing_delta else None
+                cards.append((book_url, listing_fp))
+            # one batched lookup per catalog page
+            stored_fps = await self.mongo.get_listing_fingerprints([u for u, _ in cards]) if self.listing_delta else {}
+            self.stats['pages'] += 1
+
+            # release the catalog page before waiting on its books
+            del tree, book_cards, card
+            for book_url, listing_fp in cards:
+                # a book linked from several catalog pages is processed once per run
+                key = normalize_url(book_url)
+                if key in self._seen_books:
+                    self.stats['books_deduped'] += 1
+                    continue
+                self._seen_books.add(key)
+                if not self._should_fetch(book_url, listing_fp, stored_fps):
+                    self.stats['books_skipped'] += 1
+                    continue
+                self.stats['books_fetched'] += 1
+                # blocks while the queue is full (backpressure)
+                await queue.put((book_url, listing_fp))
+
             # wait for page's books to finish
-            await asyncio.gather(*tasks, return_exceptions=True)
+            await queue.join()
             
             # save progress
             await self.mongo.save_state(self.site_key, {'last_page': page, 'done': False})
@@ -72,86 +274,102 @@ class AsyncBookCrawler:
             page += 1
             if max_pages and page > max_pages:
                 break
-    
+
+    def _should_fetch(self, url: str, listing_fp: Optional[str], stored_fps: Dict[str, str]) -> bool:
+        if self.listing_delta:
+            if stored_fps.get(url) != listing_fp:
+                # new book or price/availability/rating/title changed on the card
+                return True
+            # card unchanged: only re-fetch when the recrawl planner says it is due
+            return bool(self.planner) and self.planner.should_fetch(url)
+        return not self.planner or self.planner.should_fetch(url)
+
+    def _listing_fingerprint(self, card) -> str:
+        """Hash of the catalog card fields in the site config (e.g. title, price, availability, rating)."""
+        fields = {spec.name: spec.extract(card) for spec in self.plan.card_fields}
+        encoded = json.dumps(fields, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    async def _robots_delay(self, url: str) -> Optional[float]:
+        """Enforce robots.txt for `url`; returns the host's Crawl-delay."""
+        return (await self.robots.check(url, self.client)).crawl_delay if self.robots else None
+
+    async def _host_slot(self, url: str, delay: Optional[float]):
+        """
+        Wait for the host's next request slot. Taken once the semaphore is held, so the slot
+        is used right away instead of going out in a burst with other queued requests.
+        """
+        await self.hosts.wait(urlsplit(url).netloc, delay)
+
     async def _fetch_text(self, url: str) -> str:
+        return await FETCHES.do(('text', normalize_url(url)), lambda: self._get_text(url))
+
+    async def _get_text(self, url: str) -> str:
+        delay = await self._robots_delay(url)
         async with self.sem:
+            await self._host_slot(url, delay)
             response = await self.client.get(url)
             response.raise_for_status()
             return response.text
+
+    async def _fetch_tree(self, url: str, stop_after: Optional[str] = None):
+        """
+        Stream and incrementally parse an HTML page (size capped, optional early stop).
+        Concurrent fetches of the same page share one request and one (read-only) tree.
+        """
+        return await FETCHES.do(('tree', normalize_url(url), stop_after, self.max_body_bytes),
+                                lambda: self._get_tree(url, stop_after))
+
+    async def _get_tree(self, url: str, stop_after: Optional[str] = None):
+        delay = await self._robots_delay(url)
+        async with self.sem:
+            await self._host_slot(url, delay)
+            async with self.client.stream("GET", url) as response:
+                response.raise_for_status()
+                tree, _ = await read_html_tree(response, self.max_body_bytes, stop_after=stop_after)
+                return tree
         
-    async def _process_book(self, url: str):
+    async def _process_book(self, url: str, listing_fp: Optional[str] = None) -> bool:
+        """Fetch, parse and store one book; failures are recorded in the failure queue. Returns success."""
         try:
-            text = await retry_async(self._fetch_text, retries=3, url=url)
-            tree = html.fromstring(text)
-            
-            selectors = self.config["selectors"]
-            def safe_text(selector):
-                try:
-                    element = tree.cssselect(selector)
-                    if not element:
-                        return None 
-                    # if it is an element List, pick first and text_content
-                    first = element[0]
-                    return first.text_content().strip()
-                except Exception:
-                    return None
-
-            name = safe_text(selectors['name'])
-            description = safe_text(selectors['description'])
-            category = safe_text(selectors['category'])
-            price_incl = parse_price(safe_text(selectors.get('price_including_tax')))
-            price_excl = parse_price(safe_text(selectors.get('price_excluding_tax')))
-            availability = safe_text(selectors.get('availability'))
-            reviews = safe_text(selectors.get('number_of_reviews'))
-            
-            try:
-                reviews = int(reviews) if reviews else None 
-            except:
-                reviews = None
-            
-            # rating is encoded in class names like <p class="star-rating Three">
-            rating_element = tree.cssselect(selectors.get("rating"))
-            rating = None 
-            if rating_element:
-                classes = rating_element[0].get('class', '')
-                for c in classes.split():
-                    if c.lower() in ['one', 'two', 'three', 'four', 'five', 'zero']:
-                        rating  = c
+            started = time.perf_counter()
+            tree = await retry_async(self._fetch_tree, retries=self.inline_retries, retry_if=is_transient,
+                                     url=url, stop_after=self.detail_stop_after)
+            fetched = time.perf_counter()
+            self.timings['book_fetch_s'] += fetched - started
             
-            image_element = tree.cssselect(selectors.get('image'))
-            image_url = None 
-            if image_element:
-                src = image_element[0].get('src')
-                make_abs = self.config.get("make_absolute")
-                image_url = make_abs(src) if callable(make_abs) else src
-                
-            book = Book(
-                name=name or "",
-                description=description,
-                category=category,
-                price_including_tax=price_incl,
-                price_excluding_tax=price_excl,
-                availability=availability,
-                number_of_reviews=reviews,
-                image_url=image_url,
-                rating=rating,
-                source_url=url,
-                status="fetched"
-            )   
+            fields = self.plan.extract(tree, self.plan.detail_fields, page_url=url)
+            del tree
+            # book fields the site config does not extract are stored as None
+            book = Book(**{**EMPTY_BOOK_FIELDS, **fields}, source_url=url, status="fetched")
+            image_url = fields.get('image_url')
             # serialize book object
             mongo_document = book.model_dump(mode='json')
+            if listing_fp:
+                mongo_document['listing_fingerprint'] = listing_fp
+            if self.near_duplicates:
+                # MinHash signature + LSH bands of name and description, for relisted-book detection
+                mongo_document.update({'minhash': None, 'minhash_bands': [], **book_signature(mongo_document)})
+            stored = time.perf_counter()
+            self.timings['parse_s'] += stored - fetched
             # before update detect change
-            await self.detector.detect_and_update_changes(mongo_document)
-            # await self.mongo.upsert_book(mongo_document)
+            result = await self.detector.detect_and_update_changes(mongo_document)
+            self.stats[result] += 1
+            if self.planner and not self.dry_run:
+                await self.planner.record_fetch(url, result)
+            if listing_fp and result == 'unchanged':
+                # detector skips unchanged books; still remember the card we saw
+                await self.mongo.upsert_book({'source_url': url, 'listing_fingerprint': listing_fp, 'run_id': self.run_id})
+            self.timings['store_s'] += time.perf_counter() - stored
+            if self.assets:
+                self.assets.submit(url, image_url)
+            await self.failures.resolve(url)
+            return True
         except Exception as e:
-            # Save failed state for this URL
-            await self.mongo.upsert_book({
-                'source_url': url,
-                'status': 'failed',
-                'crawl_timestamp': Book().crawl_timestamp if False else __import__('datetime').datetime.utcnow(),
-                'raw_html': None,
-                'error': str(e)
-            })
+            failure = await self.failures.record(url, e, listing_fp)
+            if self.dry_run_report:
+                self.dry_run_report.record_failure(failure)
+            return False
     
     def stop(self):
         self._stop = True
\ No newline at end of file
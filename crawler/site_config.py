@@ -0,0 +1,287 @@
+"""
+Declarative site configs (YAML / JSON) compiled into extraction plans.
+
+A site file describes pagination, the catalog cards and the detail-page fields; every field
+is a typed extractor:
+
+    text             first match's text content
+    attr             an attribute of the first match (`attr`)
+    class_token_map  first class token found in `map` (e.g. "star-rating Three" -> "Three")
+    price            text parsed into {"amount", "currency"}
+    int              first integer in the text
+    url_join         attribute (`attr`, default href) resolved against `base` or the page url
+
+Configs are validated when compiled. A SitePlan only holds strings, so it pickles cheaply
+for worker processes; CSS selectors are translated lazily once per process.
+"""
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urljoin
+import yaml
+from cssselect import SelectorError
+from lxml import etree
+from lxml.cssselect import LxmlHTMLTranslator
+from .failures import ParseError
+from .models import Book
+from .utils import parse_price
+
+EXTRACTOR_TYPES = ("text", "attr", "class_token_map", "price", "int", "url_join")
+# set by the crawler itself, not extractable
+RESERVED_FIELDS = {"source_url", "crawl_timestamp", "status"}
+# detail fields are stored through the Book model, which would drop anything else
+BOOK_FIELDS = set(Book.model_fields) - RESERVED_FIELDS
+
+
+class SiteConfigError(ValueError):
+    """A site config failed validation; `errors` lists every problem found."""
+    def __init__(self, source: str, errors: List[str]) -> None:
+        super().__init__(f"{source}: " + "; ".join(errors))
+        self.source = source
+        self.errors = errors
+
+
+@lru_cache(maxsize=None)
+def _css_to_xpath(css: str) -> str:
+    return LxmlHTMLTranslator().css_to_xpath(css)
+
+
+def selector(css: str) -> etree.XPath:
+    """
+    XPath for a CSS selector. The CSS translation is cached per process; the XPath itself is
+    compiled per use (a few microseconds) because lxml cannot safely reuse XPath objects that
+    call extension functions (`:contains()`) across documents.
+    """
+    return etree.XPath(_css_to_xpath(css))
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    name: str
+    selector: str
+    type: str = "text"
+    attr: Optional[str] = None
+    map: Dict[str, str] = field(default_factory=dict)  # lower-cased token -> value
+    base: Optional[str] = None
+    required: bool = False
+
+    def extract(self, root, page_url: Optional[str] = None) -> Any:
+        matches = selector(self.selector)(root)
+        if not matches:
+            return None
+        el = matches[0]
+        if self.type == "class_token_map":
+            value = None
+            for token in (el.get("class") or "").split():
+                value = self.map.get(token.lower(), value)
+            return value
+        if self.type in ("attr", "url_join"):
+            raw = el.get(self.attr or "href")
+            if raw is None or self.type == "attr":
+                return raw
+            return urljoin(self.base or page_url or "", raw.strip())
+        text = el.text_content().strip()
+        if self.type == "price":
+            return parse_price(text)
+        if self.type == "int":
+            m = re.search(r"-?\d+", text.replace(",", ""))
+            return int(m.group(0)) if m else None
+        return text or None
+
+
+@dataclass(frozen=True)
+class SitePlan:
+    site_key: str
+    page_pattern: str
+    start_page: int
+    max_pages: Optional[int]
+    card_selector: str
+    link: FieldSpec
+    card_fields: Tuple[FieldSpec, ...]
+    detail_fields: Tuple[FieldSpec, ...]
+    early_stop: Dict[str, str]
+    raw: Dict[str, Any]  # the validated source config, as loaded
+
+    def page_url(self, page: int) -> str:
+        return self.page_pattern.format(page=page)
+
+    def cards(self, root) -> list:
+        return selector(self.card_selector)(root)
+
+    def extract(self, root, fields: Tuple[FieldSpec, ...], page_url: Optional[str] = None) -> Dict[str, Any]:
+        """Run the given extractors; raises ParseError when a required field is missing."""
+        out: Dict[str, Any] = {}
+        for spec in fields:
+            try:
+                value = spec.extract(root, page_url)
+            except Exception as e:
+                raise ParseError(f"field '{spec.name}': {e}") from e
+            if value is None and spec.required:
+                raise ParseError(f"required field '{spec.name}' not found at '{spec.selector}'")
+            out[spec.name] = value
+        return out
+
+
+def _field_spec(name: str, raw: Any, where: str, errors: List[str]) -> Optional[FieldSpec]:
+    if isinstance(raw, str):
+        raw = {"selector": raw}
+    if not isinstance(raw, dict):
+        errors.append(f"{where}.{name}: expected a selector string or a mapping")
+        return None
+    unknown = set(raw) - {"selector", "type", "attr", "map", "base", "required"}
+    if unknown:
+        errors.append(f"{where}.{name}: unknown keys {sorted(unknown)}")
+    css = raw.get("selector")
+    kind = raw.get("type", "text")
+    if not isinstance(css, str) or not css.strip():
+        errors.append(f"{where}.{name}: missing selector")
+        return None
+    try:
+        selector(css)
+    except SelectorError as e:
+        errors.append(f"{where}.{name}: invalid selector {css!r} ({e})")
+    if kind not in EXTRACTOR_TYPES:
+        errors.append(f"{where}.{name}: unknown type {kind!r} (expected one of {', '.join(EXTRACTOR_TYPES)})")
+    if kind == "attr" and not raw.get("attr"):
+        errors.append(f"{where}.{name}: type 'attr' needs 'attr'")
+    token_map = raw.get("map") or {}
+    if kind == "class_token_map" and (not isinstance(token_map, dict) or not token_map):
+        errors.append(f"{where}.{name}: type 'class_token_map' needs a non-empty 'map'")
+        token_map = {}
+    return FieldSpec(
+        name=name,
+        selector=css,
+        type=kind,
+        attr=raw.get("attr"),
+        map={str(k).lower(): str(v) for k, v in token_map.items()},
+        base=raw.get("base"),
+        required=bool(raw.get("required", False)),
+    )
+
+
+def _field_specs(raw: Any, where: str, errors: List[str]) -> Tuple[FieldSpec, ...]:
+    if not isinstance(raw, dict):
+        errors.append(f"{where}: expected a mapping of field name to extractor")
+        return ()
+    specs = (_field_spec(name, spec, where, errors) for name, spec in raw.items())
+    return tuple(s for s in specs if s is not None)
+
+
+def _section(raw: Dict[str, Any], key: str, errors: List[str]) -> Dict[str, Any]:
+    """A top-level section as a mapping ({} when absent); anything else is reported."""
+    section = raw.get(key)
+    if section is None:
+        return {}
+    if not isinstance(section, dict):
+        errors.append(f"{key}: expected a mapping")
+        return {}
+    return section
+
+
+def compile_site_config(raw: Dict[str, Any], source: str = "<config>") -> SitePlan:
+    """Validate a site config and compile it into a SitePlan (raises SiteConfigError)."""
+    errors: List[str] = []
+    if not isinstance(raw, dict):
+        raise SiteConfigError(source, ["expected a mapping at the top level"])
+
+    site_key = raw.get("site_key")
+    if not isinstance(site_key, str) or not site_key:
+        errors.append("site_key: required")
+
+    pagination = _section(raw, "pagination", errors)
+    pattern = pagination.get("pattern")
+    if pagination.get("type", "pattern") != "pattern":
+        errors.append("pagination.type: only 'pattern' is supported")
+    if not isinstance(pattern, str) or "{page}" not in pattern:
+        errors.append("pagination.pattern: required and must contain '{page}'")
+    start_page = pagination.get("start_page", 1)
+    max_pages = pagination.get("max_pages")
+    if not isinstance(start_page, int) or (max_pages is not None and not isinstance(max_pages, int)):
+        errors.append("pagination: start_page / max_pages must be integers")
+
+    catalog = _section(raw, "catalog", errors)
+    card = catalog.get("card")
+    if not isinstance(card, str):
+        errors.append("catalog.card: required")
+    else:
+        try:
+            selector(card)
+        except SelectorError as e:
+            errors.append(f"catalog.card: invalid selector {card!r} ({e})")
+    link = _field_spec("link", catalog.get("link"), "catalog", errors) if catalog.get("link") else None
+    if link is None:
+        errors.append("catalog.link: required")
+    elif link.type != "url_join":
+        errors.append("catalog.link: must be a 'url_join' extractor")
+    card_fields = _field_specs(catalog.get("fields") or {}, "catalog.fields", errors)
+
+    detail_fields = _field_specs(_section(raw, "detail", errors).get("fields"), "detail.fields", errors)
+    names = {spec.name for spec in detail_fields}
+    # every book needs a name
+    if "name" not in names:
+        errors.append("detail.fields.name: required")
+    for reserved in sorted(names & RESERVED_FIELDS):
+        errors.append(f"detail.fields.{reserved}: reserved field name")
+    for unknown in sorted(names - BOOK_FIELDS - RESERVED_FIELDS):
+        errors.append(f"detail.fields.{unknown}: not a Book field (one of {', '.join(sorted(BOOK_FIELDS))})")
+
+    early_stop = _section(raw, "early_stop", errors)
+    for kind, css in early_stop.items():
+        if kind not in ("catalog", "detail"):
+            errors.append(f"early_stop.{kind}: expected 'catalog' or 'detail'")
+            continue
+        try:
+            selector(css)
+        except (SelectorError, TypeError) as e:
+            errors.append(f"early_stop.{kind}: invalid selector {css!r} ({e})")
+
+    if errors:
+        raise SiteConfigError(source, errors)
+    return SitePlan(
+        site_key=site_key,
+        page_pattern=pattern,
+        start_page=start_page,
+        max_pages=max_pages,
+        card_selector=card,
+        link=link,
+        card_fields=card_fields,
+        detail_fields=detail_fields,
+        early_stop=dict(early_stop),
+        raw=raw,
+    )
+
+
+def load_site_file(path: str) -> SitePlan:
+    """Load and compile one .yaml/.yml/.json site config."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            raw = json.load(f)
+        else:
+            raw = yaml.safe_load(f)
+    return compile_site_config(raw, source=os.path.basename(path))
+
+
+def load_site_dir(path: str) -> Dict[str, SitePlan]:
+    """Compile every site config in a directory; fails as a whole if any file is invalid."""
+    plans: Dict[str, SitePlan] = {}
+    errors: List[str] = []
+    for name in sorted(os.listdir(path)):
+        if not name.endswith((".yaml", ".yml", ".json")):
+            continue
+        try:
+            plan = load_site_file(os.path.join(path, name))
+        except SiteConfigError as e:
+            errors.append(str(e))
+            continue
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            errors.append(f"{name}: {e}")
+            continue
+        if plan.site_key in plans:
+            errors.append(f"{name}: duplicate site_key {plan.site_key!r}")
+        plans[plan.site_key] = plan
+    if errors:
+        raise SiteConfigError(path, errors)
+    return plans
@@ -0,0 +1,46 @@
+from typing import Optional, Tuple
+import httpx
+from lxml import etree, html
+from lxml.cssselect import CSSSelector
+
+
+class ResponseTooLarge(Exception):
+    """Response body exceeded the configured max bytes."""
+
+
+async def read_html_tree(response: httpx.Response, max_bytes: int, stop_after: Optional[str] = None,
+                         chunk_size: int = 16384) -> Tuple[html.HtmlElement, int]:
+    """
+    Incrementally parse a streamed HTML response.
+    - Raises ResponseTooLarge once more than `max_bytes` were received (or announced).
+    - With `stop_after` (CSS selector), stops reading as soon as a matching element
+      has been fully parsed; the rest of the body is never downloaded or decoded.
+    Returns the parsed root and the number of bytes read.
+    """
+    declared = response.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise ResponseTooLarge(f"{response.url} declares {declared} bytes (max {max_bytes})")
+
+    stop_selector = CSSSelector(stop_after) if stop_after else None
+    if stop_selector is not None:
+        parser = etree.HTMLPullParser(events=("end",), encoding=response.charset_encoding)
+        parser.set_element_class_lookup(html.HtmlElementClassLookup())
+    else:
+        parser = html.HTMLParser(encoding=response.charset_encoding)
+
+    received = 0
+    async for chunk in response.aiter_bytes(chunk_size):
+        received += len(chunk)
+        if received > max_bytes:
+            raise ResponseTooLarge(f"{response.url} exceeded {max_bytes} bytes")
+        parser.feed(chunk)
+        if stop_selector is None:
+            continue
+        # one selector evaluation per chunk: stop once a match has been closed
+        ended = {el for _, el in parser.read_events()}
+        if ended:
+            root = next(iter(ended)).getroottree().getroot()
+            if any(match in ended for match in stop_selector(root)):
+                break
+
+    return parser.close(), received
@@ -1,12 +1,19 @@
 import asyncio
 import random
 import time
-from typing import Callable, Any 
+from typing import Callable, Any, Optional
 import re
+import sys
+from urllib.parse import urlsplit, urlunsplit
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
 
-async def retry_async(func: Callable, retries: int = 3, initial_delay: float = 0.5, backoff: float = 2.0, jitter: bool = True, *args, **kwargs):
-    """Simple async retry with exponential backoff and optional jitter."""
+async def retry_async(func: Callable, retries: int = 3, initial_delay: float = 0.5, backoff: float = 2.0, jitter: bool = True,
+                      retry_if: Optional[Callable[[Exception], bool]] = None, *args, **kwargs):
+    """Simple async retry with exponential backoff and optional jitter (only for errors accepted by `retry_if`)."""
     attempt = 0
     delay = initial_delay
     while True:
@@ -14,7 +21,7 @@ async def retry_async(func: Callable, retries: int = 3, initial_delay: float = 0
             return await func(*args, **kwargs)
         except Exception as e:
             attempt += 1
-            if attempt > retries:
+            if attempt > retries or (retry_if is not None and not retry_if(e)):
                 raise 
             if jitter:
                 sleep_time = delay + random.uniform(0, delay)
@@ -24,6 +31,16 @@ async def retry_async(func: Callable, retries: int = 3, initial_delay: float = 0
             await asyncio.sleep(sleep_time)
             delay *= backoff
             
+# Canonical form of a URL for dedup: lower-case scheme/host, no default port, no fragment
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+
 # Small helper to parse price strings like '£51.77'
 def parse_price(text: str):
     if not text:
@@ -46,4 +63,36 @@ def parse_price(text: str):
     if symbol:
         currency = symbol.group(0)
     
-    return {"amount": amount, "currency": currency}
\ No newline at end of file
+    return {"amount": amount, "currency": currency}
+
+
+# Parse stock counts from availability strings like 'In stock (22 available)'
+def parse_stock_count(text: str):
+    if not text:
+        return None
+
+    m = re.search(r"(\d+)\s+available", text)
+    if m:
+        return int(m.group(1))
+    if "out of stock" in text.lower():
+        return 0
+    return None
+
+
+# Rating is encoded in class names like <p class="star-rating Three">
+def parse_rating(classes: str):
+    rating = None
+    for c in (classes or '').split():
+        if c.lower() in ['one', 'two', 'three', 'four', 'five', 'zero']:
+            rating = c
+    return rating
+
+
+# Peak resident set size of this process in MB (None where unsupported)
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
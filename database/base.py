@@ -0,0 +1,160 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Protocol
+
+
+# Fields returned by the book list endpoint (dotted paths select nested values)
+BOOK_LIST_FIELDS = [
+    "name",
+    "rating",
+    "category",
+    "number_of_reviews",
+    "availability",
+    "price_including_tax.amount",
+]
+
+# Fields returned by the book detail endpoint
+BOOK_DETAIL_FIELDS = [
+    "availability",
+    "category",
+    "description",
+    "image_url",
+    "name",
+    "number_of_reviews",
+    "price_excluding_tax",
+    "price_including_tax",
+    "rating",
+]
+
+
+@dataclass(frozen=True)
+class BookQuery:
+    """Backend-neutral filters for listing books."""
+    q: Optional[str] = None
+    category: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    rating: Optional[str] = None
+    sort_by: Optional[str] = None  # rating, price, reviews (relevance when q is set)
+
+
+class StorageBackend(Protocol):
+    """
+    Operations the crawler, change detection, jobs and routers need from storage.
+    Implemented by MongoStorage (database/storage.py) and SQLiteStorage (database/sqlite_storage.py).
+    Documents are plain dicts; book and change ids are exposed under `_id`.
+    """
+
+    async def ensure_indexes(self): ...
+
+    async def close(self): ...
+
+    # ---------- Books ----------
+    async def upsert_book(self, book_doc: Dict[str, Any]): ...
+
+    async def get_one_book(self, mongo_document: dict) -> Optional[Dict[str, Any]]: ...
+
+    async def get_book_by_id(self, book_id: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]: ...
+
+    async def find_books(self, query: BookQuery, fields: Optional[List[str]] = None,
+                         skip: int = 0, limit: int = 20) -> List[Dict[str, Any]]: ...
+
+    async def count_books(self, query: BookQuery) -> int: ...
+
+    async def suggest_book_names(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]: ...
+
+    async def get_categories_for_urls(self, urls: List[str]) -> Dict[str, Optional[str]]: ...
+
+    async def get_listing_fingerprints(self, urls: List[str]) -> Dict[str, str]: ...
+
+    async def find_near_duplicates(self, bands: List[str], exclude_url: str, limit: int = 50) -> List[Dict[str, Any]]: ...
+
+    # ---------- Crawler state ----------
+    async def save_state(self, name: str, state_doc: Dict[str, Any]): ...
+
+    async def get_state(self, name: str) -> Optional[Dict[str, Any]]: ...
+
+    # ---------- Change events ----------
+    async def insert_one_book_change(self, book_doc: Dict[str, Any]): ...
+
+    async def find_changes_after(self, seq: int, limit: int = 1000) -> List[Dict[str, Any]]: ...
+
+    async def find_changes_for_run(self, run_id: str, after_seq: int = 0, limit: int = 1000) -> List[Dict[str, Any]]: ...
+
+    async def find_changes_since(self, start: datetime) -> List[Dict[str, Any]]: ...
+
+    async def get_change_history_stats(self) -> List[Dict[str, Any]]: ...
+
+    # ---------- Change rollups ----------
+    async def apply_change_rollups(self, rollups: List[Dict[str, Any]]): ...
+
+    async def get_change_rollups(self, scope: str, start: datetime, key: Optional[str] = None) -> List[Dict[str, Any]]: ...
+
+    async def clear_change_rollups(self): ...
+
+    # ---------- Price / stock history ----------
+    async def record_book_observation(self, source_url: str, observation: Dict[str, Any]): ...
+
+    async def get_book_history(self, source_url: str, start_year: int, end_year: int) -> List[Dict[str, Any]]: ...
+
+    # ---------- Recrawl schedule ----------
+    async def get_recrawl_entries(self) -> List[Dict[str, Any]]: ...
+
+    async def upsert_recrawl_entry(self, source_url: str, entry: Dict[str, Any]): ...
+
+    async def count_recrawl_entries(self) -> int: ...
+
+    # ---------- Crawl failures ----------
+    async def get_crawl_failures(self, site_key: str, due_before: Optional[datetime] = None,
+                                 limit: int = 0) -> List[Dict[str, Any]]: ...
+
+    async def upsert_crawl_failure(self, source_url: str, failure: Dict[str, Any]): ...
+
+    async def delete_crawl_failure(self, source_url: str): ...
+
+    # ---------- Catalog stats ----------
+    async def apply_catalog_stats(self, deltas: List[Dict[str, Any]]): ...
+
+    async def get_catalog_stats(self) -> List[Dict[str, Any]]: ...
+
+    async def get_catalog_stat_groups(self) -> List[Dict[str, Any]]: ...
+
+    async def replace_catalog_stats(self, stats: List[Dict[str, Any]]): ...
+
+    # ---------- Book assets ----------
+    async def get_asset(self, image_url: str) -> Optional[Dict[str, Any]]: ...
+
+    async def upsert_asset(self, image_url: str, asset: Dict[str, Any]): ...
+
+    # ---------- Crawl runs ----------
+    async def insert_crawl_run(self, run: Dict[str, Any]): ...
+
+    async def get_crawl_run(self, run_id: str) -> Optional[Dict[str, Any]]: ...
+
+    async def get_crawl_runs(self, site_key: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]: ...
+
+
+def name_search_key(name: str) -> str:
+    """Lower-cased, whitespace-normalized book name used for prefix (autocomplete) lookups."""
+    return re.sub(r"\s+", " ", name).strip().lower()
+
+
+def project_fields(doc: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Keep `_id` plus the given (optionally dotted) fields of a document."""
+    if fields is None:
+        return doc
+    out: Dict[str, Any] = {"_id": doc.get("_id")} if "_id" in doc else {}
+    for field in fields:
+        parts = field.split(".")
+        value: Any = doc
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = out
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+    return out
@@ -1,11 +1,37 @@
 # db_config.py
 
-from settings import MONGO_URI, DB_NAME
-from database.storage import MongoStorage
+from settings import (
+    MONGO_URI,
+    DB_NAME,
+    CHANGE_RETENTION_DAYS,
+    STORAGE_BACKEND,
+    SQLITE_PATH,
+    SQLITE_BATCH_SIZE,
+)
 
-# Shared mongo instance
+# Shared storage instance (MongoStorage or SQLiteStorage, see STORAGE_BACKEND)
 def config_mongo():
-    return MongoStorage(uri=MONGO_URI, db_name=DB_NAME)
+    # backends are imported here so only the configured driver is loaded
+    if STORAGE_BACKEND == "sqlite":
+        from database.sqlite_storage import SQLiteStorage
+        return SQLiteStorage(path=SQLITE_PATH, change_retention_days=CHANGE_RETENTION_DAYS, batch_size=SQLITE_BATCH_SIZE)
+    from database.storage import MongoStorage
+    return MongoStorage(uri=MONGO_URI, db_name=DB_NAME, change_retention_days=CHANGE_RETENTION_DAYS)
 
-# This is the shared instance that can be imported elsewhere
-mongo = config_mongo()
\ No newline at end of file
+
+_mongo = None
+
+
+def get_storage():
+    """The shared instance, created on first use (not at import time)."""
+    global _mongo
+    if _mongo is None:
+        _mongo = config_mongo()
+    return _mongo
+
+
+# `from database.db_config import mongo` still works and creates the client lazily
+def __getattr__(name: str):
+    if name == "mongo":
+        return get_storage()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,25 @@
+from typing import Any, Dict
+from database.base import StorageBackend
+
+# StorageBackend methods that only read; every other method is treated as a write
+READ_PREFIXES = ("get_", "find_", "count_", "suggest_")
+
+
+class ReadOnlyStorage:
+    """
+    StorageBackend wrapper for dry runs: reads go to the wrapped backend, writes are
+    dropped and counted per method in `suppressed`. `close` leaves the backend open.
+    Reads are live, not a snapshot, so concurrent writers are visible to the dry run.
+    """
+    def __init__(self, backend: StorageBackend) -> None:
+        self.backend = backend
+        self.suppressed: Dict[str, int] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.backend, name)
+        if name.startswith(READ_PREFIXES) or not callable(attr):
+            return attr
+
+        async def suppressed(*args, **kwargs):
+            self.suppressed[name] = self.suppressed.get(name, 0) + 1
+        return suppressed
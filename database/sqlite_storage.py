@@ -0,0 +1,636 @@
+import asyncio
+import json
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Callable
+from bson import ObjectId
+from database.base import BookQuery, project_fields, name_search_key
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id TEXT NOT NULL UNIQUE,
+    source_url TEXT NOT NULL UNIQUE,
+    name_key TEXT,
+    category TEXT COLLATE NOCASE,
+    rating TEXT COLLATE NOCASE,
+    price REAL,
+    number_of_reviews INTEGER,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS books_name_key ON books (name_key);
+CREATE INDEX IF NOT EXISTS books_category ON books (category);
+CREATE INDEX IF NOT EXISTS books_price ON books (price);
+CREATE TABLE IF NOT EXISTS book_minhash_bands (
+    band TEXT NOT NULL,
+    source_url TEXT NOT NULL,
+    PRIMARY KEY (band, source_url)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS book_minhash_bands_url ON book_minhash_bands (source_url);
+CREATE TABLE IF NOT EXISTS book_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    source_url TEXT,
+    change_type TEXT,
+    timestamp TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS book_changes_timestamp ON book_changes (timestamp);
+CREATE TABLE IF NOT EXISTS crawler_state (name TEXT PRIMARY KEY, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS recrawl_schedule (source_url TEXT PRIMARY KEY, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS crawl_failures (
+    source_url TEXT PRIMARY KEY,
+    site_key TEXT NOT NULL,
+    next_retry_at TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS crawl_failures_due ON crawl_failures (site_key, next_retry_at);
+CREATE TABLE IF NOT EXISTS catalog_stats (category TEXT PRIMARY KEY, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS book_assets (image_url TEXT PRIMARY KEY, sha256 TEXT, doc TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS book_assets_sha256 ON book_assets (sha256);
+CREATE TABLE IF NOT EXISTS change_rollups (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    day TEXT NOT NULL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (scope, key, day)
+);
+CREATE INDEX IF NOT EXISTS change_rollups_scope_day ON change_rollups (scope, day);
+CREATE TABLE IF NOT EXISTS crawl_runs (
+    run_id TEXT PRIMARY KEY,
+    site_key TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS crawl_runs_site_started ON crawl_runs (site_key, started_at);
+CREATE TABLE IF NOT EXISTS book_history (
+    source_url TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (source_url, year)
+);
+"""
+
+# bm25 column weights match the Mongo text index (name > category > description)
+FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(name, category, description)"
+FTS_RANK = "bm25(books_fts, 10.0, 5.0, 1.0)"
+
+
+def _ts(dt: datetime) -> str:
+    """Sortable UTC timestamp string used for indexed datetime columns."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+def _from_ts(text: Optional[str]) -> Optional[datetime]:
+    if text is None:
+        return None
+    return datetime.strptime(text, "%Y-%m-%dT%H:%M:%S.%f").replace(tzinfo=timezone.utc)
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return {"$date": _ts(value)}
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _json_hook(obj: Dict[str, Any]):
+    if len(obj) == 1 and "$date" in obj:
+        return _from_ts(obj["$date"])
+    return obj
+
+
+def _dumps(doc: Dict[str, Any]) -> str:
+    return json.dumps(doc, default=_json_default, ensure_ascii=False)
+
+
+def _loads(text: str) -> Dict[str, Any]:
+    return json.loads(text, object_hook=_json_hook)
+
+
+def _migrate(conn: sqlite3.Connection):
+    """Columns added after the first schema, for database files created before them."""
+    columns = {r["name"] for r in conn.execute("PRAGMA table_info(book_changes)")}
+    if "run_id" not in columns:
+        conn.execute("ALTER TABLE book_changes ADD COLUMN run_id TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS book_changes_run ON book_changes (run_id, seq)")
+
+
+def _fts_query(q: str) -> str:
+    # quote every term so user input cannot inject FTS5 query syntax
+    terms = re.findall(r"\w+", q)
+    return " ".join(f'"{t}"' for t in terms)
+
+
+class SQLiteStorage:
+    """
+    Embedded StorageBackend for single-node runs (edge / CI crawls, benchmarks).
+    - One SQLite file in WAL mode; all statements run on a single dedicated thread.
+    - Writes are grouped into transactions of `batch_size` statements (or `flush_interval`
+      seconds) instead of one fsync per book, so crawls are not bound by commit latency.
+      A timer commits a partial batch once `flush_interval` has passed, also when no
+      further write arrives.
+    - Documents are stored as JSON next to a few indexed columns used for filtering.
+    """
+    def __init__(self, path: str = "book_crawler.db", change_retention_days: int = 0,
+                 batch_size: int = 200, flush_interval: float = 1.0):
+        self.path = path
+        self.change_retention_days = change_retention_days
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-storage")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._fts = True
+        self._pending = 0
+        self._last_commit = time.monotonic()
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._closed = False
+
+    # ---------- Connection / transactions ----------
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-65536")
+            conn.executescript(SCHEMA)
+            _migrate(conn)
+            try:
+                conn.execute(FTS_SCHEMA)
+            except sqlite3.OperationalError:
+                # sqlite built without FTS5: fall back to LIKE matching
+                self._fts = False
+            self._conn = conn
+        return self._conn
+
+    async def _read(self, fn: Callable, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: fn(self._connection(), *args))
+
+    async def _write(self, fn: Callable, *args):
+        def run():
+            conn = self._connection()
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            result = fn(conn, *args)
+            self._pending += 1
+            if self._pending >= self.batch_size or time.monotonic() - self._last_commit >= self.flush_interval:
+                self._commit(conn)
+            return result
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self._executor, run)
+        if self._pending and self._flush_timer is None and not self._closed:
+            self._flush_timer = loop.call_later(self.flush_interval, self._flush_due)
+        return result
+
+    def _flush_due(self):
+        self._flush_timer = None
+        if self._pending and not self._closed:
+            asyncio.ensure_future(self.flush())
+
+    def _commit(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.execute("COMMIT")
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    async def flush(self):
+        """Commit any batched writes."""
+        await self._read(self._commit)
+
+    async def ensure_indexes(self):
+        await self._read(lambda conn: None)
+        if self.change_retention_days:
+            # TTL equivalent: drop raw change events older than the retention period
+            cutoff = _ts(datetime.now(timezone.utc) - timedelta(days=self.change_retention_days))
+            await self._write(lambda conn: conn.execute("DELETE FROM book_changes WHERE timestamp < ?", (cutoff,)))
+        await self.flush()
+
+    async def close(self):
+        self._closed = True
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        def shutdown(conn):
+            self._commit(conn)
+            conn.close()
+            self._conn = None
+        if self._conn is not None:
+            await self._read(shutdown)
+        self._executor.shutdown(wait=True)
+
+    # ---------- Books ----------
+    @staticmethod
+    def _book_row(row: sqlite3.Row, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        doc = _loads(row["doc"])
+        doc["_id"] = row["id"]
+        return project_fields(doc, fields)
+
+    async def upsert_book(self, book_doc: Dict[str, Any]):
+        if book_doc.get("name"):
+            book_doc["name_key"] = name_search_key(book_doc["name"])
+
+        def upsert(conn):
+            row = conn.execute("SELECT rowid, id, doc FROM books WHERE source_url = ?", (book_doc["source_url"],)).fetchone()
+            doc = {**_loads(row["doc"]), **book_doc} if row else dict(book_doc)
+            book_id = row["id"] if row else str(doc.get("_id") or ObjectId())
+            doc.pop("_id", None)
+            price = (doc.get("price_including_tax") or {}).get("amount")
+            values = (doc.get("name_key"), doc.get("category"), doc.get("rating"), price, doc.get("number_of_reviews"), _dumps(doc))
+            if row:
+                rowid = row["rowid"]
+                conn.execute(
+                    "UPDATE books SET name_key = ?, category = ?, rating = ?, price = ?, number_of_reviews = ?, doc = ? WHERE rowid = ?",
+                    (*values, rowid),
+                )
+            else:
+                rowid = conn.execute(
+                    "INSERT INTO books (name_key, category, rating, price, number_of_reviews, doc, id, source_url) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*values, book_id, doc["source_url"]),
+                ).lastrowid
+            if "minhash_bands" in book_doc:
+                conn.execute("DELETE FROM book_minhash_bands WHERE source_url = ?", (doc["source_url"],))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO book_minhash_bands (band, source_url) VALUES (?, ?)",
+                    [(band, doc["source_url"]) for band in book_doc["minhash_bands"] or []],
+                )
+            if self._fts:
+                conn.execute("DELETE FROM books_fts WHERE rowid = ?", (rowid,))
+                conn.execute(
+                    "INSERT INTO books_fts (rowid, name, category, description) VALUES (?, ?, ?, ?)",
+                    (rowid, doc.get("name") or "", doc.get("category") or "", doc.get("description") or ""),
+                )
+            return book_id
+        return await self._write(upsert)
+
+    async def get_one_book(self, mongo_document: dict) -> Optional[Dict[str, Any]]:
+        def get(conn):
+            row = conn.execute("SELECT id, doc FROM books WHERE source_url = ?", (mongo_document["source_url"],)).fetchone()
+            return self._book_row(row) if row else None
+        return await self._read(get)
+
+    async def get_book_by_id(self, book_id: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        def get(conn):
+            row = conn.execute("SELECT id, doc FROM books WHERE id = ?", (book_id,)).fetchone()
+            return self._book_row(row, fields) if row else None
+        return await self._read(get)
+
+    def _book_where(self, query: BookQuery):
+        joins, clauses, params = "", [], []
+        if query.q:
+            if self._fts:
+                joins = "JOIN books_fts ON books_fts.rowid = books.rowid"
+                clauses.append("books_fts MATCH ?")
+                params.append(_fts_query(query.q))
+            else:
+                clauses.append("(books.doc LIKE ?)")
+                params.append(f"%{query.q}%")
+        if query.category:
+            clauses.append("books.category = ?")
+            params.append(query.category)
+        if query.min_price is not None:
+            clauses.append("books.price >= ?")
+            params.append(query.min_price)
+        if query.max_price is not None:
+            clauses.append("books.price <= ?")
+            params.append(query.max_price)
+        if query.rating:
+            clauses.append("books.rating = ?")
+            params.append(query.rating)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return joins, where, params
+
+    async def find_books(self, query: BookQuery, fields: Optional[List[str]] = None,
+                         skip: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+        joins, where, params = self._book_where(query)
+        use_rank = bool(query.q and self._fts)
+        order = {
+            "rating": "ORDER BY books.rating DESC",
+            "price": "ORDER BY books.price ASC",
+            "reviews": "ORDER BY books.number_of_reviews DESC",
+        }.get(query.sort_by or "", f"ORDER BY {FTS_RANK}" if use_rank else "ORDER BY books.rowid")
+        rank = f", {FTS_RANK} AS rank" if use_rank else ""
+        sql = f"SELECT books.id, books.doc{rank} FROM books {joins} {where} {order} LIMIT ? OFFSET ?"
+
+        def find(conn):
+            docs = []
+            for row in conn.execute(sql, (*params, limit, skip)):
+                doc = self._book_row(row, fields)
+                if use_rank:
+                    doc["score"] = -row["rank"]
+                docs.append(doc)
+            return docs
+        return await self._read(find)
+
+    async def count_books(self, query: BookQuery) -> int:
+        joins, where, params = self._book_where(query)
+        sql = f"SELECT COUNT(*) FROM books {joins} {where}"
+        return await self._read(lambda conn: conn.execute(sql, params).fetchone()[0])
+
+    async def suggest_book_names(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        key = name_search_key(prefix)
+
+        def suggest(conn):
+            # half-open range on name_key is an index range scan
+            rows = conn.execute(
+                "SELECT id, doc FROM books WHERE name_key >= ? AND name_key < ? ORDER BY name_key LIMIT ?",
+                (key, key + "\uffff", limit),
+            )
+            return [self._book_row(r, ["name", "category"]) for r in rows]
+        return await self._read(suggest)
+
+    async def get_categories_for_urls(self, urls: List[str]) -> Dict[str, Optional[str]]:
+        def get(conn):
+            found = {}
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for row in conn.execute(f"SELECT source_url, category FROM books WHERE source_url IN ({marks})", chunk):
+                    found[row["source_url"]] = row["category"]
+            return found
+        return await self._read(get)
+
+    async def get_listing_fingerprints(self, urls: List[str]) -> Dict[str, str]:
+        def get(conn):
+            found = {}
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT source_url, json_extract(doc, '$.listing_fingerprint') AS fp FROM books WHERE source_url IN ({marks})", chunk
+                )
+                for row in rows:
+                    found[row["source_url"]] = row["fp"]
+            return found
+        return await self._read(get)
+
+    async def find_near_duplicates(self, bands: List[str], exclude_url: str, limit: int = 50) -> List[Dict[str, Any]]:
+        def find(conn):
+            marks = ",".join("?" * len(bands))
+            rows = conn.execute(
+                f"SELECT DISTINCT source_url FROM book_minhash_bands WHERE band IN ({marks}) AND source_url != ? LIMIT ?",
+                (*bands, exclude_url, limit),
+            ).fetchall()
+            out = []
+            for row in rows:
+                book = conn.execute("SELECT doc FROM books WHERE source_url = ?", (row["source_url"],)).fetchone()
+                if book:
+                    doc = _loads(book["doc"])
+                    out.append({"source_url": row["source_url"], "minhash": doc.get("minhash"), "canonical_url": doc.get("canonical_url")})
+            return out
+        if not bands:
+            return []
+        return await self._read(find)
+
+    # ---------- Crawler state ----------
+    async def save_state(self, name: str, state_doc: Dict[str, Any]):
+        def save(conn):
+            row = conn.execute("SELECT doc FROM crawler_state WHERE name = ?", (name,)).fetchone()
+            doc = {**(_loads(row["doc"]) if row else {"name": name}), **state_doc}
+            conn.execute("INSERT OR REPLACE INTO crawler_state (name, doc) VALUES (?, ?)", (name, _dumps(doc)))
+        await self._write(save)
+
+    async def get_state(self, name: str) -> Optional[Dict[str, Any]]:
+        def get(conn):
+            row = conn.execute("SELECT doc FROM crawler_state WHERE name = ?", (name,)).fetchone()
+            return {"_id": name, **_loads(row["doc"])} if row else None
+        return await self._read(get)
+
+    # ---------- Change events ----------
+    @staticmethod
+    def _change_row(row: sqlite3.Row) -> Dict[str, Any]:
+        return {**_loads(row["doc"]), "_id": row["id"], "seq": row["seq"]}
+
+    async def insert_one_book_change(self, book_doc: Dict[str, Any]):
+        book_doc.setdefault("_id", str(ObjectId()))
+
+        def insert(conn):
+            doc = {k: v for k, v in book_doc.items() if k not in ("_id", "seq")}
+            timestamp = book_doc.get("timestamp")
+            return conn.execute(
+                "INSERT INTO book_changes (id, source_url, change_type, timestamp, run_id, doc) VALUES (?, ?, ?, ?, ?, ?)",
+                (book_doc["_id"], book_doc.get("source_url"), book_doc.get("change_type"),
+                 _ts(timestamp) if isinstance(timestamp, datetime) else None, book_doc.get("run_id"), _dumps(doc)),
+            ).lastrowid
+        book_doc["seq"] = await self._write(insert)
+
+    async def find_changes_after(self, seq: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        def find(conn):
+            rows = conn.execute("SELECT * FROM book_changes WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limit))
+            return [self._change_row(r) for r in rows]
+        return await self._read(find)
+
+    async def find_changes_for_run(self, run_id: str, after_seq: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        def find(conn):
+            rows = conn.execute(
+                "SELECT * FROM book_changes WHERE run_id = ? AND seq > ? ORDER BY seq LIMIT ?", (run_id, after_seq, limit)
+            )
+            return [self._change_row(r) for r in rows]
+        return await self._read(find)
+
+    async def find_changes_since(self, start: datetime) -> List[Dict[str, Any]]:
+        def find(conn):
+            rows = conn.execute("SELECT * FROM book_changes WHERE timestamp >= ? ORDER BY timestamp", (_ts(start),))
+            return [self._change_row(r) for r in rows]
+        return await self._read(find)
+
+    async def get_change_history_stats(self) -> List[Dict[str, Any]]:
+        def stats(conn):
+            rows = conn.execute(
+                "SELECT source_url, SUM(change_type = 'update') AS change_count, MIN(timestamp) AS first_seen, "
+                "MAX(timestamp) AS last_change FROM book_changes GROUP BY source_url"
+            )
+            return [
+                {"_id": r["source_url"], "change_count": r["change_count"],
+                 "first_seen": _from_ts(r["first_seen"]), "last_change": _from_ts(r["last_change"])}
+                for r in rows
+            ]
+        return await self._read(stats)
+
+    # ---------- Change rollups ----------
+    async def apply_change_rollups(self, rollups: List[Dict[str, Any]]):
+        if not rollups:
+            return
+
+        def apply(conn):
+            for r in rollups:
+                day = _ts(r["day"])
+                row = conn.execute(
+                    "SELECT doc FROM change_rollups WHERE scope = ? AND key = ? AND day = ?", (r["scope"], r["key"], day)
+                ).fetchone()
+                doc = _loads(row["doc"]) if row else {"scope": r["scope"], "key": r["key"], "day": r["day"]}
+                for field, value in r["inc"].items():
+                    doc[field] = doc.get(field, 0) + value
+                for field, value in (r.get("min") or {}).items():
+                    doc[field] = value if doc.get(field) is None else min(doc[field], value)
+                for field, value in (r.get("max") or {}).items():
+                    doc[field] = value if doc.get(field) is None else max(doc[field], value)
+                doc.update(r.get("set") or {})
+                conn.execute(
+                    "INSERT OR REPLACE INTO change_rollups (scope, key, day, doc) VALUES (?, ?, ?, ?)",
+                    (r["scope"], r["key"], day, _dumps(doc)),
+                )
+        await self._write(apply)
+
+    async def get_change_rollups(self, scope: str, start: datetime, key: Optional[str] = None) -> List[Dict[str, Any]]:
+        sql = "SELECT doc FROM change_rollups WHERE scope = ? AND day >= ?"
+        params: list = [scope, _ts(start)]
+        if key:
+            sql += " AND key = ?"
+            params.append(key)
+        sql += " ORDER BY day DESC"
+        return await self._read(lambda conn: [_loads(r["doc"]) for r in conn.execute(sql, params)])
+
+    async def clear_change_rollups(self):
+        await self._write(lambda conn: conn.execute("DELETE FROM change_rollups"))
+
+    # ---------- Price / stock history ----------
+    async def record_book_observation(self, source_url: str, observation: Dict[str, Any]):
+        t = observation["t"]
+
+        def record(conn):
+            row = conn.execute(
+                "SELECT doc FROM book_history WHERE source_url = ? AND year = ?", (source_url, t.year)
+            ).fetchone()
+            doc = _loads(row["doc"]) if row else {"source_url": source_url, "year": t.year, "count": 0, "observations": []}
+            doc["observations"].append(observation)
+            doc["count"] += 1
+            doc["start"] = min(doc.get("start") or t, t)
+            doc["end"] = max(doc.get("end") or t, t)
+            conn.execute(
+                "INSERT OR REPLACE INTO book_history (source_url, year, doc) VALUES (?, ?, ?)",
+                (source_url, t.year, _dumps(doc)),
+            )
+        await self._write(record)
+
+    async def get_book_history(self, source_url: str, start_year: int, end_year: int) -> List[Dict[str, Any]]:
+        def get(conn):
+            rows = conn.execute(
+                "SELECT doc FROM book_history WHERE source_url = ? AND year BETWEEN ? AND ? ORDER BY year",
+                (source_url, start_year, end_year),
+            )
+            return [_loads(r["doc"]) for r in rows]
+        return await self._read(get)
+
+    # ---------- Recrawl schedule ----------
+    async def get_recrawl_entries(self) -> List[Dict[str, Any]]:
+        return await self._read(lambda conn: [_loads(r["doc"]) for r in conn.execute("SELECT doc FROM recrawl_schedule")])
+
+    async def upsert_recrawl_entry(self, source_url: str, entry: Dict[str, Any]):
+        def upsert(conn):
+            row = conn.execute("SELECT doc FROM recrawl_schedule WHERE source_url = ?", (source_url,)).fetchone()
+            doc = {**(_loads(row["doc"]) if row else {}), **entry, "source_url": source_url}
+            conn.execute("INSERT OR REPLACE INTO recrawl_schedule (source_url, doc) VALUES (?, ?)", (source_url, _dumps(doc)))
+        await self._write(upsert)
+
+    async def count_recrawl_entries(self) -> int:
+        return await self._read(lambda conn: conn.execute("SELECT COUNT(*) FROM recrawl_schedule").fetchone()[0])
+
+    # ---------- Crawl failures ----------
+    async def get_crawl_failures(self, site_key: str, due_before: Optional[datetime] = None,
+                                 limit: int = 0) -> List[Dict[str, Any]]:
+        sql = "SELECT doc FROM crawl_failures WHERE site_key = ?"
+        params: List[Any] = [site_key]
+        if due_before is not None:
+            sql += " AND next_retry_at IS NOT NULL AND next_retry_at <= ?"
+            params.append(_ts(due_before))
+        sql += " ORDER BY next_retry_at"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return await self._read(lambda conn: [_loads(r["doc"]) for r in conn.execute(sql, params)])
+
+    async def upsert_crawl_failure(self, source_url: str, failure: Dict[str, Any]):
+        next_retry_at = failure.get("next_retry_at")
+        values = (source_url, failure["site_key"], _ts(next_retry_at) if next_retry_at else None, _dumps(failure))
+        await self._write(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO crawl_failures (source_url, site_key, next_retry_at, doc) VALUES (?, ?, ?, ?)", values
+        ))
+
+    async def delete_crawl_failure(self, source_url: str):
+        await self._write(lambda conn: conn.execute("DELETE FROM crawl_failures WHERE source_url = ?", (source_url,)))
+
+    # ---------- Catalog stats ----------
+    async def apply_catalog_stats(self, deltas: List[Dict[str, Any]]):
+        def apply(conn):
+            for d in deltas:
+                row = conn.execute("SELECT doc FROM catalog_stats WHERE category = ?", (d["category"],)).fetchone()
+                doc = _loads(row["doc"]) if row else {"category": d["category"]}
+                for path, value in d["inc"].items():
+                    # dotted paths ("ratings.Three") address nested counters, like Mongo's $inc
+                    *parents, leaf = path.split(".")
+                    target = doc
+                    for part in parents:
+                        target = target.setdefault(part, {})
+                    target[leaf] = target.get(leaf, 0) + value
+                conn.execute("INSERT OR REPLACE INTO catalog_stats (category, doc) VALUES (?, ?)", (d["category"], _dumps(doc)))
+        if deltas:
+            await self._write(apply)
+
+    async def get_catalog_stats(self) -> List[Dict[str, Any]]:
+        return await self._read(lambda conn: [
+            _loads(r["doc"]) for r in conn.execute("SELECT doc FROM catalog_stats ORDER BY category")
+        ])
+
+    async def get_catalog_stat_groups(self) -> List[Dict[str, Any]]:
+        def group(conn):
+            rows = conn.execute(
+                "SELECT category, rating, COUNT(*) AS count, TOTAL(price) AS price_sum, COUNT(price) AS price_count "
+                "FROM books WHERE json_extract(doc, '$.name') IS NOT NULL "
+                "AND COALESCE(json_extract(doc, '$.status'), '') != 'failed' GROUP BY category, rating"
+            )
+            return [dict(r) for r in rows]
+        return await self._read(group)
+
+    async def replace_catalog_stats(self, stats: List[Dict[str, Any]]):
+        def replace(conn):
+            conn.execute("DELETE FROM catalog_stats")
+            conn.executemany(
+                "INSERT INTO catalog_stats (category, doc) VALUES (?, ?)",
+                [(doc["category"], _dumps(doc)) for doc in stats],
+            )
+        await self._write(replace)
+
+    # ---------- Book assets ----------
+    async def get_asset(self, image_url: str) -> Optional[Dict[str, Any]]:
+        row = await self._read(lambda conn: conn.execute("SELECT doc FROM book_assets WHERE image_url = ?", (image_url,)).fetchone())
+        return _loads(row["doc"]) if row else None
+
+    async def upsert_asset(self, image_url: str, asset: Dict[str, Any]):
+        def upsert(conn):
+            row = conn.execute("SELECT doc FROM book_assets WHERE image_url = ?", (image_url,)).fetchone()
+            doc = {**(_loads(row["doc"]) if row else {}), **asset, "image_url": image_url}
+            conn.execute(
+                "INSERT OR REPLACE INTO book_assets (image_url, sha256, doc) VALUES (?, ?, ?)",
+                (image_url, doc.get("sha256"), _dumps(doc)),
+            )
+        await self._write(upsert)
+
+    # ---------- Crawl runs ----------
+    async def insert_crawl_run(self, run: Dict[str, Any]):
+        # plain INSERT: run records are never updated
+        values = (run["run_id"], run["site_key"], _ts(run["started_at"]), _dumps(run))
+        await self._write(lambda conn: conn.execute(
+            "INSERT INTO crawl_runs (run_id, site_key, started_at, doc) VALUES (?, ?, ?, ?)", values
+        ))
+        await self.flush()
+
+    async def get_crawl_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        row = await self._read(lambda conn: conn.execute("SELECT doc FROM crawl_runs WHERE run_id = ?", (run_id,)).fetchone())
+        return _loads(row["doc"]) if row else None
+
+    async def get_crawl_runs(self, site_key: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        if site_key:
+            sql, params = "SELECT doc FROM crawl_runs WHERE site_key = ? ORDER BY started_at DESC LIMIT ?", (site_key, limit)
+        else:
+            sql, params = "SELECT doc FROM crawl_runs ORDER BY started_at DESC LIMIT ?", (limit,)
+        return await self._read(lambda conn: [_loads(r["doc"]) for r in conn.execute(sql, params)])
@@ -1,12 +1,23 @@
 import asyncio
+import re
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Optional, Dict, Any
-from pymongo import ASCENDING
+from typing import Optional, Dict, Any, List
+from pymongo import ASCENDING, DESCENDING, TEXT, ReturnDocument, ReplaceOne, UpdateOne
+from pymongo.errors import OperationFailure
 from datetime import datetime, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from database.base import BookQuery, name_search_key
+
+
+# crawler_state entry marking the name_key backfill as done
+NAME_KEY_MIGRATION = "migration:name_key"
 
 
 class MongoStorage:
-    def __init__(self, uri: str = "mongodb://localhost:27017", db_name: str = "book_crawler"):
+    """MongoDB (Motor) implementation of the StorageBackend protocol."""
+    def __init__(self, uri: str = "mongodb://localhost:27017", db_name: str = "book_crawler", change_retention_days: int = 0):
+        self.change_retention_days = change_retention_days
         self.client = AsyncIOMotorClient(uri)
         self.db = self.client[db_name]
         # book table
@@ -15,17 +26,110 @@ class MongoStorage:
         self.state = self.db["crawler_state"]
         # book changes table
         self.book_changes = self.db["book_changes"]
+        # adaptive recrawl schedule table
+        self.recrawl_schedule = self.db["recrawl_schedule"]
+        # named sequence counters (change event ids)
+        self.counters = self.db["counters"]
+        # daily change aggregates per book / per category
+        self.change_rollups = self.db["change_rollups"]
+        # price / stock observations, one bucket document per book per year
+        self.book_history = self.db["book_history"]
+        # failed book fetches waiting for a retry pass
+        self.crawl_failures = self.db["crawl_failures"]
+        # downloaded cover images (content-addressed files)
+        self.book_assets = self.db["book_assets"]
+        # per-category counts / price sums / rating distribution
+        self.catalog_stats = self.db["catalog_stats"]
+        # one immutable document per crawl run (timings, counts)
+        self.crawl_runs = self.db["crawl_runs"]
     
+    async def next_sequence(self, name: str) -> int:
+        """Atomically increment and return the named counter."""
+        doc = await self.counters.find_one_and_update(
+            {"_id": name}, {"$inc": {"value": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        return doc["value"]
+
     async def insert_one_book_change(self, book_doc: Dict[str, Any]):
-        """Insert Book changes into this table"""
+        """Insert Book changes into this table, tagged with a monotonically increasing `seq`"""
+        book_doc["seq"] = await self.next_sequence("book_changes")
         await self.book_changes.insert_one(book_doc)
+
+    async def find_changes_after(self, seq: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Change events with a sequence number greater than `seq`, oldest first."""
+        cursor = self.book_changes.find({"seq": {"$gt": seq}}).sort("seq", ASCENDING).limit(limit)
+        return await cursor.to_list(length=limit)
         
     async def ensure_indexes(self):
         # unique on source_url to deduplicate
         await self.books.create_index([("source_url", ASCENDING)], unique=True)
+        # full-text search with relevance ranking, name matches weigh most
+        await self.books.create_index(
+            [("name", TEXT), ("category", TEXT), ("description", TEXT)],
+            weights={"name": 10, "category": 5, "description": 1},
+            default_language="english",
+            name="books_text",
+        )
+        # anchored prefix regex on name_key is an index range scan
+        await self.books.create_index([("name_key", ASCENDING)])
+        # multikey LSH band index for near-duplicate candidate lookups
+        await self.books.create_index([("minhash_bands", ASCENDING)], sparse=True)
+        await self._migrate_name_keys()
         await self.state.create_index([("name", ASCENDING)], unique=True)
+        # sparse: change events written before sequencing have no seq
+        await self.book_changes.create_index([("seq", ASCENDING)], unique=True, sparse=True)
+        await self._ensure_change_timestamp_index()
+        # "what changed in run X"
+        await self.book_changes.create_index([("run_id", ASCENDING), ("seq", ASCENDING)], sparse=True)
+        await self.change_rollups.create_index([("scope", ASCENDING), ("key", ASCENDING), ("day", ASCENDING)], unique=True)
+        await self.change_rollups.create_index([("scope", ASCENDING), ("day", ASCENDING)])
+        await self.book_history.create_index([("source_url", ASCENDING), ("year", ASCENDING)], unique=True)
+        await self.recrawl_schedule.create_index([("source_url", ASCENDING)], unique=True)
+        await self.recrawl_schedule.create_index([("next_due", ASCENDING)])
+        await self.crawl_failures.create_index([("source_url", ASCENDING)], unique=True)
+        await self.crawl_failures.create_index([("site_key", ASCENDING), ("next_retry_at", ASCENDING)])
+        await self.book_assets.create_index([("image_url", ASCENDING)], unique=True)
+        await self.book_assets.create_index([("sha256", ASCENDING)])
+        await self.catalog_stats.create_index([("category", ASCENDING)], unique=True)
+        await self.crawl_runs.create_index([("run_id", ASCENDING)], unique=True)
+        await self.crawl_runs.create_index([("site_key", ASCENDING), ("started_at", DESCENDING)])
     
+    async def _migrate_name_keys(self, batch_size: int = 1000):
+        """
+        One-off migration: (re)compute name_key with name_search_key for books stored before
+        prefix search, including keys an earlier backfill wrote without whitespace collapsing.
+        """
+        if await self.get_state(NAME_KEY_MIGRATION):
+            return
+        updates = []
+        async for doc in self.books.find({"name": {"$type": "string"}}, {"name": 1, "name_key": 1}):
+            key = name_search_key(doc["name"])
+            if doc.get("name_key") != key:
+                updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"name_key": key}}))
+            if len(updates) >= batch_size:
+                await self.books.bulk_write(updates, ordered=False)
+                updates = []
+        if updates:
+            await self.books.bulk_write(updates, ordered=False)
+        await self.save_state(NAME_KEY_MIGRATION, {"done": True, "updated_at": datetime.now(timezone.utc)})
+
+    async def _ensure_change_timestamp_index(self):
+        """Timestamp index on book_changes; a TTL index when a retention period is configured."""
+        options = {}
+        if self.change_retention_days:
+            options["expireAfterSeconds"] = int(self.change_retention_days * 86400)
+        try:
+            await self.book_changes.create_index([("timestamp", ASCENDING)], **options)
+        except OperationFailure:
+            # index exists with a different retention: update it in place
+            await self.db.command(
+                "collMod", "book_changes",
+                index={"keyPattern": {"timestamp": 1}, "expireAfterSeconds": options.get("expireAfterSeconds", 2**31 - 1)},
+            )
+
     async def upsert_book(self, book_doc: Dict[str, Any]):
+        if book_doc.get("name"):
+            book_doc["name_key"] = name_search_key(book_doc["name"])
         # Upsert based on source_url
         res = await self.books.update_one({"source_url": book_doc["source_url"]}, {"$set": book_doc}, upsert=True)
         return res
@@ -33,6 +137,69 @@ class MongoStorage:
     async def get_one_book(self, mongo_document: dict) -> Optional[Dict[str, Any]]:
         return await self.books.find_one({"source_url": mongo_document["source_url"]})
         
+    async def get_book_by_id(self, book_id: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        try:
+            oid = ObjectId(book_id)
+        except (InvalidId, TypeError):
+            return None
+        return await self.books.find_one({"_id": oid}, self._projection(fields))
+
+    async def find_books(self, query: BookQuery, fields: Optional[List[str]] = None,
+                         skip: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+        projection = self._projection(fields)
+        sort = self._book_sort(query)
+        if query.q and projection is not None:
+            # relevance score from the text index
+            projection["score"] = {"$meta": "textScore"}
+        cursor = self.books.find(self._book_filter(query), projection)
+        if sort:
+            cursor.sort(sort)
+        cursor = cursor.skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def count_books(self, query: BookQuery) -> int:
+        return await self.books.count_documents(self._book_filter(query))
+
+    @staticmethod
+    def _projection(fields: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        # 1 means include it, 0 means exclude it
+        if fields is None:
+            return None
+        return {"_id": 1, **{f: 1 for f in fields}}
+
+    @staticmethod
+    def _book_filter(query: BookQuery) -> Dict[str, Any]:
+        mongo_query: Dict[str, Any] = {}
+        if query.q:
+            mongo_query["$text"] = {"$search": query.q}
+        if query.category:
+            mongo_query["category"] = {"$regex": f"^{re.escape(query.category)}$", "$options": "i"}
+        # Price range filters on price_including_tax.amount
+        if query.min_price is not None or query.max_price is not None:
+            price_q = {}
+            if query.min_price is not None:
+                price_q["$gte"] = query.min_price
+            if query.max_price is not None:
+                price_q["$lte"] = query.max_price
+            mongo_query["price_including_tax.amount"] = price_q
+        if query.rating:
+            mongo_query["rating"] = {"$regex": f"^{re.escape(query.rating)}$", "$options": "i"}
+        return mongo_query
+
+    @staticmethod
+    def _book_sort(query: BookQuery) -> list:
+        if query.sort_by == "rating":
+            # rating stored as word (One..Five)
+            return [("rating", -1)]
+        if query.sort_by == "price":
+            return [("price_including_tax.amount", 1)]
+        if query.sort_by == "reviews":
+            return [("number_of_reviews", -1)]
+        if query.q:
+            # best text matches first
+            return [("score", {"$meta": "textScore"})]
+        return []
+
     async def save_raw_html(self, source_url: str, html: str):
         await self.books.update_one({"source_url": source_url}, {"$set": html}, upsert=True)
         
@@ -42,6 +209,177 @@ class MongoStorage:
     async def get_state(self, name: str) -> Optional[Dict[str, Any]]:
         return await self.state.find_one({"name": name})
     
+    async def get_change_history_stats(self) -> List[Dict[str, Any]]:
+        """Per source_url change counts and first/last seen timestamps from book_changes."""
+        pipeline = [
+            {"$group": {
+                "_id": "$source_url",
+                "change_count": {"$sum": {"$cond": [{"$eq": ["$change_type", "update"]}, 1, 0]}},
+                "first_seen": {"$min": "$timestamp"},
+                "last_change": {"$max": "$timestamp"},
+            }}
+        ]
+        cursor = self.book_changes.aggregate(pipeline)
+        return await cursor.to_list(length=None)
+
+    async def get_recrawl_entries(self) -> List[Dict[str, Any]]:
+        cursor = self.recrawl_schedule.find({}, {"_id": 0})
+        return await cursor.to_list(length=None)
+
+    async def upsert_recrawl_entry(self, source_url: str, entry: Dict[str, Any]):
+        await self.recrawl_schedule.update_one({"source_url": source_url}, {"$set": entry}, upsert=True)
+
+    async def count_recrawl_entries(self) -> int:
+        return await self.recrawl_schedule.count_documents({})
+
+    async def get_crawl_failures(self, site_key: str, due_before: Optional[datetime] = None,
+                                 limit: int = 0) -> List[Dict[str, Any]]:
+        """A site's failed fetches; with `due_before` only those due for a retry, earliest first."""
+        query: Dict[str, Any] = {"site_key": site_key}
+        if due_before is not None:
+            query["next_retry_at"] = {"$ne": None, "$lte": due_before}
+        cursor = self.crawl_failures.find(query, {"_id": 0}).sort("next_retry_at", ASCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    async def upsert_crawl_failure(self, source_url: str, failure: Dict[str, Any]):
+        await self.crawl_failures.update_one({"source_url": source_url}, {"$set": failure}, upsert=True)
+
+    async def delete_crawl_failure(self, source_url: str):
+        await self.crawl_failures.delete_one({"source_url": source_url})
+
+    async def apply_catalog_stats(self, deltas: List[Dict[str, Any]]):
+        """Apply [{category, inc}] increments to the per-category stats documents."""
+        if not deltas:
+            return
+        ops = [UpdateOne({"category": d["category"]}, {"$inc": d["inc"]}, upsert=True) for d in deltas]
+        await self.catalog_stats.bulk_write(ops, ordered=False)
+
+    async def get_catalog_stats(self) -> List[Dict[str, Any]]:
+        cursor = self.catalog_stats.find({}, {"_id": 0}).sort("category", ASCENDING)
+        return await cursor.to_list(length=None)
+
+    async def get_catalog_stat_groups(self) -> List[Dict[str, Any]]:
+        """Book counts and price sums grouped by (category, rating), computed server-side."""
+        pipeline = [
+            {"$match": {"name": {"$exists": True}, "status": {"$ne": "failed"}}},
+            {"$group": {
+                "_id": {"category": "$category", "rating": "$rating"},
+                "count": {"$sum": 1},
+                "price_sum": {"$sum": "$price_including_tax.amount"},
+                "price_count": {"$sum": {"$cond": [{"$isNumber": "$price_including_tax.amount"}, 1, 0]}},
+            }},
+        ]
+        cursor = self.books.aggregate(pipeline)
+        return [{**g["_id"], "count": g["count"], "price_sum": g["price_sum"], "price_count": g["price_count"]}
+                async for g in cursor]
+
+    async def replace_catalog_stats(self, stats: List[Dict[str, Any]]):
+        """
+        Swap in rebuilt stats one category document at a time (upserted replace), so /stats never
+        sees an empty collection; then drop categories that no longer exist.
+        """
+        if stats:
+            await self.catalog_stats.bulk_write(
+                [ReplaceOne({"category": doc["category"]}, dict(doc), upsert=True) for doc in stats], ordered=False
+            )
+        await self.catalog_stats.delete_many({"category": {"$nin": [doc["category"] for doc in stats]}})
+
+    async def get_asset(self, image_url: str) -> Optional[Dict[str, Any]]:
+        return await self.book_assets.find_one({"image_url": image_url}, {"_id": 0})
+
+    async def upsert_asset(self, image_url: str, asset: Dict[str, Any]):
+        await self.book_assets.update_one({"image_url": image_url}, {"$set": asset}, upsert=True)
+
+    async def find_changes_for_run(self, run_id: str, after_seq: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Change events written by one crawl run, in seq order."""
+        cursor = self.book_changes.find({"run_id": run_id, "seq": {"$gt": after_seq}}).sort("seq", ASCENDING).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def insert_crawl_run(self, run: Dict[str, Any]):
+        # insert only: run records are never updated
+        await self.crawl_runs.insert_one(dict(run))
+
+    async def get_crawl_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        return await self.crawl_runs.find_one({"run_id": run_id}, {"_id": 0})
+
+    async def get_crawl_runs(self, site_key: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent runs first."""
+        query = {"site_key": site_key} if site_key else {}
+        cursor = self.crawl_runs.find(query, {"_id": 0}).sort("started_at", DESCENDING).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def find_changes_since(self, start: datetime) -> List[Dict[str, Any]]:
+        cursor = self.book_changes.find({"timestamp": {"$gte": start}}).sort("timestamp", ASCENDING)
+        return await cursor.to_list(length=None)
+
+    async def get_categories_for_urls(self, urls: List[str]) -> Dict[str, Optional[str]]:
+        cursor = self.books.find({"source_url": {"$in": urls}}, {"source_url": 1, "category": 1})
+        return {doc["source_url"]: doc.get("category") async for doc in cursor}
+
+    async def get_listing_fingerprints(self, urls: List[str]) -> Dict[str, str]:
+        """Stored catalog-card fingerprints for the given books (listing-delta crawls)."""
+        cursor = self.books.find({"source_url": {"$in": urls}}, {"source_url": 1, "listing_fingerprint": 1})
+        return {doc["source_url"]: doc.get("listing_fingerprint") async for doc in cursor}
+
+    async def find_near_duplicates(self, bands: List[str], exclude_url: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Books sharing at least one MinHash band with `bands` (near-duplicate candidates)."""
+        cursor = self.books.find(
+            {"minhash_bands": {"$in": bands}, "source_url": {"$ne": exclude_url}},
+            {"source_url": 1, "minhash": 1, "canonical_url": 1},
+        ).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def apply_change_rollups(self, rollups: List[Dict[str, Any]]):
+        """
+        Merge partial daily aggregates into change_rollups.
+        Each item: {scope, key, day, inc: {...}, min: {...}, max: {...}, set: {...}}
+        """
+        if not rollups:
+            return
+        ops = []
+        for r in rollups:
+            update = {"$inc": r["inc"]}
+            for op in ("min", "max", "set"):
+                if r.get(op):
+                    update[f"${op}"] = r[op]
+            ops.append(UpdateOne({"scope": r["scope"], "key": r["key"], "day": r["day"]}, update, upsert=True))
+        await self.change_rollups.bulk_write(ops, ordered=False)
+
+    async def get_change_rollups(self, scope: str, start: datetime, key: Optional[str] = None) -> List[Dict[str, Any]]:
+        query: Dict[str, Any] = {"scope": scope, "day": {"$gte": start}}
+        if key:
+            query["key"] = key
+        cursor = self.change_rollups.find(query, {"_id": 0}).sort("day", DESCENDING)
+        return await cursor.to_list(length=None)
+
+    async def clear_change_rollups(self):
+        await self.change_rollups.delete_many({})
+
+    async def suggest_book_names(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Books whose name starts with `prefix` (case-insensitive), alphabetically."""
+        key = name_search_key(prefix)
+        cursor = self.books.find(
+            {"name_key": {"$regex": f"^{re.escape(key)}"}}, {"name": 1, "category": 1}
+        ).sort("name_key", ASCENDING).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def record_book_observation(self, source_url: str, observation: Dict[str, Any]):
+        """Append a price/stock observation to the book's yearly bucket."""
+        t = observation["t"]
+        await self.book_history.update_one(
+            {"source_url": source_url, "year": t.year},
+            {"$push": {"observations": observation}, "$inc": {"count": 1}, "$min": {"start": t}, "$max": {"end": t}},
+            upsert=True,
+        )
+
+    async def get_book_history(self, source_url: str, start_year: int, end_year: int) -> List[Dict[str, Any]]:
+        cursor = self.book_history.find(
+            {"source_url": source_url, "year": {"$gte": start_year, "$lte": end_year}}, {"_id": 0}
+        ).sort("year", ASCENDING)
+        return await cursor.to_list(length=None)
+
     async def close(self):
         # motor does not require explicit close in most cases, but close socket
         self.client.close()
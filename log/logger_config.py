@@ -12,7 +12,8 @@ formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
 stream_handler = logging.StreamHandler(log_stream)
 stream_handler.setFormatter(formatter)
 
-file_handler = logging.FileHandler("crawler_daily.log")
+# delay=True: the log file is opened on the first record, not at import
+file_handler = logging.FileHandler("crawler_daily.log", delay=True)
 file_handler.setFormatter(formatter)
 
 # Configure the root logger
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, Set
+from database.base import StorageBackend
+from settings import (
+    RECRAWL_BUDGET,
+    RECRAWL_MIN_INTERVAL_HOURS,
+    RECRAWL_MAX_INTERVAL_HOURS,
+)
+from log.logger_config import get_logger
+
+
+logging = get_logger(__name__)
+
+# Smoothing prior: every book is assumed to have changed once in its first week,
+# so books with little history are neither hammered nor forgotten.
+PRIOR_CHANGES = 1.0
+PRIOR_DAYS = 7.0
+
+
+def _as_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    # Motor returns naive datetimes (stored as UTC)
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def estimate_change_rate(change_count: int, first_seen: Optional[datetime], now: datetime) -> float:
+    """Estimated changes per day for a URL, smoothed with a small prior."""
+    observed_days = 0.0
+    if first_seen:
+        observed_days = max((now - _as_utc(first_seen)).total_seconds() / 86400, 0.0)
+    return (change_count + PRIOR_CHANGES) / (observed_days + PRIOR_DAYS)
+
+
+def recrawl_interval(rate: float,
+                     min_hours: float = RECRAWL_MIN_INTERVAL_HOURS,
+                     max_hours: float = RECRAWL_MAX_INTERVAL_HOURS) -> timedelta:
+    """Expected time until the next change (1 / rate), clamped to the configured bounds."""
+    hours = 24.0 / rate if rate > 0 else max_hours
+    return timedelta(hours=min(max(hours, min_hours), max_hours))
+
+
+class RecrawlPlanner:
+    """
+    Adaptive recrawl scheduler.
+    - Estimates a per-URL change rate from `book_changes` history.
+    - Assigns each URL a `next_due` time: volatile books come back often, static ones rarely.
+    - Selects at most `budget` due URLs per run (most overdue first). URLs never seen before
+      are always fetched so new books are still discovered.
+    """
+    def __init__(self, mongo: StorageBackend, budget: int = RECRAWL_BUDGET) -> None:
+        self.mongo = mongo
+        self.budget = budget
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._selected: Set[str] = set()
+
+    async def bootstrap(self):
+        """Seed the schedule from change history the first time the planner runs."""
+        if await self.mongo.count_recrawl_entries() == 0:
+            await self.rebuild_from_history()
+
+    async def rebuild_from_history(self):
+        """Recompute change rates and due times for every URL in `book_changes`."""
+        now = datetime.now(timezone.utc)
+        stats = await self.mongo.get_change_history_stats()
+        for s in stats:
+            if not s.get("_id"):
+                continue
+            rate = estimate_change_rate(s["change_count"], s.get("first_seen"), now)
+            last_seen = _as_utc(s.get("last_change") or s.get("first_seen")) or now
+            await self.mongo.upsert_recrawl_entry(s["_id"], {
+                "source_url": s["_id"],
+                "first_seen": s.get("first_seen"),
+                "change_count": s["change_count"],
+                "change_rate": rate,
+                "next_due": last_seen + recrawl_interval(rate),
+            })
+        logging.info(f"Recrawl schedule rebuilt for {len(stats)} urls")
+
+    async def load(self):
+        """Load the schedule and pick this run's due URLs within the fetch budget."""
+        now = datetime.now(timezone.utc)
+        entries = await self.mongo.get_recrawl_entries()
+        self._entries = {e["source_url"]: e for e in entries}
+
+        due = [e for e in entries if _as_utc(e.get("next_due")) is None or _as_utc(e["next_due"]) <= now]
+        due.sort(key=lambda e: _as_utc(e.get("next_due")) or now)
+        if self.budget:
+            due = due[:self.budget]
+        self._selected = {e["source_url"] for e in due}
+        logging.info(f"Recrawl plan: {len(self._selected)} due of {len(entries)} known urls (budget={self.budget or 'unlimited'})")
+
+    def should_fetch(self, url: str) -> bool:
+        return url not in self._entries or url in self._selected
+
+    async def record_fetch(self, url: str, result: str):
+        """Update the URL's change rate and next due time after it was fetched."""
+        now = datetime.now(timezone.utc)
+        entry = self._entries.get(url) or {"source_url": url, "first_seen": now, "change_count": 0}
+        if result == "updated":
+            entry["change_count"] = entry.get("change_count", 0) + 1
+        rate = estimate_change_rate(entry["change_count"], entry.get("first_seen"), now)
+        entry.update({
+            "change_rate": rate,
+            "last_fetched": now,
+            "next_due": now + recrawl_interval(rate),
+        })
+        self._entries[url] = entry
+        self._selected.discard(url)
+        await self.mongo.upsert_recrawl_entry(url, entry)
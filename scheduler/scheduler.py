@@ -7,13 +7,19 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from crawler.scraper import AsyncBookCrawler
-from database.storage import MongoStorage
+from database.base import StorageBackend
 from crawler.config import SITE_CONFIG
+from scheduler.recrawl_planner import RecrawlPlanner
+from utils.change_rollups import ChangeRollupJob
+from utils.catalog_stats import rebuild_catalog_stats
 from settings import (
     SITE_KEY,
     SCHEDULER_TIMEZONE,
     SCHEDULER_RUN_TIME,
     SCHEDULER_INTERVAL_MINUTES,
+    RECRAWL_ENABLED,
+    CHANGE_ROLLUP_INTERVAL_MINUTES,
+    CATALOG_STATS_REBUILD_HOURS,
 )
 from log.logger_config import get_logger
 
@@ -22,7 +28,7 @@ logging = get_logger(__name__)
 
 
 class DailyScheduler:
-    def __init__(self, mongo: MongoStorage) -> None:
+    def __init__(self, mongo: StorageBackend) -> None:
         self.mongo = mongo
     
     def init_scheduler(self):
@@ -45,6 +51,11 @@ class DailyScheduler:
 
         # Add the job
         scheduler.add_job(self.run_daily_task, trigger, args=[])
+        # Background change rollups (daily per-book / per-category aggregates)
+        scheduler.add_job(self.run_change_rollups, IntervalTrigger(minutes=CHANGE_ROLLUP_INTERVAL_MINUTES), args=[])
+        # Full catalog stats recompute (fallback for drift in the incremental updates)
+        if CATALOG_STATS_REBUILD_HOURS:
+            scheduler.add_job(self.run_catalog_stats_rebuild, IntervalTrigger(hours=CATALOG_STATS_REBUILD_HOURS), args=[])
         scheduler.start()
         print("[yellow]🕒 Scheduler started successfully![/yellow]")
         return scheduler 
@@ -58,13 +69,32 @@ class DailyScheduler:
         logging.info("Starting schedule crawl...")
         site_key = "books_toscrape"
         config = SITE_CONFIG[site_key]
-        crawler = AsyncBookCrawler(site_key, config, self.mongo, concurrency=10)
         await self.mongo.ensure_indexes()
+        planner = None
+        if RECRAWL_ENABLED:
+            # adaptive recrawl: only re-fetch books that are due, within the run budget
+            planner = RecrawlPlanner(self.mongo)
+            await planner.bootstrap()
+        crawler = AsyncBookCrawler(site_key, config, self.mongo, concurrency=10, planner=planner)
         await crawler.crawl(resume=False)
+        await self.run_change_rollups()
         
         # # Once crawl finishes, detect changes
         # async for book in self.mongo.books.find({}):
         #     await self.detector.detect_and_update_changes(book)
         
         logging.info("Schedule crawl completed.")
-        
\ No newline at end of file
+
+    async def run_change_rollups(self):
+        """Fold new change events into the daily rollups"""
+        try:
+            await ChangeRollupJob(self.mongo).run()
+        except Exception as e:
+            logging.error(f"Change rollup failed: {e}")
+
+    async def run_catalog_stats_rebuild(self):
+        """Recompute the per-category catalog stats from all books"""
+        try:
+            await rebuild_catalog_stats(self.mongo)
+        except Exception as e:
+            logging.error(f"Catalog stats rebuild failed: {e}")
@@ -4,12 +4,60 @@ from dotenv import load_dotenv
 # Load .env file
 load_dotenv()
 
+# Storage backend: "mongo" (default) or "sqlite" (embedded, single-node runs)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "book_crawler.db")
+SQLITE_BATCH_SIZE = int(os.getenv("SQLITE_BATCH_SIZE", 200))  # writes per transaction
+
 # MongoDB configuration
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DB_NAME = os.getenv("MONGO_DB_NAME", "book_crawler")
 
 # Crawler configuration
 SITE_KEY = os.getenv("SITE_KEY", "books_toscrape")
+# directory of declarative site configs (*.yaml / *.json), reloadable via POST /crawler/sites/reload
+SITE_CONFIG_DIR = os.getenv("SITE_CONFIG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "crawler", "sites"))
+
+# Crawler fetching
+CRAWLER_MAX_BODY_BYTES = int(os.getenv("CRAWLER_MAX_BODY_BYTES", 5 * 1024 * 1024))
+CRAWLER_EARLY_STOP = os.getenv("CRAWLER_EARLY_STOP", "true").lower() in ("1", "true", "yes")
+CRAWLER_MAX_IN_FLIGHT = int(os.getenv("CRAWLER_MAX_IN_FLIGHT", 0))  # books processed at once, 0 => crawler concurrency
+CRAWLER_QUEUE_SIZE = int(os.getenv("CRAWLER_QUEUE_SIZE", 0))  # queued book urls, 0 => 2 x max in flight
+CRAWLER_LISTING_DELTA = os.getenv("CRAWLER_LISTING_DELTA", "false").lower() in ("1", "true", "yes")
+
+# Politeness: robots.txt and per-host request spacing
+CRAWLER_USER_AGENT = os.getenv("CRAWLER_USER_AGENT", "BookCrawler/1.0")
+ROBOTS_ENABLED = os.getenv("ROBOTS_ENABLED", "true").lower() in ("1", "true", "yes")
+ROBOTS_TTL_SECONDS = float(os.getenv("ROBOTS_TTL_SECONDS", 3600))  # robots.txt is re-fetched per host after this
+CRAWLER_HOST_DELAY = float(os.getenv("CRAWLER_HOST_DELAY", 0))  # min seconds between requests to one host
+CRAWLER_MAX_CRAWL_DELAY = float(os.getenv("CRAWLER_MAX_CRAWL_DELAY", 30))  # cap on robots.txt Crawl-delay
+
+# Crawl failure queue
+CRAWLER_INLINE_RETRIES = int(os.getenv("CRAWLER_INLINE_RETRIES", 1))  # immediate retries for timeouts / 5xx / network errors
+CRAWLER_RETRY_CONCURRENCY = int(os.getenv("CRAWLER_RETRY_CONCURRENCY", 2))  # fetches at once in the retry pass
+CRAWLER_RETRY_MAX_ATTEMPTS = int(os.getenv("CRAWLER_RETRY_MAX_ATTEMPTS", 5))
+CRAWLER_RETRY_BACKOFF_SECONDS = float(os.getenv("CRAWLER_RETRY_BACKOFF_SECONDS", 30))
+CRAWLER_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv("CRAWLER_RETRY_MAX_BACKOFF_SECONDS", 6 * 3600))
+CRAWLER_RETRY_BATCH = int(os.getenv("CRAWLER_RETRY_BATCH", 500))  # failures retried per pass
+
+# Cover image assets (optional, runs beside the text crawl)
+ASSETS_ENABLED = os.getenv("ASSETS_ENABLED", "false").lower() in ("1", "true", "yes")
+ASSET_STORE = os.getenv("ASSET_STORE", "disk")  # disk | gridfs
+ASSET_DIR = os.getenv("ASSET_DIR", "assets")
+ASSET_CONCURRENCY = int(os.getenv("ASSET_CONCURRENCY", 2))
+ASSET_RATE_PER_SECOND = float(os.getenv("ASSET_RATE_PER_SECOND", 2))  # 0 => unlimited
+ASSET_QUEUE_SIZE = int(os.getenv("ASSET_QUEUE_SIZE", 1000))  # images beyond this are dropped until the next crawl
+ASSET_MAX_BYTES = int(os.getenv("ASSET_MAX_BYTES", 5 * 1024 * 1024))
+ASSET_THUMBNAIL_SIZE = int(os.getenv("ASSET_THUMBNAIL_SIZE", 200))  # 0 => no thumbnails
+ASSET_THUMBNAIL_WORKERS = int(os.getenv("ASSET_THUMBNAIL_WORKERS", 1))  # processes, used when Pillow is installed
+
+# Near-duplicate books (relisted under a new URL): MinHash of name + description, LSH banding
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() in ("1", "true", "yes")
+NEAR_DUP_MIN_SIMILARITY = float(os.getenv("NEAR_DUP_MIN_SIMILARITY", 0.8))  # estimated Jaccard of word bigrams
+NEAR_DUP_BANDS = int(os.getenv("NEAR_DUP_BANDS", 16))
+NEAR_DUP_ROWS = int(os.getenv("NEAR_DUP_ROWS", 4))  # signature length = bands x rows
+NEAR_DUP_MIN_TOKENS = int(os.getenv("NEAR_DUP_MIN_TOKENS", 20))  # shorter texts are not compared
+NEAR_DUP_MAX_CANDIDATES = int(os.getenv("NEAR_DUP_MAX_CANDIDATES", 50))  # band matches checked per new book
 
 # Scheduler configuration
 SCHEDULER_TIMEZONE = os.getenv("SCHEDULER_TIMEZONE", "UTC")
@@ -17,4 +65,27 @@ SCHEDULER_RUN_TIME = os.getenv("SCHEDULER_RUN_TIME", "")  # e.g., "02:00"
 SCHEDULER_INTERVAL_MINUTES = int(os.getenv("SCHEDULER_INTERVAL_MINUTES", 1440))
 
 # API key name
-API_KEY_NAME = os.getenv("API_KEY_NAME", "")
\ No newline at end of file
+API_KEY_NAME = os.getenv("API_KEY_NAME", "")
+
+# Adaptive recrawl configuration
+RECRAWL_ENABLED = os.getenv("RECRAWL_ENABLED", "false").lower() in ("1", "true", "yes")
+RECRAWL_BUDGET = int(os.getenv("RECRAWL_BUDGET", 0))  # max known books re-fetched per run, 0 => unlimited
+RECRAWL_MIN_INTERVAL_HOURS = float(os.getenv("RECRAWL_MIN_INTERVAL_HOURS", 6))
+RECRAWL_MAX_INTERVAL_HOURS = float(os.getenv("RECRAWL_MAX_INTERVAL_HOURS", 24 * 14))
+
+# Change event stream (/changes/stream)
+CHANGE_STREAM_BUFFER_SIZE = int(os.getenv("CHANGE_STREAM_BUFFER_SIZE", 1000))
+CHANGE_STREAM_KEEPALIVE_SECONDS = float(os.getenv("CHANGE_STREAM_KEEPALIVE_SECONDS", 15))
+
+# Change history retention and rollups
+CHANGE_RETENTION_DAYS = int(os.getenv("CHANGE_RETENTION_DAYS", 0))  # TTL for raw book_changes, 0 => keep forever
+CHANGE_ROLLUP_INTERVAL_MINUTES = int(os.getenv("CHANGE_ROLLUP_INTERVAL_MINUTES", 60))
+CHANGE_ROLLUP_GAP_SECONDS = float(os.getenv("CHANGE_ROLLUP_GAP_SECONDS", 300))  # a seq gap older than this is treated as never committed
+CATALOG_STATS_REBUILD_HOURS = float(os.getenv("CATALOG_STATS_REBUILD_HOURS", 24))  # full /stats recompute, 0 => off
+
+# Crawl run records (/runs)
+RUN_REGRESSION_THRESHOLD = float(os.getenv("RUN_REGRESSION_THRESHOLD", 0.2))  # relative change flagged by /runs/compare
+
+# Dry-run crawls (/crawler/dry-run): nothing is written, a report is kept instead
+DRY_RUN_MAX_DIFFS = int(os.getenv("DRY_RUN_MAX_DIFFS", 200))  # field-level diffs / failures kept in the report
+DRY_RUN_CONCURRENCY = int(os.getenv("DRY_RUN_CONCURRENCY", 2))  # low by default so it can run next to the real crawl
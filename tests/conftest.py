@@ -6,6 +6,8 @@ from fastapi import FastAPI
 
 from app.main import app 
 from core import deps
+from database.storage import MongoStorage
+from crawler.robots import robots_cache, host_scheduler
 
 
 class MockCursor:
@@ -23,8 +25,10 @@ class MockCursor:
         self._limit = n
         return self
 
-    def sort(self, *args, **kwargs):
-        # Sorting can be skipped for now; implement if needed
+    def sort(self, key=None, direction=1, **kwargs):
+        # single-field sorts only; compound / textScore sorts keep insertion order
+        if isinstance(key, str):
+            self.docs.sort(key=lambda d: (d.get(key) is not None, d.get(key)), reverse=direction < 0)  # nulls first, as in Mongo
         return self
 
     async def to_list(self, length=None):
@@ -50,37 +54,76 @@ class AsyncMockCollection:
 
     def find(self, query=None, projection=None):
         # ✅ Return a mock cursor that supports skip/limit chaining
-        query = query or {}
-        docs = list(self._collection.find(query, projection))
+        query, terms = self._split_text(query or {})
+        if projection:
+            # textScore projections are emulated below
+            projection = {k: v for k, v in projection.items() if not isinstance(v, dict)}
+        docs = list(self._collection.find(query, projection or None))
+        if terms is not None:
+            matched = {d["_id"]: self._text_score(d, terms) for d in self._collection.find(query)}
+            docs = [{**d, "score": matched[d["_id"]]} for d in docs if matched[d["_id"]]]
         return MockCursor(docs)
 
     async def count_documents(self, query):
-        return self._collection.count_documents(query)
+        query, terms = self._split_text(query)
+        if terms is None:
+            return self._collection.count_documents(query)
+        return sum(1 for d in self._collection.find(query) if self._text_score(d, terms))
 
+    # mongomock has no $text: match any term against the text-indexed fields
+    @staticmethod
+    def _split_text(query):
+        if "$text" not in query:
+            return query, None
+        query = dict(query)
+        return query, query.pop("$text")["$search"].lower().split()
 
-class MockMongoStorage:
-    """Async-compatible Mock MongoDB Storage with in-memory data."""
+    @staticmethod
+    def _text_score(doc, terms):
+        text = " ".join(str(doc.get(f) or "") for f in ("name", "category", "description")).lower()
+        return sum(term in text for term in terms)
+
+    async def update_one(self, query, update, upsert=False):
+        return self._collection.update_one(query, update, upsert=upsert)
+
+    async def bulk_write(self, requests, ordered=True):
+        return self._collection.bulk_write(requests, ordered=ordered)
+
+    async def delete_many(self, query):
+        return self._collection.delete_many(query)
+
+
+class MockMongoStorage(MongoStorage):
+    """Async-compatible Mock MongoDB Storage with in-memory data (reuses MongoStorage queries)."""
     def __init__(self):
         db = mongomock.MongoClient().db
         self.books = AsyncMockCollection(db.books)
         self.book_changes = AsyncMockCollection(db.book_change_logs)
+        self.state = AsyncMockCollection(db.crawler_state)
+        self.change_rollups = AsyncMockCollection(db.change_rollups)
+        self.book_history = AsyncMockCollection(db.book_history)
+        self.catalog_stats = AsyncMockCollection(db.catalog_stats)
+        self.crawl_runs = AsyncMockCollection(db.crawl_runs)
 
     async def insert_book(self, book_data):
         return await self.books.insert_one(book_data)
 
-    async def find_books(self, query=None):
-        cursor = self.books.find(query)
-        return await cursor.to_list(length=None)
-
-    async def find_one_book(self, book_id):
-        return await self.books.find_one({"_id": book_id})
-
 
 @pytest.fixture(scope="session")
 def anyio_backend():
     return "asyncio"
 
 
+@pytest.fixture(autouse=True)
+def reset_politeness():
+    """robots.txt rules and host slots are process-wide; start every test from a clean slate."""
+    robots_cache.clear()
+    host_scheduler.clear()
+    yield
+    robots_cache.clear()
+    host_scheduler.clear()
+
+
 @pytest.fixture
 async def mock_mongo():
     """Fixture that provides an in-memory MongoDB mock."""
@@ -0,0 +1,108 @@
+# tests/test_assets.py
+import pytest
+import httpx
+from crawler.assets import AssetPipeline, LocalAssetStore, content_key
+from crawler.robots import RobotsCache
+from settings import CRAWLER_USER_AGENT
+from database.sqlite_storage import SQLiteStorage
+
+COVER = b"\x89PNG fake cover bytes"
+
+
+class ImageHost:
+    """Serves the same cover under two URLs and honours If-None-Match."""
+    def __init__(self):
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((str(request.url), request.headers.get("if-none-match")))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=COVER, headers={"content-type": "image/png", "etag": '"v1"'})
+
+
+@pytest.fixture
+async def storage(tmp_path):
+    storage = SQLiteStorage(path=str(tmp_path / "assets.db"))
+    yield storage
+    await storage.close()
+
+
+async def run_pipeline(host, storage, root, images):
+    pipeline = AssetPipeline(storage, store=LocalAssetStore(root), rate_per_second=0, thumbnail_size=0)
+    await pipeline.client.aclose()
+    pipeline.client = httpx.AsyncClient(transport=httpx.MockTransport(host.handler))
+    pipeline.start()
+    for source_url, image_url in images:
+        pipeline.submit(source_url, image_url)
+    await pipeline.close()
+    return pipeline
+
+
+@pytest.mark.anyio
+async def test_assets_are_deduplicated_and_revalidated(storage, tmp_path):
+    host = ImageHost()
+    images = [("http://x/b1", "http://x/media/1.png"), ("http://x/b2", "http://x/media/2.png"),
+              ("http://x/b3", "http://x/media/1.png")]
+    first = await run_pipeline(host, storage, tmp_path / "assets", images)
+    assert first.stats["submitted"] == 2
+    assert first.stats["downloaded"] == 1 and first.stats["deduplicated"] == 1
+
+    asset = await storage.get_asset("http://x/media/2.png")
+    assert asset["key"] == content_key(asset["sha256"], "png")
+    assert (tmp_path / "assets" / asset["key"]).read_bytes() == COVER
+
+    host.requests.clear()
+    second = await run_pipeline(host, storage, tmp_path / "assets", images)
+    assert second.stats["not_modified"] == 2
+    assert all(etag == '"v1"' for _, etag in host.requests)
+
+
+@pytest.mark.anyio
+async def test_oversized_image_is_abandoned_while_streaming(storage, tmp_path):
+    sent = []
+
+    async def body():
+        for _ in range(100):
+            sent.append(1)
+            yield b"x" * 1024
+
+    def handler(request):
+        # chunked, no content-length: the cap has to be enforced while reading
+        return httpx.Response(200, content=body(), headers={"content-type": "image/png"})
+
+    pipeline = AssetPipeline(storage, store=LocalAssetStore(tmp_path / "assets"), rate_per_second=0,
+                             thumbnail_size=0, max_bytes=4096)
+    await pipeline.client.aclose()
+    pipeline.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    pipeline.start()
+    pipeline.submit("http://x/b1", "http://x/media/big.png")
+    await pipeline.close()
+
+    assert pipeline.stats["failed"] == 1 and pipeline.stats["downloaded"] == 0
+    assert len(sent) < 10
+    assert await storage.get_asset("http://x/media/big.png") is None
+
+
+@pytest.mark.anyio
+async def test_assets_send_user_agent_and_honour_robots(storage, tmp_path):
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.path, request.headers.get("user-agent")))
+        if request.url.path == "/robots.txt":
+            return httpx.Response(200, text="User-agent: *\nDisallow: /private/\n")
+        return httpx.Response(200, content=COVER, headers={"content-type": "image/png"})
+
+    pipeline = AssetPipeline(storage, store=LocalAssetStore(tmp_path / "assets"), rate_per_second=0,
+                             thumbnail_size=0, robots=RobotsCache(CRAWLER_USER_AGENT))
+    await pipeline.client.aclose()
+    pipeline.client = httpx.AsyncClient(transport=httpx.MockTransport(handler), headers={"User-Agent": CRAWLER_USER_AGENT})
+    pipeline.start()
+    pipeline.submit("http://x/b1", "http://x/media/1.png")
+    pipeline.submit("http://x/b2", "http://x/private/2.png")
+    await pipeline.close()
+
+    assert pipeline.stats["downloaded"] == 1 and pipeline.stats["failed"] == 1
+    assert "/private/2.png" not in [path for path, _ in seen]
+    assert {ua for _, ua in seen} == {CRAWLER_USER_AGENT}
@@ -56,3 +56,64 @@ async def test_get_book_detail(test_app, mock_mongo, sample_book):
     data = response.json()
     assert data["name"] == "A Light in the Attic"
     assert data["category"] == "Poetry"
+
+
+@pytest.mark.anyio
+async def test_get_book_history_downsampled(test_app, mock_mongo, sample_book):
+    from datetime import datetime, timezone, timedelta
+
+    await mock_mongo.insert_book(sample_book)
+    now = datetime.now(timezone.utc).replace(hour=12)
+    for hours, price in [(0, 51.77), (1, 49.0), (48, 45.0)]:
+        await mock_mongo.record_book_observation(sample_book["source_url"], {
+            "t": now - timedelta(hours=hours), "price": price, "price_excl": price, "stock": 22,
+        })
+
+    book_id = str(sample_book["_id"])
+    response = await test_app.get(f"/books/{book_id}/history?interval=day&agg=min", headers={"x-api-key": API_KEY_NAME})
+    assert response.status_code == 200
+    points = response.json()["points"]
+    assert [p["price"] for p in points] == [45.0, 49.0]
+    assert points[-1]["samples"] == 2
+
+
+@pytest.mark.anyio
+async def test_suggest_books_by_prefix(test_app, mock_mongo, sample_book):
+    await mock_mongo.upsert_book(sample_book)
+    await mock_mongo.upsert_book({**sample_book, "_id": ObjectId(), "source_url": "http://x/2", "name": "Sharp Objects"})
+
+    response = await test_app.get("/books/suggest?prefix=a lig", headers={"x-api-key": API_KEY_NAME})
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [i["name"] for i in items] == ["A Light in the Attic"]
+
+
+@pytest.mark.anyio
+async def test_search_books_by_text(test_app, mock_mongo, sample_book):
+    await mock_mongo.upsert_book(sample_book)
+    await mock_mongo.upsert_book({**sample_book, "_id": ObjectId(), "source_url": "http://x/2", "name": "Sharp Objects",
+                                  "category": "Mystery", "description": "A dark thriller"})
+
+    response = await test_app.get("/books?q=Attic", headers={"x-api-key": API_KEY_NAME})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 1
+    assert [i["name"] for i in data["items"]] == ["A Light in the Attic"]
+
+
+@pytest.mark.anyio
+async def test_name_key_migration_backfills_old_books_once(test_app, mock_mongo, sample_book):
+    from database.storage import NAME_KEY_MIGRATION
+
+    # stored before prefix search: no name_key, irregular whitespace
+    await mock_mongo.insert_book({**sample_book, "name": "A  Light in\tthe Attic"})
+    await mock_mongo._migrate_name_keys()
+    assert (await mock_mongo.get_state(NAME_KEY_MIGRATION))["done"]
+
+    response = await test_app.get("/books/suggest?prefix=a light in the", headers={"x-api-key": API_KEY_NAME})
+    assert [i["name"] for i in response.json()["items"]] == ["A  Light in\tthe Attic"]
+
+    # later runs skip the scan
+    await mock_mongo.insert_book({**sample_book, "_id": ObjectId(), "source_url": "http://x/3", "name": "Old Book"})
+    await mock_mongo._migrate_name_keys()
+    assert (await mock_mongo.get_one_book({"source_url": "http://x/3"})).get("name_key") is None
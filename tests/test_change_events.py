@@ -0,0 +1,83 @@
+# tests/test_change_events.py
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from utils.change_events import ChangeEventBus, format_sse
+from utils.change_detection import BookChangeDetector
+
+
+def make_change(seq):
+    return {"seq": seq, "source_url": f"http://books.toscrape.com/{seq}", "change_type": "update",
+            "timestamp": datetime.now(timezone.utc)}
+
+
+@pytest.mark.anyio
+async def test_bus_fans_out_and_replays():
+    bus = ChangeEventBus(buffer_size=3)
+    with bus.subscribe() as first, bus.subscribe() as second:
+        bus.publish(make_change(1))
+        assert (await first.get())["seq"] == 1
+        assert (await second.get())["seq"] == 1
+    assert bus.subscriber_count == 0
+
+    for seq in range(2, 5):
+        bus.publish(make_change(seq))
+    assert [e["seq"] for e in bus.replay(2)] == [3, 4]
+    # seq 1 fell out of the ring buffer => caller must fall back to storage
+    assert bus.replay(0) is None
+
+
+@pytest.mark.anyio
+async def test_slow_subscriber_is_flagged_lagged():
+    bus = ChangeEventBus(buffer_size=1)
+    with bus.subscribe() as sub:
+        bus.publish(make_change(1))
+        bus.publish(make_change(2))
+        assert sub.lagged
+
+
+def test_format_sse_uses_seq_as_event_id():
+    message = format_sse({"seq": 7, "change_type": "new", "source_url": "x"})
+    assert message.startswith("id: 7\nevent: new\ndata: ")
+    assert message.endswith("\n\n")
+
+
+class SlowChangeStorage:
+    """Just enough storage for the detector; each change insert stalls after taking its seq."""
+    def __init__(self):
+        self.seq = 0
+        self.changes = []
+
+    async def get_one_book(self, book):
+        return None
+
+    async def record_book_observation(self, source_url, observation):
+        pass
+
+    async def upsert_book(self, book):
+        pass
+
+    async def apply_catalog_stats(self, delta):
+        pass
+
+    async def insert_one_book_change(self, doc):
+        self.seq += 1
+        doc["seq"] = self.seq
+        # earlier seqs wait longest, so without ordering they would commit last
+        await asyncio.sleep(0.001 * (10 - self.seq))
+        self.changes.append(doc["seq"])
+
+
+@pytest.mark.anyio
+async def test_concurrent_changes_are_stored_and_published_in_seq_order():
+    storage, bus = SlowChangeStorage(), ChangeEventBus(buffer_size=100)
+    detector = BookChangeDetector(storage, bus=bus)
+    with bus.subscribe() as sub:
+        await asyncio.gather(*(
+            detector.detect_and_update_changes({"source_url": f"http://books.toscrape.com/{n}", "name": f"Book {n}"})
+            for n in range(8)
+        ))
+        published = [sub.queue.get_nowait()["seq"] for _ in range(8)]
+    assert storage.changes == list(range(1, 9))
+    assert published == list(range(1, 9))
+    assert [e["seq"] for e in bus.replay(3)] == [4, 5, 6, 7, 8]
@@ -27,6 +27,16 @@ async def test_changes_report_json(test_app, mock_mongo, sample_change):
     content_type = response.headers.get("content-type")
     assert "application/json" in content_type
 
+@pytest.mark.anyio
+async def test_changes_report_encodes_mongo_types(test_app, mock_mongo):
+    change_id = ObjectId()
+    timestamp = datetime.now(timezone.utc).replace(microsecond=123000)  # BSON keeps milliseconds
+    await mock_mongo.book_changes.insert_one({"_id": change_id, "source_url": "u", "change_type": "new", "timestamp": timestamp})
+
+    response = await test_app.get("/changes/report", headers={"x-api-key": API_KEY_NAME})
+    assert response.json() == [{"_id": str(change_id), "source_url": "u", "change_type": "new",
+                                "timestamp": timestamp.isoformat()}]
+
 @pytest.mark.anyio
 async def test_changes_report_csv(test_app, mock_mongo, sample_change):
     # Insert sample change log
@@ -35,4 +45,57 @@ async def test_changes_report_csv(test_app, mock_mongo, sample_change):
     response = await test_app.get("/changes/report?format=csv", headers={"x-api-key": API_KEY_NAME})
     assert response.status_code == 200
     content_type = response.headers.get("content-type")
-    assert "text/csv" in content_type
\ No newline at end of file
+    assert "text/csv" in content_type
+
+@pytest.mark.anyio
+async def test_changes_summary_from_rollups(test_app, mock_mongo):
+    from utils.change_rollups import ChangeRollupJob
+
+    now = datetime.now(timezone.utc)
+    url = "http://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html"
+    events = [
+        {"seq": 1, "source_url": url, "change_type": "new", "category": "Poetry",
+         "price_including_tax": {"amount": 50.0, "currency": "£"}, "timestamp": now},
+        {"seq": 2, "source_url": url, "change_type": "update", "category": "Poetry", "timestamp": now,
+         "changes": {"price_including_tax": {"old": {"amount": 50.0}, "new": {"amount": 45.5}},
+                     "availability": {"old": "In stock (1 available)", "new": "Out of stock"}}},
+    ]
+    for event in events:
+        await mock_mongo.book_changes.insert_one(event)
+    assert await ChangeRollupJob(mock_mongo).run() == 2
+    # incremental: nothing new to fold on the next run
+    assert await ChangeRollupJob(mock_mongo).run() == 0
+
+    response = await test_app.get("/changes/summary?group_by=category&days=1", headers={"x-api-key": API_KEY_NAME})
+    assert response.status_code == 200
+    item = response.json()["items"][0]
+    assert item["key"] == "Poetry"
+    assert item["change_count"] == 2
+    assert item["availability_flips"] == 1
+    assert (item["price_min"], item["price_max"], item["price_last"]) == (45.5, 50.0, 45.5)
+
+@pytest.mark.anyio
+async def test_rollup_watermark_waits_for_seq_gaps(mock_mongo):
+    from utils.change_rollups import ChangeRollupJob, ROLLUP_STATE_KEY
+
+    now = datetime.now(timezone.utc)
+
+    def event(seq, timestamp=now):
+        return {"seq": seq, "source_url": f"http://books.toscrape.com/{seq}", "change_type": "update",
+                "category": "Poetry", "timestamp": timestamp}
+
+    # seq 3 was allocated but is not committed yet
+    for seq in (1, 2, 4):
+        await mock_mongo.book_changes.insert_one(event(seq))
+    job = ChangeRollupJob(mock_mongo)
+    assert await job.run() == 2
+    assert (await mock_mongo.get_state(ROLLUP_STATE_KEY))["last_seq"] == 2
+
+    await mock_mongo.book_changes.insert_one(event(3))
+    assert await job.run() == 2
+    assert (await mock_mongo.get_state(ROLLUP_STATE_KEY))["last_seq"] == 4
+
+    # a gap whose following event is older than the grace period is never going to fill
+    await mock_mongo.book_changes.insert_one(event(7, now - timedelta(seconds=job.gap_seconds + 60)))
+    assert await job.run() == 1
+    assert (await mock_mongo.get_state(ROLLUP_STATE_KEY))["last_seq"] == 7
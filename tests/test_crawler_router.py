@@ -7,7 +7,7 @@ from settings import API_KEY_NAME, SITE_KEY
 @pytest.mark.anyio
 async def test_start_crawl_endpoint(test_app):
     # Patch the AsyncBookCrawler to avoid real network calls
-    with patch("app.routers.crawler_router.AsyncBookCrawler") as MockCrawler:
+    with patch("crawler.scraper.AsyncBookCrawler") as MockCrawler:
         mock_instance = AsyncMock()
         MockCrawler.return_value = mock_instance
 
@@ -41,7 +41,7 @@ async def test_stop_crawl_endpoint(test_app):
 
 @pytest.mark.anyio
 async def test_resume_crawl_endpoint(test_app):
-    with patch("app.routers.crawler_router.AsyncBookCrawler") as MockCrawler:
+    with patch("crawler.scraper.AsyncBookCrawler") as MockCrawler:
         mock_instance = AsyncMock()
         MockCrawler.return_value = mock_instance
 
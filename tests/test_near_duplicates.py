@@ -0,0 +1,54 @@
+# tests/test_near_duplicates.py
+import pytest
+from database.base import BookQuery
+from database.sqlite_storage import SQLiteStorage
+from utils.change_detection import BookChangeDetector
+from utils.change_events import ChangeEventBus
+from utils.near_duplicates import NearDuplicateIndex, book_signature, similarity
+
+DESCRIPTION = (
+    "A sweeping family saga set on the windswept coast of northern Scotland, following three generations "
+    "of lighthouse keepers through storms, shipwrecks and the slow arrival of the modern world. "
+    "Quiet, funny and devastating by turns, it is a story about duty, memory and the sea."
+)
+
+
+def book(url, description=DESCRIPTION, name="The Keepers"):
+    doc = {"source_url": url, "name": name, "description": description, "category": "Fiction",
+           "price_including_tax": {"amount": 10.0, "currency": "GBP"}, "rating": "Four"}
+    doc.update({"minhash": None, "minhash_bands": [], **book_signature(doc)})
+    return doc
+
+
+def test_signature_is_stable_under_small_edits():
+    original = book("a")
+    edited = book("b", DESCRIPTION.replace("funny", "witty").replace("storms", "gales"))
+    reordered = book("c", " ".join(reversed(DESCRIPTION.split())), name="Something Else")
+    assert similarity(original["minhash"], edited["minhash"]) >= 0.8
+    assert set(original["minhash_bands"]) & set(edited["minhash_bands"])
+    assert similarity(original["minhash"], reordered["minhash"]) < 0.2
+    assert not set(original["minhash_bands"]) & set(reordered["minhash_bands"])
+    assert book_signature({"name": "Short", "description": "too short"}) == {}
+
+
+@pytest.mark.anyio
+async def test_relisted_book_links_to_canonical(tmp_path):
+    storage = SQLiteStorage(path=str(tmp_path / "dups.db"))
+    detector = BookChangeDetector(storage, bus=ChangeEventBus(), near_duplicates=NearDuplicateIndex(storage))
+    try:
+        assert await detector.detect_and_update_changes(book("http://x/old")) == "new"
+        assert await detector.detect_and_update_changes(book("http://x/relisted", DESCRIPTION.replace("funny", "witty"))) == "duplicate"
+        # chains resolve to the first book
+        assert await detector.detect_and_update_changes(book("http://x/again")) == "duplicate"
+        assert await detector.detect_and_update_changes(
+            book("http://x/other", "An entirely different book about gardening, soil, compost heaps, seed catalogues, "
+                                   "allotment politics and the long patience needed to grow a decent marrow.")) == "new"
+
+        relisted = await storage.get_one_book({"source_url": "http://x/again"})
+        assert relisted["canonical_url"] == "http://x/old"
+        assert relisted["status"] == "duplicate"
+        changes = await storage.find_changes_after(0)
+        assert [(c["source_url"], c["change_type"]) for c in changes] == [("http://x/old", "new"), ("http://x/other", "new")]
+        assert await storage.count_books(BookQuery()) == 4
+    finally:
+        await storage.close()
@@ -0,0 +1,48 @@
+# tests/test_recrawl_planner.py
+import pytest
+from datetime import datetime, timezone, timedelta
+from scheduler.recrawl_planner import RecrawlPlanner, estimate_change_rate, recrawl_interval
+
+
+class FakeScheduleStorage:
+    def __init__(self, entries):
+        self.entries = entries
+        self.saved = {}
+
+    async def get_recrawl_entries(self):
+        return self.entries
+
+    async def upsert_recrawl_entry(self, source_url, entry):
+        self.saved[source_url] = entry
+
+
+def test_volatile_books_are_revisited_sooner():
+    now = datetime.now(timezone.utc)
+    first_seen = now - timedelta(days=60)
+    volatile = estimate_change_rate(30, first_seen, now)
+    static = estimate_change_rate(0, first_seen, now)
+
+    assert volatile > static
+    assert recrawl_interval(volatile, 6, 336) < recrawl_interval(static, 6, 336)
+    assert recrawl_interval(static, 6, 336) <= timedelta(hours=336)
+
+
+@pytest.mark.anyio
+async def test_planner_respects_budget_and_fetches_unknown_urls():
+    now = datetime.now(timezone.utc)
+    entries = [
+        {"source_url": "a", "next_due": now - timedelta(days=3), "change_count": 0},
+        {"source_url": "b", "next_due": now - timedelta(days=1), "change_count": 0},
+        {"source_url": "c", "next_due": now + timedelta(days=1), "change_count": 0},
+    ]
+    planner = RecrawlPlanner(FakeScheduleStorage(entries), budget=1)
+    await planner.load()
+
+    assert planner.should_fetch("a")       # most overdue fits the budget
+    assert not planner.should_fetch("b")   # due, but over budget
+    assert not planner.should_fetch("c")   # not due yet
+    assert planner.should_fetch("new-url") # never seen => discovery
+
+    await planner.record_fetch("a", "updated")
+    assert planner.mongo.saved["a"]["change_count"] == 1
+    assert planner.mongo.saved["a"]["next_due"] > now
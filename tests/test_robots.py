@@ -0,0 +1,97 @@
+# tests/test_robots.py
+import asyncio
+import time
+import httpx
+import pytest
+from crawler.failures import FailureQueue
+from crawler.robots import RobotsCache, RobotsDisallowed, RobotsUnavailable, HostScheduler, parse_robots
+from database.sqlite_storage import SQLiteStorage
+
+ROBOTS = """
+# comment
+User-agent: *
+Disallow: /private/
+Crawl-delay: 5
+
+User-agent: BookCrawler
+User-agent: other-bot
+Disallow: /catalogue/
+Allow: /catalogue/b1/
+Disallow: /*.pdf$
+Crawl-delay: 0.5
+"""
+
+
+def test_most_specific_group_and_longest_match():
+    rules = parse_robots(ROBOTS, "BookCrawler/1.0")
+    assert rules.crawl_delay == 0.5
+    assert not rules.allowed("/catalogue/b2/index.html")
+    assert rules.allowed("/catalogue/b1/index.html")
+    assert rules.allowed("/private/x")  # only the `*` group disallows it
+    assert not rules.allowed("/files/book.pdf")
+    assert rules.allowed("/files/book.pdf?x=1")
+    assert rules.allowed("/robots.txt")
+
+
+def test_wildcard_group_for_unknown_agent():
+    rules = parse_robots(ROBOTS, "SomethingElse/2.0")
+    assert rules.crawl_delay == 5
+    assert not rules.allowed("/private/x")
+    assert rules.allowed("/catalogue/b2/index.html")
+    assert parse_robots("", "BookCrawler").allowed("/anything")
+
+
+def test_agent_token_must_match_exactly():
+    text = "User-agent: crawler\nDisallow: /\n\nUser-agent: b\nDisallow: /\n\nUser-agent: *\nDisallow: /private/\n"
+    rules = parse_robots(text, "BookCrawler/1.0")
+    assert rules.allowed("/catalogue/b1/index.html")
+    assert not rules.allowed("/private/x")
+
+
+@pytest.mark.anyio
+async def test_cache_fetches_once_per_host_and_handles_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.host)
+        if request.url.host == "down.example":
+            return httpx.Response(503)
+        if request.url.host == "missing.example":
+            return httpx.Response(404)
+        return httpx.Response(200, text="User-agent: *\nDisallow: /\n")
+
+    cache = RobotsCache("BookCrawler", ttl=60)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        rules = await asyncio.gather(*(cache.get(f"http://up.example/p{i}", client) for i in range(5)))
+        assert not any(r.allowed("/p") for r in rules)
+        assert (await cache.get("http://missing.example/a", client)).allowed("/a")
+        for _ in range(2):
+            with pytest.raises(RobotsUnavailable):
+                await cache.get("http://down.example/a", client)
+    assert sorted(calls) == ["down.example", "missing.example", "up.example"]
+
+
+@pytest.mark.anyio
+async def test_unavailable_robots_is_retried_but_disallow_is_permanent(tmp_path):
+    storage = SQLiteStorage(path=str(tmp_path / "robots.db"))
+    queue = FailureQueue(storage, "books_toscrape")
+    outage = await queue.record("http://x/b1", RobotsUnavailable("robots.txt for http://x returned 503"))
+    disallowed = await queue.record("http://x/b2", RobotsDisallowed("robots.txt disallows http://x/b2"))
+    await storage.close()
+    assert (outage["error_class"], outage["next_retry_at"] is not None) == ("robots_unavailable", True)
+    assert (disallowed["error_class"], disallowed["next_retry_at"]) == ("robots", None)
+
+
+@pytest.mark.anyio
+async def test_host_delay_does_not_block_other_hosts():
+    hosts = HostScheduler(default_delay=0, max_delay=1)
+    start = time.monotonic()
+    done = {}
+
+    async def request(host, delay):
+        await hosts.wait(host, delay)
+        done.setdefault(host, []).append(time.monotonic() - start)
+
+    await asyncio.gather(*(request("slow", 0.1) for _ in range(3)), *(request("fast", None) for _ in range(3)))
+    assert max(done["fast"]) < 0.05
+    assert done["slow"][-1] >= 0.2
@@ -0,0 +1,32 @@
+# tests/test_runs_router.py
+import pytest
+from datetime import datetime, timedelta, timezone
+from settings import API_KEY_NAME
+from utils.crawl_runs import build_run_record
+
+HEADERS = {"x-api-key": API_KEY_NAME}
+
+
+def run(run_id, seconds, failed=0):
+    started = datetime(2024, 6, 1, 2, tzinfo=timezone.utc)
+    stats = {"pages": 50, "books_fetched": 1000, "books_failed": failed, "new": 10, "updated": 40, "unchanged": 950 - failed}
+    return build_run_record(run_id, "books_toscrape", started, started + timedelta(seconds=seconds), "completed",
+                            stats, {"book_fetch_s": seconds * 4})
+
+
+@pytest.mark.anyio
+async def test_compare_flags_throughput_regression(test_app, mock_mongo):
+    await mock_mongo.insert_crawl_run(run("a", 100))
+    await mock_mongo.insert_crawl_run(run("b", 150, failed=20))
+
+    response = await test_app.get("/runs/compare", params={"base": "a", "target": "b"}, headers=HEADERS)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["metrics"]["books_per_second"]["base"] == 10.0
+    assert data["metrics"]["duration_s"]["change_pct"] == 50.0
+    assert set(data["regressions"]) >= {"duration_s", "books_per_second", "error_rate", "counts.books_failed"}
+    assert "counts.new" not in data["regressions"]
+
+    assert (await test_app.get("/runs/a", headers=HEADERS)).json()["counts"]["books_fetched"] == 1000
+    assert (await test_app.get("/runs/missing", headers=HEADERS)).status_code == 404
+    assert (await test_app.get("/runs/compare", params={"base": "a", "target": "x"}, headers=HEADERS)).status_code == 404
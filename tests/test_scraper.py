@@ -0,0 +1,238 @@
+# tests/test_scraper.py
+import asyncio
+import pytest
+import httpx
+from datetime import datetime, timezone
+from crawler.scraper import AsyncBookCrawler
+from crawler.config import SITE_CONFIG
+from database.base import BookQuery
+from database.sqlite_storage import SQLiteStorage
+
+BOOKS_PER_PAGE = 4
+PAGES = 2
+
+
+class FakeSite:
+    """Minimal books.toscrape lookalike served through httpx.MockTransport."""
+    def __init__(self):
+        self.prices = {}
+        self.requests = []
+        self.errors = {}  # book number -> list of status codes to return before succeeding
+        self.robots = None  # robots.txt body, None => 404
+
+    def price(self, n):
+        return self.prices.get(n, 10.0)
+
+    def catalog(self, page):
+        if page > PAGES:
+            return "<html><body><p>404</p></body></html>"
+        cards = "".join(
+            f'<li><article class="product_pod"><p class="star-rating Three"></p>'
+            f'<h3><a href="b{n}/index.html" title="Book {n}">Book {n}</a></h3>'
+            f'<div class="product_price"><p class="price_color">£{self.price(n)}</p>'
+            f'<p class="instock availability">In stock</p></div></article></li>'
+            for n in range((page - 1) * BOOKS_PER_PAGE, page * BOOKS_PER_PAGE)
+        )
+        return f"<html><body><ol class='row'>{cards}</ol></body></html>"
+
+    def detail(self, n):
+        return (
+            f'<html><body><ul class="breadcrumb"><li><a>Home</a></li><li><a>Poetry</a></li><li>Book {n}</li></ul>'
+            f'<article class="product_page"><div class="product_main"><h1>Book {n}</h1>'
+            f'<p class="instock availability">In stock (5 available)</p><p class="star-rating Three"></p></div>'
+            f'<div id="product_description"></div><p>Description {n}</p><table class="table table-striped">'
+            f'<tr><th>Price (excl. tax)</th><td>£{self.price(n)}</td></tr>'
+            f'<tr><th>Price (incl. tax)</th><td>£{self.price(n)}</td></tr>'
+            f'<tr><th>Number of reviews</th><td>0</td></tr></table></article></body></html>'
+        )
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        self.requests.append(url)
+        if url.endswith("/robots.txt"):
+            if self.robots is None:
+                return httpx.Response(404, text="not found")
+            return httpx.Response(200, text=self.robots)
+        if "/page-" in url:
+            return httpx.Response(200, text=self.catalog(int(url.split("page-")[1].split(".")[0])))
+        n = int(url.rstrip("/").split("/")[-2][1:])
+        if self.errors.get(n):
+            return httpx.Response(self.errors[n].pop(0), text="error")
+        return httpx.Response(200, text=self.detail(n))
+
+    def detail_requests(self):
+        return [u for u in self.requests if "/page-" not in u and not u.endswith("/robots.txt")]
+
+
+@pytest.fixture
+def site():
+    return FakeSite()
+
+
+@pytest.fixture
+async def storage(tmp_path):
+    storage = SQLiteStorage(path=str(tmp_path / "crawl.db"))
+    yield storage
+    await storage.close()
+
+
+async def run_crawl(site, storage, retry_backoff=30, **kwargs):
+    crawler = AsyncBookCrawler("books_toscrape", SITE_CONFIG["books_toscrape"], storage, concurrency=4, **kwargs)
+    crawler.failures.backoff_seconds = retry_backoff
+    await crawler.client.aclose()
+    crawler.client = httpx.AsyncClient(transport=httpx.MockTransport(site.handler))
+    await crawler.crawl(resume=False)
+    await crawler.close()
+    return crawler
+
+
+@pytest.mark.anyio
+async def test_full_crawl_stores_all_books(site, storage):
+    crawler = await run_crawl(site, storage)
+    assert await storage.count_books(BookQuery()) == BOOKS_PER_PAGE * PAGES
+    assert 0 < crawler.stats["peak_in_flight"] <= crawler.max_in_flight
+    book = (await storage.find_books(BookQuery(sort_by="price"), limit=1))[0]
+    assert book["price_including_tax"]["amount"] == 10.0
+    assert book["rating"] == "Three"
+
+
+@pytest.mark.anyio
+async def test_listing_delta_only_fetches_changed_cards(site, storage):
+    await run_crawl(site, storage, listing_delta=True)
+    site.requests.clear()
+    site.prices[5] = 12.5
+
+    crawler = await run_crawl(site, storage, listing_delta=True)
+    assert site.detail_requests() == ["http://books.toscrape.com/catalogue/b5/index.html"]
+    assert crawler.stats["books_skipped"] == BOOKS_PER_PAGE * PAGES - 1
+    changes = await storage.find_changes_after(BOOKS_PER_PAGE * PAGES)
+    assert [c["change_type"] for c in changes] == ["update"]
+
+
+@pytest.mark.anyio
+async def test_failures_are_queued_and_retried(site, storage):
+    site.errors = {2: [503, 503], 3: [404] * 10}
+    crawler = await run_crawl(site, storage, retry_backoff=0)
+
+    # book 2: 503 + inline retry fail, recovered by the end-of-crawl pass; book 3: permanent 404
+    assert crawler.stats["books_failed"] == 2
+    assert crawler.stats["recovered"] == 1
+    assert await storage.count_books(BookQuery()) == BOOKS_PER_PAGE * PAGES - 1
+    failures = await storage.get_crawl_failures("books_toscrape")
+    assert [(f["source_url"], f["error_class"], f["status_code"], f["attempts"]) for f in failures] == [
+        ("http://books.toscrape.com/catalogue/b3/index.html", "4xx", 404, 1)
+    ]
+    assert failures[0]["next_retry_at"] is None
+    assert await storage.get_crawl_failures("books_toscrape", due_before=datetime.now(timezone.utc)) == []
+
+
+@pytest.mark.anyio
+async def test_robots_txt_is_honoured(site, storage):
+    site.robots = "User-agent: *\nDisallow: /catalogue/b1/\nCrawl-delay: 0.01\n"
+    crawler = await run_crawl(site, storage)
+
+    # fetched once per host and cached; the disallowed book is never requested
+    assert site.requests.count("http://books.toscrape.com/robots.txt") == 1
+    assert "http://books.toscrape.com/catalogue/b1/index.html" not in site.requests
+    assert await storage.count_books(BookQuery()) == BOOKS_PER_PAGE * PAGES - 1
+    failures = await storage.get_crawl_failures("books_toscrape")
+    assert [(f["error_class"], f["next_retry_at"]) for f in failures] == [("robots", None)]
+    assert crawler.stats["books_failed"] == 1
+
+
+@pytest.mark.anyio
+async def test_crawlers_share_robots_cache_and_host_schedule(site, storage, tmp_path):
+    site.robots = "User-agent: *\nCrawl-delay: 0.01\n"
+    other = SQLiteStorage(path=str(tmp_path / "other.db"))
+    try:
+        first, second = await asyncio.gather(run_crawl(site, storage), run_crawl(site, other))
+    finally:
+        await other.close()
+
+    assert first.robots is second.robots and first.hosts is second.hosts
+    assert site.requests.count("http://books.toscrape.com/robots.txt") == 1
+
+
+@pytest.mark.anyio
+async def test_crawl_runs_are_recorded_and_tag_changes(site, storage):
+    first = await run_crawl(site, storage)
+    site.prices[5] = 12.5
+    second = await run_crawl(site, storage)
+
+    runs = await storage.get_crawl_runs("books_toscrape")
+    assert [r["run_id"] for r in runs] == [second.run_id, first.run_id]
+    assert runs[1]["status"] == "completed"
+    assert runs[1]["counts"]["new"] == BOOKS_PER_PAGE * PAGES
+    assert runs[0]["counts"]["updated"] == 1
+    assert runs[0]["counts"]["unchanged"] == BOOKS_PER_PAGE * PAGES - 1
+    assert set(runs[0]["timings"]) >= {"catalog_fetch_s", "book_fetch_s", "parse_s", "store_s", "pages_s"}
+
+    # "what changed in run X" is a run_id lookup
+    changes = await storage.find_changes_for_run(second.run_id)
+    assert [(c["source_url"], c["change_type"]) for c in changes] == [("http://books.toscrape.com/catalogue/b5/index.html", "update")]
+    assert len(await storage.find_changes_for_run(first.run_id)) == BOOKS_PER_PAGE * PAGES
+    book = await storage.get_one_book({"source_url": "http://books.toscrape.com/catalogue/b5/index.html"})
+    assert book["run_id"] == second.run_id
+
+
+@pytest.mark.anyio
+async def test_dry_run_reports_without_writing(site, storage):
+    await run_crawl(site, storage)
+    site.prices[5] = 12.5
+    site.errors = {3: [404]}
+
+    crawler = await run_crawl(site, storage, dry_run=True)
+    report = crawler.report
+    assert report["dry_run"] and report["status"] == "completed"
+    assert report["counts"]["updated"] == 1
+    assert report["counts"]["unchanged"] == BOOKS_PER_PAGE * PAGES - 2
+    assert report["field_changes"] == {"price_including_tax": 1, "price_excluding_tax": 1}
+    assert [d["source_url"] for d in report["diffs"]] == ["http://books.toscrape.com/catalogue/b5/index.html"]
+    assert report["failure_classes"] == {"4xx": 1}
+    assert set(report["timings"]) >= {"catalog_fetch_s", "book_fetch_s", "parse_s", "store_s"}
+    assert report["suppressed_writes"]["upsert_book"] >= 1
+
+    # nothing was written: old price, no new change events, failures or run record
+    book = await storage.get_one_book({"source_url": "http://books.toscrape.com/catalogue/b5/index.html"})
+    assert book["price_including_tax"]["amount"] == 10.0
+    assert await storage.find_changes_after(BOOKS_PER_PAGE * PAGES) == []
+    assert await storage.get_crawl_failures("books_toscrape") == []
+    assert await storage.get_crawl_run(crawler.run_id) is None
+
+
+@pytest.mark.anyio
+async def test_unexpected_worker_errors_are_logged_and_counted(site, storage, caplog):
+    site.errors = {3: [404]}
+
+    async def broken_record(url, exc, listing_fp=None):
+        raise RuntimeError("failure queue unavailable")
+
+    crawler = AsyncBookCrawler("books_toscrape", SITE_CONFIG["books_toscrape"], storage, concurrency=4)
+    crawler.failures.record = broken_record
+    await crawler.client.aclose()
+    crawler.client = httpx.AsyncClient(transport=httpx.MockTransport(site.handler))
+    await crawler.crawl(resume=False)
+    await crawler.close()
+
+    assert crawler.stats["books_failed"] == 1
+    assert "Unexpected error processing http://books.toscrape.com/catalogue/b3/index.html" in caplog.text
+    assert (await storage.get_crawl_run(crawler.run_id))["counts"]["books_failed"] == 1
+
+
+@pytest.mark.anyio
+async def test_asset_backlog_is_drained_after_the_run_is_recorded(site, storage, tmp_path):
+    from crawler.assets import AssetPipeline, LocalAssetStore
+
+    async def slow_image(request):
+        await asyncio.sleep(0.5)
+        return httpx.Response(200, content=b"cover", headers={"content-type": "image/png"})
+
+    assets = AssetPipeline(storage, store=LocalAssetStore(tmp_path / "assets"), rate_per_second=0, thumbnail_size=0)
+    await assets.client.aclose()
+    assets.client = httpx.AsyncClient(transport=httpx.MockTransport(slow_image))
+    assets.submit("http://books.toscrape.com/catalogue/b0/index.html", "http://images.test/b0.png")
+
+    crawler = await run_crawl(site, storage, assets=assets)
+    run = await storage.get_crawl_run(crawler.run_id)
+    assert run["duration_s"] < 0.5
+    assert crawler.stats["assets"]["downloaded"] == 1 and crawler.stats["assets"]["drain_s"] > 0
@@ -0,0 +1,106 @@
+# tests/test_single_flight.py
+import asyncio
+import pytest
+import httpx
+from crawler.scraper import AsyncBookCrawler
+from crawler.config import SITE_CONFIG
+from crawler.utils import normalize_url
+from settings import API_KEY_NAME
+from utils.single_flight import SingleFlight
+
+
+@pytest.mark.anyio
+async def test_concurrent_calls_share_one_result_and_error():
+    flight = SingleFlight()
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        if value == "boom":
+            raise ValueError(value)
+        return value
+
+    results = await asyncio.gather(*(flight.do("a", lambda: work("a")) for _ in range(5)))
+    assert results == ["a"] * 5 and calls == ["a"]
+    assert (flight.calls, flight.coalesced, flight.in_flight()) == (1, 4, 0)
+
+    # errors reach every waiter; nothing is cached afterwards
+    outcomes = await asyncio.gather(*(flight.do("b", lambda: work("boom")) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(o, ValueError) for o in outcomes)
+    assert await flight.do("a", lambda: work("a")) == "a"
+    assert calls == ["a", "boom", "a"]
+
+
+@pytest.mark.anyio
+async def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return 42
+
+    first = asyncio.ensure_future(flight.do("k", work))
+    second = asyncio.ensure_future(flight.do("k", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == 42
+
+
+def test_normalize_url():
+    assert normalize_url("HTTP://Books.toscrape.com:80/catalogue/b1/index.html#reviews") == \
+        "http://books.toscrape.com/catalogue/b1/index.html"
+    assert normalize_url("https://example.com") == "https://example.com/"
+    assert normalize_url("https://example.com:8443/a?x=1") == "https://example.com:8443/a?x=1"
+
+
+@pytest.mark.anyio
+async def test_concurrent_fetches_of_one_page_make_one_request():
+    requests = []
+
+    async def handler(request):
+        requests.append(str(request.url))
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, text="<html><body><h1>Book</h1></body></html>")
+
+    crawlers = [AsyncBookCrawler("books_toscrape", SITE_CONFIG["books_toscrape"], None, concurrency=2) for _ in range(2)]
+    for crawler in crawlers:
+        crawler.robots = None
+        await crawler.client.aclose()
+        crawler.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    # a running crawl and an overlapping one, with differently spelled URLs
+    trees = await asyncio.gather(
+        crawlers[0]._fetch_tree("http://books.toscrape.com/catalogue/b1/index.html"),
+        crawlers[1]._fetch_tree("http://BOOKS.toscrape.com/catalogue/b1/index.html#top"),
+        crawlers[0]._fetch_tree("http://books.toscrape.com/catalogue/b1/index.html"),
+    )
+    assert len(requests) == 1
+    assert all(t is trees[0] for t in trees)
+    for crawler in crawlers:
+        await crawler.close()
+
+
+@pytest.mark.anyio
+async def test_identical_book_queries_hit_storage_once(test_app, mock_mongo):
+    await mock_mongo.insert_book({"name": "Book 1", "category": "Poetry", "source_url": "http://x/1",
+                                  "price_including_tax": {"amount": 10.0}})
+    count_books = mock_mongo.count_books
+    calls = []
+
+    async def slow_count(query):
+        calls.append(query)
+        await asyncio.sleep(0.02)
+        return await count_books(query)
+
+    mock_mongo.count_books = slow_count
+    headers = {"x-api-key": API_KEY_NAME}
+    responses = await asyncio.gather(
+        *(test_app.get("/books?category=Poetry", headers=headers) for _ in range(5)),
+        test_app.get("/books?category=Poetry&rating=", headers=headers),
+        test_app.get("/books?category=Travel", headers=headers),
+    )
+    assert all(r.status_code == 200 for r in responses)
+    assert len({r.content for r in responses[:6]}) == 1
+    assert responses[0].json()["total"] == 1
+    # one call per distinct normalized query
+    assert len(calls) == 2
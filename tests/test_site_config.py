@@ -0,0 +1,84 @@
+# tests/test_site_config.py
+import pickle
+import pytest
+from lxml import html
+from crawler.config import SITE_CONFIG
+from crawler.site_config import SiteConfigError, compile_site_config
+from settings import API_KEY_NAME
+
+SITE = {
+    "site_key": "demo",
+    "pagination": {"pattern": "http://demo.test/list/{page}.html"},
+    "catalog": {"card": "li.item", "link": {"selector": "a", "type": "url_join"}},
+    "detail": {"fields": {
+        "name": {"selector": "h1", "required": True},
+        "price_including_tax": {"selector": ".price", "type": "price"},
+        "number_of_reviews": {"selector": ".reviews", "type": "int"},
+        "rating": {"selector": ".stars", "type": "class_token_map", "map": {"four": "Four"}},
+        "image_url": {"selector": "img", "type": "url_join", "attr": "src"},
+        "description": {"selector": "td.isbn", "type": "attr", "attr": "data-isbn"},
+    }},
+}
+
+PAGE = """<html><body><h1> Dune </h1><p class="price">£12.50</p><p class="reviews">3 reviews</p>
+<p class="stars Four"></p><img src="../../media/dune.jpg"><td class="isbn" data-isbn="978"></td></body></html>"""
+
+
+def test_plan_extracts_typed_fields_and_pickles():
+    plan = pickle.loads(pickle.dumps(compile_site_config(SITE)))
+    fields = plan.extract(html.fromstring(PAGE), plan.detail_fields, page_url="http://demo.test/books/dune/index.html")
+    assert fields == {
+        "name": "Dune",
+        "price_including_tax": {"amount": "12.50", "currency": "£"},
+        "number_of_reviews": 3,
+        "rating": "Four",
+        "image_url": "http://demo.test/media/dune.jpg",
+        "description": "978",
+    }
+
+
+def test_invalid_config_reports_every_error():
+    bad = {**SITE, "pagination": {"pattern": "http://demo.test/list.html"},
+           "detail": {"fields": {"name": {"selector": "h1[", "type": "regex"}}}}
+    with pytest.raises(SiteConfigError) as exc:
+        compile_site_config(bad)
+    assert len(exc.value.errors) == 3
+
+
+def test_detail_fields_must_be_book_fields():
+    # the Book model would silently drop them
+    bad = {**SITE, "detail": {"fields": {**SITE["detail"]["fields"], "isbn": {"selector": "td.isbn"}}}}
+    with pytest.raises(SiteConfigError) as exc:
+        compile_site_config(bad)
+    assert [e.split(":")[0] for e in exc.value.errors] == ["detail.fields.isbn"]
+
+
+def test_malformed_sections_and_missing_detail_fields_are_reported():
+    bad = {**SITE, "pagination": "x", "catalog": ["li.item"], "detail": 1}
+    with pytest.raises(SiteConfigError) as exc:
+        compile_site_config(bad)
+    assert {"pagination: expected a mapping", "catalog: expected a mapping", "detail: expected a mapping",
+            "detail.fields.name: required"} <= set(exc.value.errors)
+
+    # a config without detail fields would store books without a name
+    with pytest.raises(SiteConfigError) as exc:
+        compile_site_config({**SITE, "detail": {"fields": {}}})
+    assert exc.value.errors == ["detail.fields.name: required"]
+
+
+@pytest.mark.anyio
+async def test_site_config_api_validates_and_registers(test_app):
+    headers = {"x-api-key": API_KEY_NAME}
+    response = await test_app.put("/crawler/sites/demo", json={**SITE, "catalog": {}}, headers=headers)
+    assert response.status_code == 400
+    assert "catalog.card: required" in response.json()["detail"]["errors"]
+    response = await test_app.put("/crawler/sites/demo", json={**SITE, "pagination": "x"}, headers=headers)
+    assert response.status_code == 400
+
+    try:
+        response = await test_app.put("/crawler/sites/demo", json=SITE, headers=headers)
+        assert response.json() == {"status": "registered", "site_key": "demo"}
+        response = await test_app.get("/crawler/sites/demo", headers=headers)
+        assert response.json()["pagination"] == SITE["pagination"]
+    finally:
+        SITE_CONFIG.pop("demo", None)
@@ -0,0 +1,125 @@
+# tests/test_sqlite_storage.py
+import asyncio
+import sqlite3
+import pytest
+from datetime import datetime, timezone, timedelta
+from database.base import BookQuery, BOOK_LIST_FIELDS
+from database.sqlite_storage import SQLiteStorage
+from utils.change_detection import BookChangeDetector
+from utils.change_events import ChangeEventBus
+from utils.change_rollups import ChangeRollupJob
+from utils.catalog_stats import summarize, rebuild_catalog_stats
+
+
+def make_book(n, **overrides):
+    book = {
+        "source_url": f"http://books.toscrape.com/catalogue/book_{n}/index.html",
+        "name": f"Book {n}",
+        "description": "A delightful collection of poems",
+        "category": "Poetry",
+        "price_including_tax": {"amount": 10.0 + n, "currency": "£"},
+        "price_excluding_tax": {"amount": 10.0 + n, "currency": "£"},
+        "availability": "In stock (5 available)",
+        "number_of_reviews": n,
+        "rating": "Three",
+        "status": "fetched",
+    }
+    book.update(overrides)
+    return book
+
+
+@pytest.fixture
+async def sqlite_storage(tmp_path):
+    storage = SQLiteStorage(path=str(tmp_path / "books.db"), batch_size=50)
+    await storage.ensure_indexes()
+    yield storage
+    await storage.close()
+
+
+@pytest.mark.anyio
+async def test_books_filter_sort_and_search(sqlite_storage):
+    for n in range(5):
+        await sqlite_storage.upsert_book(make_book(n))
+    await sqlite_storage.upsert_book(make_book(9, name="Sharp Objects", category="Mystery", description="a thriller"))
+
+    poetry = BookQuery(category="poetry", max_price=12.0, sort_by="price")
+    assert await sqlite_storage.count_books(poetry) == 3
+    items = await sqlite_storage.find_books(poetry, fields=BOOK_LIST_FIELDS, skip=1, limit=10)
+    assert [i["name"] for i in items] == ["Book 1", "Book 2"]
+    assert items[0]["price_including_tax"] == {"amount": 11.0}
+
+    hits = await sqlite_storage.find_books(BookQuery(q="thriller"), fields=["name"])
+    assert [h["name"] for h in hits] == ["Sharp Objects"]
+    assert hits[0]["score"] > 0
+
+    suggestions = await sqlite_storage.suggest_book_names("sharp o")
+    assert [s["name"] for s in suggestions] == ["Sharp Objects"]
+
+    book = await sqlite_storage.get_book_by_id(hits[0]["_id"])
+    assert book["source_url"].endswith("book_9/index.html")
+
+
+@pytest.mark.anyio
+async def test_detector_changes_and_rollups(sqlite_storage):
+    detector = BookChangeDetector(sqlite_storage, bus=ChangeEventBus())
+    assert await detector.detect_and_update_changes(make_book(1)) == "new"
+    assert await detector.detect_and_update_changes(make_book(1)) == "unchanged"
+    updated = make_book(1, price_including_tax={"amount": 5.0, "currency": "£"})
+    assert await detector.detect_and_update_changes(updated) == "updated"
+
+    changes = await sqlite_storage.find_changes_after(0)
+    assert [(c["seq"], c["change_type"]) for c in changes] == [(1, "new"), (2, "update")]
+    since = await sqlite_storage.find_changes_since(datetime.now(timezone.utc) - timedelta(hours=1))
+    assert len(since) == 2
+
+    assert await ChangeRollupJob(sqlite_storage).run() == 2
+    start = datetime.now(timezone.utc) - timedelta(days=1)
+    rollup = (await sqlite_storage.get_change_rollups("category", start))[0]
+    assert (rollup["key"], rollup["change_count"], rollup["price_min"], rollup["price_last"]) == ("Poetry", 2, 5.0, 5.0)
+
+    year = datetime.now(timezone.utc).year
+    history = await sqlite_storage.get_book_history(make_book(1)["source_url"], year, year)
+    assert history[0]["count"] == 3
+    assert isinstance(history[0]["observations"][0]["t"], datetime)
+
+
+@pytest.mark.anyio
+async def test_incremental_catalog_stats_match_rebuild(sqlite_storage):
+    detector = BookChangeDetector(sqlite_storage, bus=ChangeEventBus())
+    for n in range(3):
+        await detector.detect_and_update_changes(make_book(n))
+    await detector.detect_and_update_changes(make_book(7, category="Mystery", rating="Five"))
+    # price + rating change, then a category move
+    await detector.detect_and_update_changes(make_book(1, rating="One", price_including_tax={"amount": 20.0, "currency": "£"}))
+    await detector.detect_and_update_changes(make_book(2, category="Mystery", availability="Out of stock"))
+    # a category-only move leaves the fingerprint as is
+    assert await detector.detect_and_update_changes(make_book(0, category="Travel")) == "unchanged"
+    assert (await sqlite_storage.get_one_book(make_book(0)))["category"] == "Travel"
+
+    incremental = summarize(await sqlite_storage.get_catalog_stats())
+    assert incremental["categories"] == [
+        {"category": "Mystery", "count": 2, "average_price": 14.5, "ratings": {"Five": 1, "Three": 1}},
+        {"category": "Poetry", "count": 1, "average_price": 20.0, "ratings": {"One": 1}},
+        {"category": "Travel", "count": 1, "average_price": 10.0, "ratings": {"Three": 1}},
+    ]
+    assert incremental == summarize(await rebuild_catalog_stats(sqlite_storage))
+
+
+@pytest.mark.anyio
+async def test_partial_batch_is_committed_after_flush_interval(tmp_path):
+    path = str(tmp_path / "idle.db")
+    storage = SQLiteStorage(path=path, batch_size=100, flush_interval=0.05)
+    await storage.ensure_indexes()
+    await storage.upsert_book(make_book(1))
+
+    def committed():
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        finally:
+            conn.close()
+
+    # the crawl goes idle: no further write triggers the commit
+    await asyncio.sleep(0.2)
+    assert committed() == 1
+    await storage.close()
@@ -0,0 +1,39 @@
+# tests/test_stats_router.py
+import pytest
+from settings import API_KEY_NAME
+from utils.catalog_stats import stats_delta
+
+
+def book(category, rating, price):
+    return {"category": category, "rating": rating, "price_including_tax": {"amount": price, "currency": "£"}}
+
+
+@pytest.mark.anyio
+async def test_stats_from_incremental_aggregates(test_app, mock_mongo):
+    await mock_mongo.apply_catalog_stats(stats_delta(None, book("Poetry", "Three", 10.0)))
+    await mock_mongo.apply_catalog_stats(stats_delta(None, book("Poetry", "Five", 20.0)))
+    await mock_mongo.apply_catalog_stats(stats_delta(None, book("Travel", "One", 30.0)))
+    # price / rating update on an existing book
+    await mock_mongo.apply_catalog_stats(stats_delta(book("Travel", "One", 30.0), book("Travel", "Two", 40.0)))
+
+    response = await test_app.get("/stats", headers={"x-api-key": API_KEY_NAME})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == {"count": 3, "average_price": 23.33, "ratings": {"Five": 1, "Three": 1, "Two": 1}}
+    assert data["categories"] == [
+        {"category": "Poetry", "count": 2, "average_price": 15.0, "ratings": {"Five": 1, "Three": 1}},
+        {"category": "Travel", "count": 1, "average_price": 40.0, "ratings": {"Two": 1}},
+    ]
+
+
+@pytest.mark.anyio
+async def test_rebuilt_stats_replace_categories_in_place(mock_mongo):
+    await mock_mongo.apply_catalog_stats(stats_delta(None, book("Poetry", "Three", 10.0)))
+    await mock_mongo.apply_catalog_stats(stats_delta(None, book("Travel", "One", 30.0)))
+
+    await mock_mongo.replace_catalog_stats([
+        {"category": "Poetry", "count": 2, "price_sum": 30.0, "price_count": 2, "ratings": {"Three": 2}},
+        {"category": "Mystery", "count": 1, "price_sum": 5.0, "price_count": 1, "ratings": {"One": 1}},
+    ])
+    stats = await mock_mongo.get_catalog_stats()
+    assert sorted((s["category"], s["count"]) for s in stats) == [("Mystery", 1), ("Poetry", 2)]
@@ -0,0 +1,37 @@
+# tests/test_streaming.py
+import pytest
+import httpx
+from crawler.streaming import read_html_tree, ResponseTooLarge
+
+CATALOG = (
+    b"<html><body><ol class='row'>"
+    + b"".join(b"<li><article class='product_pod'><h3><a href='b%d.html'>b</a></h3></article></li>" % i for i in range(20))
+    + b"</ol><ul class='pager'><li class='next'><a href='page-2.html'>next</a></li></ul>"
+    + b"<footer>" + b"x" * 50000 + b"</footer></body></html>"
+)
+
+
+def streamed(body: bytes, headers=None) -> httpx.Response:
+    return httpx.Response(200, headers=headers, stream=httpx.ByteStream(body), request=httpx.Request("GET", "http://test/"))
+
+
+@pytest.mark.anyio
+async def test_stops_reading_once_selector_is_parsed():
+    tree, received = await read_html_tree(streamed(CATALOG), max_bytes=10**6, stop_after="ol.row", chunk_size=1024)
+    assert len(tree.cssselect("article.product_pod")) == 20
+    assert received < len(CATALOG) / 2
+
+
+@pytest.mark.anyio
+async def test_reads_whole_body_without_stop_selector():
+    tree, received = await read_html_tree(streamed(CATALOG), max_bytes=10**6)
+    assert received == len(CATALOG)
+    assert tree.cssselect("ul.pager li.next a")[0].get("href") == "page-2.html"
+
+
+@pytest.mark.anyio
+async def test_body_size_cap():
+    with pytest.raises(ResponseTooLarge):
+        await read_html_tree(streamed(CATALOG), max_bytes=4096, chunk_size=1024)
+    with pytest.raises(ResponseTooLarge):
+        await read_html_tree(streamed(b"", headers={"content-length": "99999"}), max_bytes=4096)
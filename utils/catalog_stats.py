@@ -0,0 +1,95 @@
+from typing import Dict, Any, List, Optional, Iterable
+from database.base import StorageBackend
+from log.logger_config import get_logger
+
+
+logging = get_logger(__name__)
+
+# books without a category / rating are counted under these keys
+NO_CATEGORY = "Uncategorized"
+NO_RATING = "Unrated"
+
+
+def _price(book: Dict[str, Any]) -> Optional[float]:
+    price = book.get("price_including_tax")
+    amount = price.get("amount") if isinstance(price, dict) else None
+    try:
+        return float(amount) if amount is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def book_contribution(book: Dict[str, Any]) -> Dict[str, float]:
+    """A single book's share of its category's stats document, as `$inc` fields."""
+    inc: Dict[str, float] = {"count": 1, f"ratings.{book.get('rating') or NO_RATING}": 1}
+    price = _price(book)
+    if price is not None:
+        inc["price_sum"] = price
+        inc["price_count"] = 1
+    return inc
+
+
+def stats_delta(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Increments that move catalog_stats from `old` to `new` (either may be None).
+    Returns [{category, inc}], one item per affected category.
+    """
+    deltas: Dict[str, Dict[str, float]] = {}
+    for book, sign in ((old, -1), (new, 1)):
+        if not book:
+            continue
+        inc = deltas.setdefault(book.get("category") or NO_CATEGORY, {})
+        for key, value in book_contribution(book).items():
+            inc[key] = inc.get(key, 0) + sign * value
+    out = []
+    for category, inc in deltas.items():
+        inc = {k: v for k, v in inc.items() if v}
+        if inc:
+            out.append({"category": category, "inc": inc})
+    return out
+
+
+def fold_groups(groups: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Build stats documents from (category, rating) groups: {category, rating, count, price_sum, price_count}."""
+    docs: Dict[str, Dict[str, Any]] = {}
+    for g in groups:
+        category = g.get("category") or NO_CATEGORY
+        doc = docs.setdefault(category, {"category": category, "count": 0, "price_sum": 0.0, "price_count": 0, "ratings": {}})
+        doc["count"] += g["count"]
+        doc["price_sum"] += g.get("price_sum") or 0.0
+        doc["price_count"] += g.get("price_count") or 0
+        rating = g.get("rating") or NO_RATING
+        doc["ratings"][rating] = doc["ratings"].get(rating, 0) + g["count"]
+    return sorted(docs.values(), key=lambda d: d["category"])
+
+
+def summarize(stats: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """API view of the stats documents: per-category rows plus catalog-wide totals."""
+    def row(doc):
+        price_count = doc.get("price_count") or 0
+        return {
+            "count": doc.get("count", 0),
+            "average_price": round(doc.get("price_sum", 0) / price_count, 2) if price_count else None,
+            "ratings": {k: v for k, v in sorted((doc.get("ratings") or {}).items()) if v},
+        }
+
+    total = {"category": None, "count": 0, "price_sum": 0.0, "price_count": 0, "ratings": {}}
+    categories = []
+    for doc in stats:
+        if doc.get("count", 0) <= 0:
+            continue
+        categories.append({"category": doc["category"], **row(doc)})
+        total["count"] += doc.get("count", 0)
+        total["price_sum"] += doc.get("price_sum", 0)
+        total["price_count"] += doc.get("price_count", 0)
+        for rating, n in (doc.get("ratings") or {}).items():
+            total["ratings"][rating] = total["ratings"].get(rating, 0) + n
+    return {"total": row(total), "categories": categories}
+
+
+async def rebuild_catalog_stats(mongo: StorageBackend):
+    """Full recompute from the books table (fallback for drift or missed increments)."""
+    stats = fold_groups(await mongo.get_catalog_stat_groups())
+    await mongo.replace_catalog_stats(stats)
+    logging.info(f"Catalog stats rebuilt for {len(stats)} categories")
+    return stats
@@ -1,17 +1,45 @@
+import asyncio
 import hashlib
 import json 
 import logging
-from typing import Dict, Any
+import weakref
+from typing import Dict, Any, Optional
 from datetime import datetime, timezone
-from database.storage import MongoStorage
+from database.base import StorageBackend
+from database.read_only import ReadOnlyStorage
 from log.logger_config import get_logger
+from utils.change_events import ChangeEventBus, change_bus
+from crawler.utils import parse_stock_count
+from utils.catalog_stats import stats_delta
+from utils.near_duplicates import NearDuplicateIndex
 
 
 logging = get_logger(__name__)
 
+# one lock per storage backend, shared by every detector writing to it in this process
+_change_locks: "weakref.WeakKeyDictionary[Any, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+
+def change_lock(mongo: StorageBackend) -> asyncio.Lock:
+    lock = _change_locks.get(mongo)
+    if lock is None:
+        lock = _change_locks[mongo] = asyncio.Lock()
+    return lock
+
 class BookChangeDetector:
-    def __init__(self, mongo: MongoStorage):
+    def __init__(self, mongo: StorageBackend, bus: ChangeEventBus = change_bus,
+                 near_duplicates: Optional[NearDuplicateIndex] = None, dry_run: bool = False):
+        # dry run: same comparisons and results, but storage writes are dropped
+        # (pass a DryRunReport as `bus` to collect the would-be change events)
+        if dry_run and not isinstance(mongo, ReadOnlyStorage):
+            mongo = ReadOnlyStorage(mongo)
         self.mongo = mongo 
+        self.bus = bus
+        self.dry_run = dry_run
+        # optional: books first seen under a new URL that match a known book are linked, not announced
+        self.near_duplicates = near_duplicates
+        # crawl run writing through this detector; tags book and change writes
+        self.run_id: Optional[str] = None
     
     async def compute_fingerprint(self, book_doc: Dict[str, Any]) -> str:
         """Compute hash for key fields to detect changes."""
@@ -26,22 +54,66 @@ class BookChangeDetector:
         encoded = json.dumps(relevant_fields, sort_keys=True).encode('utf-8')
         return hashlib.sha256(encoded).hexdigest()
 
+    async def record_observation(self, book_doc: Dict[str, Any]):
+        """Store the book's current price and stock count in the time-series history."""
+        def amount(price):
+            return price.get('amount') if isinstance(price, dict) else None
+
+        await self.mongo.record_book_observation(book_doc['source_url'], {
+            't': datetime.now(timezone.utc),
+            'price': amount(book_doc.get('price_including_tax')),
+            'price_excl': amount(book_doc.get('price_excluding_tax')),
+            'stock': parse_stock_count(book_doc.get('availability')),
+        })
+
+    async def log_change(self, change: Dict[str, Any]):
+        """
+        Store a change event and publish it.
+        seq allocation, insert and publish happen under one lock, so events are committed
+        and published in seq order: a stream consumer that skips `seq <= last_seq`, or
+        resumes from storage after the last seq it saw, cannot miss a lower seq that was
+        still being written.
+        """
+        async with change_lock(self.mongo):
+            await self.mongo.insert_one_book_change(change)
+            self.bus.publish(change)
+
     async def detect_and_update_changes(self, new_book: dict):
         """Compare new vs stored book data, update if necessary, log changes.""" 
         existing_book = await self.mongo.get_one_book(new_book)
+        if self.run_id:
+            new_book['run_id'] = self.run_id
         new_fp = await self.compute_fingerprint(new_book)
+        await self.record_observation(new_book)
         
         if not existing_book:
+            canonical = await self.near_duplicates.find_canonical(new_book) if self.near_duplicates else None
+            if canonical:
+                # probably a relisted book: link it to the canonical one instead of a 'new' event
+                new_book['fingerprint'] = new_fp
+                new_book['status'] = 'duplicate'
+                new_book['canonical_url'], new_book['duplicate_similarity'] = canonical
+                new_book['crawl_timestamp'] = datetime.now(timezone.utc)
+                await self.mongo.upsert_book(new_book)
+                await self.mongo.apply_catalog_stats(stats_delta(None, new_book))
+                logging.info(f"Near-duplicate: {new_book['source_url']} -> {canonical[0]} (similarity {canonical[1]:.2f})")
+                return 'duplicate'
+
             # New book detected
             new_book['fingerprint'] = new_fp
             new_book['status'] = 'new'
             new_book['crawl_timestamp'] = datetime.now(timezone.utc)
             await self.mongo.upsert_book(new_book)
-            await self.mongo.insert_one_book_change({
-                    'source_url': new_book['source_url'],
-                    'change_type': 'new',
-                    'timestamp': new_book['crawl_timestamp']
-                })
+            await self.mongo.apply_catalog_stats(stats_delta(None, new_book))
+            new_book_change = {
+                'source_url': new_book['source_url'],
+                'change_type': 'new',
+                'category': new_book.get('category'),
+                'price_including_tax': new_book.get('price_including_tax'),
+                'timestamp': new_book['crawl_timestamp'],
+                'run_id': self.run_id,
+            }
+            await self.log_change(new_book_change)
             
             return "new"
         
@@ -57,15 +129,27 @@ class BookChangeDetector:
             new_book['fingerprint'] = new_fp
             new_book['crawl_timestamp'] = datetime.now(timezone.utc)
             await self.mongo.upsert_book(new_book)
+            await self.mongo.apply_catalog_stats(stats_delta(existing_book, new_book))
             
             new_book_changes = {
                 'source_url': new_book['source_url'],
                 'change_type': 'update',
+                'category': new_book.get('category'),
                 'changes': changes,
-                'timestamp': new_book['crawl_timestamp']
+                'timestamp': new_book['crawl_timestamp'],
+                'run_id': self.run_id,
             }
-            await self.mongo.insert_one_book_change(new_book_changes)
+            await self.log_change(new_book_changes)
             logging.info(f"Book Updated: {new_book['name']} | Changes: {changes}")
             return 'updated'
-        
+
+        if existing_book.get('category') != new_book.get('category'):
+            # category is not fingerprinted, but catalog_stats are kept per category
+            await self.mongo.upsert_book({'source_url': new_book['source_url'], 'category': new_book.get('category')})
+            await self.mongo.apply_catalog_stats(stats_delta(existing_book, {**existing_book, 'category': new_book.get('category')}))
+
+        if new_book.get('minhash') != existing_book.get('minhash'):
+            # description-only edits and books stored before signatures existed
+            await self.mongo.upsert_book({'source_url': new_book['source_url'], 'minhash': new_book.get('minhash'),
+                                          'minhash_bands': new_book.get('minhash_bands') or []})
         return 'unchanged'
\ No newline at end of file
@@ -0,0 +1,77 @@
+import asyncio
+import json
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Set
+from settings import CHANGE_STREAM_BUFFER_SIZE
+
+
+def serialize_change(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a JSON-serializable copy of a book_changes document."""
+    event = dict(doc)
+    if "_id" in event:
+        event["_id"] = str(event["_id"])
+    if isinstance(event.get("timestamp"), datetime):
+        event["timestamp"] = event["timestamp"].isoformat()
+    return event
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Encode a change event as a Server-Sent Events message (id = change seq)."""
+    return f"id: {event.get('seq', '')}\nevent: {event.get('change_type', 'change')}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+class Subscription:
+    """A single consumer's queue. `lagged` is set when the consumer fell behind and events were dropped."""
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.lagged = False
+
+    async def get(self) -> Dict[str, Any]:
+        return await self.queue.get()
+
+
+class ChangeEventBus:
+    """
+    In-process pub/sub fan-out for change events.
+    - `publish` never blocks the crawler: slow subscribers are flagged as lagged
+      and resync from storage using their last seen sequence number.
+    - A ring buffer of recent events serves cheap `Last-Event-ID` resumes.
+    """
+    def __init__(self, buffer_size: int = CHANGE_STREAM_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self._recent: deque = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscription] = set()
+
+    def publish(self, doc: Dict[str, Any]):
+        event = serialize_change(doc)
+        self._recent.append(event)
+        for sub in self._subscribers:
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                sub.lagged = True
+
+    def replay(self, after_seq: int) -> Optional[List[Dict[str, Any]]]:
+        """Buffered events after `after_seq`, or None if the buffer no longer covers that point."""
+        if not self._recent or self._recent[0].get("seq", 0) > after_seq + 1:
+            return None
+        return [e for e in self._recent if e.get("seq", 0) > after_seq]
+
+    @contextmanager
+    def subscribe(self):
+        sub = Subscription(maxsize=self.buffer_size)
+        self._subscribers.add(sub)
+        try:
+            yield sub
+        finally:
+            self._subscribers.discard(sub)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+# Shared bus for the process (crawler publishes, /changes/stream consumes)
+change_bus = ChangeEventBus()
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+from database.base import StorageBackend
+from log.logger_config import get_logger
+from settings import CHANGE_ROLLUP_GAP_SECONDS
+
+
+logging = get_logger(__name__)
+
+ROLLUP_STATE_KEY = "change_rollups"
+
+
+def _to_utc(ts: Any) -> datetime:
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts
+
+
+def day_bucket(ts: Any) -> datetime:
+    """Midnight UTC of the event's day."""
+    ts = _to_utc(ts)
+    return datetime(ts.year, ts.month, ts.day, tzinfo=timezone.utc)
+
+
+def _amount(price: Any) -> Optional[float]:
+    if isinstance(price, dict) and price.get("amount") is not None:
+        try:
+            return float(price["amount"])
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def _in_stock(availability: Any) -> bool:
+    return bool(availability) and "in stock" in str(availability).lower()
+
+
+def _event_price(event: Dict[str, Any]) -> Optional[float]:
+    """Price (incl. tax) carried by a change event, if any."""
+    change = (event.get("changes") or {}).get("price_including_tax")
+    if change:
+        return _amount(change.get("new"))
+    return _amount(event.get("price_including_tax"))
+
+
+def _is_availability_flip(event: Dict[str, Any]) -> bool:
+    change = (event.get("changes") or {}).get("availability")
+    return bool(change) and _in_stock(change.get("old")) != _in_stock(change.get("new"))
+
+
+def build_rollups(events: List[Dict[str, Any]], categories: Dict[str, Optional[str]]) -> List[Dict[str, Any]]:
+    """Fold change events into partial daily aggregates per book and per category."""
+    acc: Dict[Tuple[str, str, datetime], Dict[str, Any]] = {}
+    for event in events:
+        if not event.get("timestamp") or not event.get("source_url"):
+            continue
+        day = day_bucket(event["timestamp"])
+        category = event.get("category") or categories.get(event["source_url"]) or "Unknown"
+        price = _event_price(event)
+        for scope, key in (("book", event["source_url"]), ("category", category)):
+            r = acc.setdefault((scope, key, day), {
+                "scope": scope, "key": key, "day": day,
+                "inc": {"change_count": 0, "new_count": 0, "update_count": 0, "availability_flips": 0},
+                "min": {}, "max": {}, "set": {},
+            })
+            r["inc"]["change_count"] += 1
+            r["inc"]["new_count" if event.get("change_type") == "new" else "update_count"] += 1
+            if _is_availability_flip(event):
+                r["inc"]["availability_flips"] += 1
+            if price is not None:
+                r["min"]["price_min"] = min(price, r["min"].get("price_min", price))
+                r["max"]["price_max"] = max(price, r["max"].get("price_max", price))
+                # events are folded in seq order, so the last one wins
+                r["set"]["price_last"] = price
+            r["max"]["last_change"] = _to_utc(event["timestamp"])
+    return list(acc.values())
+
+
+class ChangeRollupJob:
+    """
+    Incrementally rolls `book_changes` into daily per-book and per-category aggregates
+    (change counts, availability flips, price min/max/last). Progress is tracked by the
+    last processed change `seq` in crawler_state, so each run only reads new events.
+    The watermark only moves over a contiguous run of seqs: a missing seq may still be
+    committed by another writer, so folding stops there until the gap is filled or is
+    older than `gap_seconds` (a seq that was allocated but never written).
+    """
+    def __init__(self, mongo: StorageBackend, batch_size: int = 5000, gap_seconds: float = CHANGE_ROLLUP_GAP_SECONDS):
+        self.mongo = mongo
+        self.batch_size = batch_size
+        self.gap_seconds = gap_seconds
+
+    async def run(self) -> int:
+        state = await self.mongo.get_state(ROLLUP_STATE_KEY)
+        last_seq = state.get("last_seq", 0) if state else 0
+        processed = 0
+        while True:
+            events = await self.mongo.find_changes_after(last_seq, limit=self.batch_size)
+            ready = self._committed_prefix(last_seq, events)
+            if not ready:
+                break
+            await self._apply(ready)
+            last_seq = ready[-1]["seq"]
+            await self.mongo.save_state(ROLLUP_STATE_KEY, {"last_seq": last_seq, "updated_at": datetime.now(timezone.utc)})
+            processed += len(ready)
+            if len(ready) < len(events):
+                break
+        if processed:
+            logging.info(f"Change rollups updated with {processed} events (last_seq={last_seq})")
+        return processed
+
+    def _committed_prefix(self, last_seq: int, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Leading events up to the first recent seq gap (events are in seq order)."""
+        settled_before = datetime.now(timezone.utc) - timedelta(seconds=self.gap_seconds)
+        expected = last_seq + 1
+        for i, event in enumerate(events):
+            if event["seq"] != expected and (not event.get("timestamp") or _to_utc(event["timestamp"]) > settled_before):
+                return events[:i]
+            expected = event["seq"] + 1
+        return events
+
+    async def rebuild(self) -> int:
+        """Drop all rollups and recompute them from the retained change history."""
+        await self.mongo.clear_change_rollups()
+        await self.mongo.save_state(ROLLUP_STATE_KEY, {"last_seq": 0})
+        return await self.run()
+
+    async def _apply(self, events: List[Dict[str, Any]]):
+        missing = list({e["source_url"] for e in events if not e.get("category") and e.get("source_url")})
+        categories = await self.mongo.get_categories_for_urls(missing) if missing else {}
+        await self.mongo.apply_change_rollups(build_rollups(events, categories))
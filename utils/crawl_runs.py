@@ -0,0 +1,95 @@
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from bson import ObjectId
+from settings import RUN_REGRESSION_THRESHOLD
+
+
+# metrics compared between runs, and whether a higher value is better
+RUN_METRICS = {
+    "duration_s": False,
+    "books_per_second": True,
+    "error_rate": False,
+    "peak_rss_mb": False,
+    "counts.pages": None,
+    "counts.books_fetched": None,
+    "counts.books_skipped": None,
+    "counts.books_deduped": None,
+    "counts.books_failed": False,
+    "counts.new": None,
+    "counts.updated": None,
+    "counts.duplicate": None,
+    "timings.catalog_fetch_s": False,
+    "timings.book_fetch_s": False,
+    "timings.parse_s": False,
+    "timings.store_s": False,
+    "timings.retry_s": False,
+}
+
+
+def new_run_id() -> str:
+    # ObjectIds sort by creation time, so run ids do too
+    return str(ObjectId())
+
+
+def build_run_record(run_id: str, site_key: str, started_at: datetime, finished_at: datetime, status: str,
+                     stats: Dict[str, Any], timings: Dict[str, float], options: Optional[Dict[str, Any]] = None,
+                     error: Optional[str] = None) -> Dict[str, Any]:
+    """The immutable crawl_runs document written once at the end of a crawl."""
+    duration = (finished_at - started_at).total_seconds()
+    counts = {k: stats.get(k, 0) for k in (
+        "pages", "books_fetched", "books_skipped", "books_deduped", "books_failed", "retried", "recovered",
+        "new", "updated", "unchanged", "duplicate",
+    )}
+    attempted = counts["books_fetched"] + counts["retried"]
+    stored = counts["new"] + counts["updated"] + counts["unchanged"] + counts["duplicate"]
+    return {
+        "run_id": run_id,
+        "site_key": site_key,
+        "status": status,
+        "options": options or {},
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "duration_s": round(duration, 3),
+        "counts": counts,
+        "timings": {k: round(v, 3) for k, v in timings.items()},
+        "error_rate": round(counts["books_failed"] / attempted, 4) if attempted else 0.0,
+        "books_per_second": round(stored / duration, 3) if duration > 0 else None,
+        "peak_in_flight": stats.get("peak_in_flight"),
+        "peak_rss_mb": stats.get("peak_rss_mb"),
+        "error": error,
+    }
+
+
+def _metric(run: Dict[str, Any], path: str) -> Any:
+    value: Any = run
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def compare_runs(base: Dict[str, Any], target: Dict[str, Any],
+                 threshold: float = RUN_REGRESSION_THRESHOLD) -> Dict[str, Any]:
+    """
+    Metric-by-metric difference between two run records (no book or change scans).
+    A metric regresses when it moved the wrong way by more than `threshold` (relative).
+    """
+    metrics, regressions = {}, []
+    for path, higher_is_better in RUN_METRICS.items():
+        a, b = _metric(base, path), _metric(target, path)
+        if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+            metrics[path] = {"base": a, "target": b, "delta": None, "change_pct": None}
+            continue
+        change = (b - a) / a if a else None
+        metrics[path] = {"base": a, "target": b, "delta": round(b - a, 4),
+                         "change_pct": round(change * 100, 1) if change is not None else None}
+        if higher_is_better is None:
+            continue
+        worse = b < a if higher_is_better else b > a
+        if worse and (change is None or abs(change) > threshold):
+            regressions.append(path)
+    return {
+        "base": base["run_id"],
+        "target": target["run_id"],
+        "metrics": metrics,
+        "regressions": regressions,
+    }
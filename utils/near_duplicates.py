@@ -0,0 +1,90 @@
+import hashlib
+import random
+import re
+from typing import Dict, Any, List, Optional, Tuple
+from database.base import StorageBackend
+from settings import (
+    NEAR_DUP_BANDS,
+    NEAR_DUP_ROWS,
+    NEAR_DUP_MIN_SIMILARITY,
+    NEAR_DUP_MIN_TOKENS,
+    NEAR_DUP_MAX_CANDIDATES,
+)
+
+
+SHINGLE_SIZE = 2
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# fixed seed: signatures must be comparable across processes and runs
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NEAR_DUP_BANDS * NEAR_DUP_ROWS)]
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def shingles(tokens: List[str], size: int = SHINGLE_SIZE) -> set:
+    return {" ".join(tokens[i:i + size]) for i in range(max(len(tokens) - size + 1, 1))}
+
+
+def minhash(items: set) -> List[int]:
+    """MinHash signature: per permutation, the minimum hash over the set (one value per band row)."""
+    hashes = [int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=4).digest(), "big") for item in items]
+    return [min((a * h + b) % _PRIME & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / len(a) if a and len(a) == len(b) else 0.0
+
+
+def band_keys(signature: List[int], bands: int = NEAR_DUP_BANDS, rows: int = NEAR_DUP_ROWS) -> List[str]:
+    """
+    LSH bands: `rows` signature values per band, hashed into one key per band.
+    Books sharing any band key are candidates; with 16 bands x 4 rows a pair at 0.8 similarity
+    shares one with ~99.9% probability, unrelated books (below ~0.2) almost never do.
+    """
+    keys = []
+    for i in range(bands):
+        band = ",".join(map(str, signature[i * rows:(i + 1) * rows]))
+        keys.append(f"{i}:{hashlib.blake2b(band.encode('ascii'), digest_size=8).hexdigest()}")
+    return keys
+
+
+def book_signature(book: Dict[str, Any], min_tokens: int = NEAR_DUP_MIN_TOKENS) -> Dict[str, Any]:
+    """
+    `minhash` and `minhash_bands` fields for a book document, from name + description.
+    Empty for texts shorter than `min_tokens` words, which are too short to compare reliably.
+    """
+    tokens = _tokens(f"{book.get('name') or ''} {book.get('description') or ''}")
+    if len(tokens) < min_tokens:
+        return {}
+    signature = minhash(shingles(tokens))
+    return {"minhash": signature, "minhash_bands": band_keys(signature)}
+
+
+class NearDuplicateIndex:
+    """
+    Finds the canonical book a newly seen URL is a near-duplicate of (e.g. a relisted book).
+    Candidates come from an exact lookup on the `minhash_bands` index, capped at `max_candidates`,
+    so the cost per book does not grow with the catalog.
+    """
+    def __init__(self, mongo: StorageBackend, min_similarity: float = NEAR_DUP_MIN_SIMILARITY,
+                 max_candidates: int = NEAR_DUP_MAX_CANDIDATES) -> None:
+        self.mongo = mongo
+        self.min_similarity = min_similarity
+        self.max_candidates = max_candidates
+
+    async def find_canonical(self, book: Dict[str, Any]) -> Optional[Tuple[str, float]]:
+        """(canonical source_url, estimated similarity) of the closest near-duplicate, or None."""
+        if not book.get("minhash_bands"):
+            return None
+        candidates = await self.mongo.find_near_duplicates(book["minhash_bands"], book["source_url"], self.max_candidates)
+        best = None
+        for candidate in candidates:
+            score = similarity(book["minhash"], candidate.get("minhash") or [])
+            if score >= self.min_similarity and (best is None or score > best[1]):
+                # link to the root of the duplicate chain
+                best = (candidate.get("canonical_url") or candidate["source_url"], score)
+        return best
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+
+
+INTERVALS = ("raw", "day", "week", "month")
+AGGREGATES = ("last", "mean", "min", "max")
+FIELDS = ("price", "price_excl", "stock")
+
+
+def _as_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def period_start(t: datetime, interval: str) -> datetime:
+    """Start of the day / ISO week / month containing `t` (UTC)."""
+    day = datetime(t.year, t.month, t.day, tzinfo=timezone.utc)
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _aggregate(values: List[float], agg: str) -> Optional[float]:
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    if agg == "mean":
+        return round(sum(values) / len(values), 4)
+    if agg == "min":
+        return min(values)
+    if agg == "max":
+        return max(values)
+    return values[-1]
+
+
+def flatten_buckets(buckets: List[Dict[str, Any]], start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Observations from yearly bucket documents within [start, end], oldest first."""
+    points = []
+    for bucket in buckets:
+        for obs in bucket.get("observations", []):
+            t = _as_utc(obs["t"])
+            if start <= t <= end:
+                points.append({**obs, "t": t})
+    points.sort(key=lambda o: o["t"])
+    return points
+
+
+def downsample(points: List[Dict[str, Any]], interval: str = "raw", agg: str = "last") -> List[Dict[str, Any]]:
+    """Group observations per day/week/month and aggregate each field."""
+    if interval == "raw":
+        return points
+    grouped: Dict[datetime, List[Dict[str, Any]]] = {}
+    for p in points:
+        grouped.setdefault(period_start(p["t"], interval), []).append(p)
+    return [
+        {"t": t, "samples": len(group), **{f: _aggregate([p.get(f) for p in group], agg) for f in FIELDS}}
+        for t, group in sorted(grouped.items())
+    ]